@@ -1,11 +1,24 @@
-from flask import Flask, render_template, request, flash, redirect, url_for, send_from_directory
+from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
 from .forms import AutoAccidentWizardForm
-from .gmailproxy import GmailProxy
+from .intake import (IntakeSchemas, api_key_valid, schema_from_form, submissions_from, API_KEY_HEADER,
+                     FORMS_DIR, INTAKE_MAX_BATCH)
+from .outbox import Outbox
+from .store import get_store
+from .artifacts import normalize, render_html
+from .assets import AssetManifest
+from .staticfiles import StaticFiles
+from pipeline.bundler import BundleManifest
+from .styles import StylesManifest
+from pipeline.images import ImageManifest
+from .pagecache import PageCache
+from .i18n import I18n
+from .metrics import Metrics, timed
+from .profiler import Profiler
+from .admission import Admission
+from .templatecache import TemplateCache
 import os
 import sys
-import json
-import csv
-from datetime import datetime, date
+from datetime import datetime
 
 if getattr(sys, 'frozen', False):
     # PyInstaller Bundle: Use absolute paths from _MEIPASS
@@ -17,9 +30,43 @@ else:
     app = Flask(__name__, static_folder='../static', template_folder='../templates')
 # Load SECRET_KEY from environment variable, fallback to dev key if not set
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-prod')
+# Compiled templates persisted across restarts (outside _MEIPASS when frozen) and warmed before fork, see app/templatecache.py
+template_cache = TemplateCache(app)
+# Fingerprinted static URLs (`asset_url`) with immutable caching, ETag/304 for everything else
+assets = AssetManifest(app)
+# Opt-in request profiles (1 in PROFILE_SAMPLE_RATE, or a signed X-Profile-Token header), see app/profiler.py.
+# Installed inside StaticFiles, so static hits are never profiled.
+request_profiler = Profiler(app)
+# /static, /robots.txt and /sitemap.xml answered in front of Flask from a startup index + hot-file LRU, see app/staticfiles.py
+static_files = StaticFiles(app)
+# Bundled ES modules from static/dist (`module_url`, `module_preloads`), see pipeline/bundler.py
+bundles = BundleManifest(app)
+# Per-page purged CSS with the critical rules inlined (`page_styles`), see app/styles.py
+stylesheets = StylesManifest(app)
+# Width-stepped AVIF/WebP variants from static/images/variants (`responsive_image`), see pipeline/images.py
+responsive_images = ImageManifest(app)
+# Locale from cookie / Accept-Language with per-page translation payloads (`i18n_payload`), see app/i18n.py
+i18n = I18n(app)
+# Rendered GET pages (one per locale, already translated) with the CSRF token spliced in per request, see app/pagecache.py
+page_cache = PageCache(app, locale=i18n.negotiate, transform=i18n.localize)
+# JSON intake validators compiled once from static/forms/*.json (+ the wizard form), see app/intake.py
+intake_schemas = IntakeSchemas(os.path.join(app.static_folder, FORMS_DIR),
+                               extra={'auto_accident_wizard': schema_from_form(AutoAccidentWizardForm)})
+# Schemas of HTML forms that sit behind the honeypot / fill-time checks; over JSON only partners may post them
+PARTNER_ONLY_FORMS = {'auto_accident_wizard'}
+# Shared per-IP / global token buckets, an in-flight cap and honeypot / fill-time bot checks in front of
+# submissions (`admission_honeypot`), see app/admission.py
+admission_control = Admission(app)
+# Per-route latency / counts and save_submission phase timings shared across workers (/metrics, Server-Timing),
+# see app/metrics.py. Wraps every other WSGI layer, so it is installed last.
+request_metrics = Metrics(app)
 
 @app.route('/', methods=['GET', 'POST'])
+@admission_control.limit(bot_checks=True)
 def index():
+    if request.method == 'GET':
+        # The form is only built when the cached page has to be re-rendered.
+        return page_cache.render('index.html', lambda: {'form': AutoAccidentWizardForm()})
     form = AutoAccidentWizardForm()
     if form.validate_on_submit():
         save_submission(form.data, 'auto_accident_wizard')
@@ -30,110 +77,95 @@ def index():
 @app.route('/motor-vehicle-accident')
 def motor_vehicle_accident():
     """Motor vehicle accident info page (nav: Motor Vehicles)."""
-    return render_template('motor_vehicle_accident.html')
+    return page_cache.render('motor_vehicle_accident.html')
 
 @app.route('/personal-injury')
 def personal_injury():
     """Personal injury practice areas page (nav: Personal Injury)."""
-    return render_template('personal_injury.html')
+    return page_cache.render('personal_injury.html')
 
 @app.route('/robots.txt')
 def robots():
-    return send_from_directory('static', 'robots.txt')
+    # Resolved against app.static_folder (not the working directory), with the static files' ETag/304.
+    return assets.send('robots.txt')
 
 @app.route('/sitemap.xml')
 def sitemap():
-    return send_from_directory('static', 'sitemap.xml')
+    return assets.send('sitemap.xml')
+
+def intake_partner():
+    """Whether this intake request carries a partner API key (batches allowed, no per-IP bucket)."""
+    return api_key_valid(request.headers.get(API_KEY_HEADER))
+
+def intake_max_batch():
+    return INTAKE_MAX_BATCH if intake_partner() else 1
+
+def intake_cost():
+    """Admission tokens for an intake request: one per submission (a request that will be refused costs one)."""
+    submissions = submissions_from(request.get_json(silent=True))
+    if not submissions or len(submissions) > intake_max_batch():
+        return 1
+    return len(submissions)
+
+@app.route('/api/intake/<form>', methods=['POST'])
+@admission_control.limit(cost=intake_cost, trusted=intake_partner)
+def intake(form):
+    """JSON submissions (one object or a batch) validated by the compiled form schema."""
+    name = intake_schemas.resolve(form)
+    if name is None:
+        return jsonify(error=f"Unknown form '{form}'"), 404
+    if name in PARTNER_ONLY_FORMS and not intake_partner():
+        return jsonify(error=f"'{form}' is submitted through its page; the JSON API needs a partner API key ({API_KEY_HEADER})"), 403
+    body = request.get_json(silent=True)
+    submissions = submissions_from(body)
+    if submissions is None:
+        return jsonify(error="Expected a JSON object, an array, or {\"submissions\": [...]}"), 400
+    if not submissions:
+        return jsonify(error=f"A batch holds 1 to {INTAKE_MAX_BATCH} submissions"), 400
+    if len(submissions) > intake_max_batch():
+        if not intake_partner():
+            return jsonify(error=f"Batches need a partner API key ({API_KEY_HEADER}); send one submission per request"), 403
+        return jsonify(error=f"A batch holds 1 to {INTAKE_MAX_BATCH} submissions"), 413
+
+    form_type = intake_schemas.form_types[name]
+    results = []
+    for index, payload in enumerate(submissions):
+        data, errors = intake_schemas.validate(name, payload)
+        if errors:
+            results.append({'index': index, 'status': 'rejected', 'errors': errors})
+        else:
+            results.append({'index': index, 'status': 'accepted', 'id': save_submission(data, form_type)})
+
+    accepted = sum(1 for result in results if result['status'] == 'accepted')
+    if isinstance(body, dict) and 'submissions' not in body:
+        # A single object gets a flat response
+        return jsonify(results[0]), 201 if accepted else 422
+    status = 201 if accepted == len(results) else 422 if not accepted else 207
+    return jsonify(form_type=form_type, accepted=accepted, rejected=len(results) - accepted, results=results), status
 
 def save_submission(form_data, form_type):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    received_at = datetime.now()
     
     # 1. Prepare Data
-    # Filter out CSRF token and convert objects (like dates) to strings
-    data_to_save = {}
-    for k, v in form_data.items():
-        if k == 'csrf_token':
-            continue
-        if isinstance(v, (datetime, date)):
-            data_to_save[k] = v.isoformat()
-        else:
-            data_to_save[k] = str(v) if v is not None else ""
+    # Filter out CSRF token and convert objects (like dates) to strings, once for every renderer
+    with timed('prepare'):
+        data_to_save = normalize(form_data)
     
-    # Ensure submissions directory exists
-    if not os.path.exists('submissions'):
-        os.makedirs('submissions')
-        
-    base_filename = f"submissions/{form_type}_{timestamp}"
-    json_path = f"{base_filename}.json"
-    csv_path = f"{base_filename}.csv"
-    html_path = f"{base_filename}.html"
-
-    # 2. Save JSON (Attachment)
+    # 2. Append to the submission store (JSON/CSV/HTML files are rendered from it on demand)
     try:
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, indent=4, ensure_ascii=False)
-        print(f"Saved JSON to {json_path}")
+        with timed('store'):
+            submission_id = get_store().append(form_type, data_to_save, received_at)
+        print(f"Saved submission {submission_id}")
     except Exception as e:
-        print(f"Error saving JSON: {e}")
+        print(f"Error saving submission: {e}")
+        submission_id = None
 
-    # 3. Save CSV (Attachment)
-    try:
-        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(data_to_save.keys())
-            writer.writerow(data_to_save.values())
-        print(f"Saved CSV to {csv_path}")
-    except Exception as e:
-        print(f"Error saving CSV: {e}")
-
-    # 4. Generate & Save HTML (Email Body)
-    html_content = ""
-    try:
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ width: 100%; max-width: 600px; margin: 0 auto; }}
-                .header {{ background-color: #f8f9fa; padding: 20px; text-align: center; border-bottom: 3px solid #dc3545; }}
-                h2 {{ margin: 0; color: #dc3545; }}
-                .meta {{ color: #777; font-size: 0.9em; margin-bottom: 20px; text-align: center; }}
-                table {{ border-collapse: collapse; width: 100%; margin-top: 20px; }}
-                th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
-                th {{ background-color: #f8f9fa; font-weight: bold; width: 35%; color: #555; }}
-                tr:hover {{ background-color: #f1f1f1; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h2>New Submission: {form_type.replace('_', ' ').title()}</h2>
-                </div>
-                <div class="meta">
-                    Received on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-                </div>
-                <table>
-        """
-        for key, value in data_to_save.items():
-            # Format key for display
-            readable_key = key.replace('_', ' ').title()
-            html_content += f"<tr><th>{readable_key}</th><td>{value}</td></tr>"
-
-        html_content += """
-                </table>
-            </div>
-        </body>
-        </html>
-        """
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        print(f"Saved HTML to {html_path}")
-    except Exception as e:
-        print(f"Error saving HTML: {e}")
+    # 3. Render HTML (Email Body)
+    with timed('render_html'):
+        html_content = render_html(form_type, data_to_save, received_at)
 
-    # 5. Send Email via GmailProxy
+    # 4. Queue Email for the outbox delivery worker (SMTP stays off the request path)
     try:
-        email_service = GmailProxy()
         recipients = ["info@jslawgroup.net"]
         
         # Determine Client Name
@@ -143,19 +175,17 @@ def save_submission(form_data, form_type):
         elif 'first_name' in form_data and 'last_name' in form_data:
              client_name = f"{form_data.get('first_name', '')} {form_data.get('last_name', '')}".strip()
         
-        date_str = datetime.now().strftime("%Y-%m-%d")
+        date_str = received_at.strftime("%Y-%m-%d")
         readable_form_type = form_type.replace('_', ' ').title()
         subject = f"[{date_str}] {readable_form_type} - {client_name}"
         
-        attachments = [json_path, csv_path]
-        
-        # Verify attachments exist before sending
-        valid_attachments = [p for p in attachments if os.path.exists(p)]
-        
-        success, error = email_service.send_email(recipients, subject, html_content, valid_attachments)
-        if success:
-            print(f"Email sent successfully to {recipients}")
-        else:
-            print(f"Failed to send email: {error}")
+        # JSON/CSV attachments are rendered from the store by the delivery worker (timed there as json/csv/smtp_send).
+        with timed('enqueue'):
+            job_id = Outbox().enqueue(recipients, subject, html_content, [],
+                                      form_type=form_type, client_name=client_name, submission_id=submission_id,
+                                      received_at=received_at.isoformat(timespec='seconds'), data=data_to_save)
+        print(f"Queued email {job_id} for {recipients}")
     except Exception as e:
-        print(f"Error in email sending block: {e}")
+        print(f"Error queueing email: {e}")
+
+    return submission_id
@@ -1,40 +1,187 @@
 import os
 import sys
+import math
+import argparse
 import platform
 from . import app
+from . import template_cache
+from . import outbox
+from . import store
+from . import export
+from . import styles
+from . import metrics
+from . import profiler
+from . import templatecache
+from pipeline import bundler, images
+
+# Maintenance subcommands: `python -m app <command> ...`
+COMMANDS = {
+    "outbox": outbox.main,
+    "submissions": store.main,
+    "export": export.main,
+    "bundle": bundler.main,
+    "css": styles.main,
+    "images": images.main,
+    "metrics": metrics.main,
+    "profile": profiler.main,
+    "templates": templatecache.main,
+}
+
+# Gunicorn worker classes: `sync` (one request per process), `gthread` (a thread pool per process),
+# or an async worker (needs the gevent / eventlet package).
+WORKER_CLASSES = ("sync", "gthread", "gevent", "eventlet")
+ASYNC_WORKERS = ("gevent", "eventlet")
+
+
+def cpu_count():
+    """CPUs this process may actually use: the affinity mask, capped by a cgroup CPU quota (containers)."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:  # cgroup v2: "<quota> <period>" or "max <period>"
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def default_workers(worker_class, cpus):
+    # Sync workers block on I/O, so run more processes than cores; threaded/async workers overlap I/O themselves.
+    if worker_class == "sync":
+        return 2 * cpus + 1
+    if worker_class == "gthread":
+        return cpus + 1
+    return cpus
+
+
+def server_config(argv=None):
+    """Effective web server settings: command-line flags, then environment variables, then defaults."""
+    parser = argparse.ArgumentParser(prog="python -m app", description="Run the web server (Gunicorn, or Waitress on Windows).",
+                                     epilog=f"Maintenance commands: {', '.join(COMMANDS)} (python -m app <command> --help)")
+    parser.add_argument("--bind", default=os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}"),
+                        help="host:port or unix:/path.sock to listen on (env BIND, or 0.0.0.0:$PORT; default port 5000)")
+    parser.add_argument("--worker-class", choices=WORKER_CLASSES, default=os.environ.get("WORKER_CLASS", "sync"),
+                        help="Gunicorn worker model (env WORKER_CLASS, default sync)")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "0")),
+                        help="Worker processes (env WEB_CONCURRENCY; default from the usable CPU count)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("WORKER_THREADS", "4")),
+                        help="Threads per gthread worker / Waitress threads (env WORKER_THREADS, default 4)")
+    parser.add_argument("--worker-connections", type=int, default=int(os.environ.get("WORKER_CONNECTIONS", "1000")),
+                        help="Simultaneous clients per async worker (env WORKER_CONNECTIONS, default 1000)")
+    parser.add_argument("--max-requests", type=int, default=int(os.environ.get("MAX_REQUESTS", "1000")),
+                        help="Recycle a worker after this many requests, 0 = never (env MAX_REQUESTS, default 1000)")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.environ.get("MAX_REQUESTS_JITTER", "100")),
+                        help="Random extra requests per worker so they do not all recycle at once (env MAX_REQUESTS_JITTER)")
+    parser.add_argument("--keepalive", type=int, default=int(os.environ.get("KEEPALIVE", "5")),
+                        help="Seconds to hold idle keep-alive connections (env KEEPALIVE, default 5)")
+    parser.add_argument("--backlog", type=int, default=int(os.environ.get("BACKLOG", "2048")),
+                        help="Pending connections queued by the kernel (env BACKLOG, default 2048)")
+    parser.add_argument("--timeout", type=int, default=int(os.environ.get("WORKER_TIMEOUT", "30")),
+                        help="Seconds before a silent worker is killed and restarted (env WORKER_TIMEOUT, default 30)")
+    args = parser.parse_args(argv)
+
+    cpus = cpu_count()
+    return {
+        'bind': args.bind,
+        'worker_class': args.worker_class,
+        'workers': args.workers if args.workers > 0 else default_workers(args.worker_class, cpus),
+        'threads': args.threads if args.worker_class == "gthread" else 1,
+        'worker_connections': args.worker_connections,
+        # `python -m app` imports the app package (building the site) before Gunicorn starts,
+        # so workers always inherit it from the master; there is nothing left to load per worker.
+        'preload_app': True,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter if args.max_requests else 0,
+        'keepalive': args.keepalive,
+        'backlog': args.backlog,
+        'timeout': args.timeout,
+    }, cpus, args.threads
+
+
+def print_config(config, cpus):
+    print(f"Effective server config ({cpus} usable CPU{'s' if cpus != 1 else ''}):")
+    for key, value in config.items():
+        print(f"  {key:<20} {value}")
+    if config.get('worker_class') in ASYNC_WORKERS:
+        concurrency = config['workers'] * config['worker_connections']
+    else:
+        concurrency = config.get('workers', 1) * config['threads']
+    print(f"  {'max concurrency':<20} {concurrency} request(s)")
+
 
 def main():
+    # 0. Maintenance subcommands (e.g. `python -m app outbox status`)
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
+
+    config, cpus, threads = server_config(sys.argv[1:])
+    if config['bind'].startswith('unix:'):
+        # A Unix socket (unix:/path.sock): handed to Gunicorn unchanged.
+        host = port = None
+    else:
+        host, _, port = config['bind'].rpartition(':')
+        host, port = host or '0.0.0.0', int(port)
+
+    if config['worker_class'] in ASYNC_WORKERS and platform.system().lower() != "windows":
+        try:
+            __import__(config['worker_class'])
+        except ImportError:
+            print(f"Worker class '{config['worker_class']}' needs the {config['worker_class']} package: "
+                  f"pip install {config['worker_class']}")
+            sys.exit(1)
+
+    # Metrics files of a previous run would otherwise be merged into this one's /metrics.
+    metrics.REGISTRY.clear()
+
+    # Email delivery runs beside the web server so requests never wait on SMTP.
+    outbox.start_delivery_worker()
+
+    # Compile every template now, in the master: forked workers share it instead of compiling on their first request.
+    count, seconds = template_cache.warm()
+    print(f"Warmed {count} template(s) in {1000 * seconds:.1f} ms (bytecode cache: {template_cache.directory})")
+
     # 1. Check for Gunicorn (Only on non-Windows)
     is_windows = platform.system().lower() == "windows"
-    
+
     if is_windows:
         print("Detected Windows environment.")
-        
+        if port is None:
+            print(f"Cannot bind {config['bind']} on Windows: use host:port.")
+            sys.exit(1)
+
         # Respect environment variable for debug mode
         debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
 
         if debug_mode:
             print("Debug mode enabled. Running with Flask Development Server...")
-            app.run(host='0.0.0.0', port=5000, debug=True)
+            app.run(host=host, port=port, debug=True)
         else:
             # Production Mode on Windows -> Use Waitress
             try:
                 from waitress import serve
                 print("Starting Waitress (Production WSGI Server for Windows).")
-                print("Serving on http://0.0.0.0:5000 (Accessible via http://localhost:5000 or your LAN IP)")
-                serve(app, host='0.0.0.0', port=5000)
+                # One process with a thread pool: the Gunicorn worker/recycling settings do not apply.
+                print_config({'bind': config['bind'], 'server': 'waitress', 'threads': threads,
+                              'backlog': config['backlog']}, cpus)
+                print(f"Serving on http://{host}:{port} with {threads} thread(s), backlog {config['backlog']} (Accessible via http://localhost:{port} or your LAN IP)")
+                serve(app, host=host, port=port, threads=threads, backlog=config['backlog'])
             except ImportError:
                 print("Waitress not installed. Falling back to Flask Development Server.")
                 print("TIP: For production on Windows, install waitress: pip install waitress")
-                app.run(host='0.0.0.0', port=5000, debug=False)
-        
+                app.run(host=host, port=port, debug=False)
+
     else:
         print("Detected non-Windows environment. Starting Gunicorn via Python API...")
-        
+
         try:
             from gunicorn.app.base import BaseApplication
             import gunicorn.glogging  # Explicit import to help PyInstaller
             import gunicorn.workers.sync  # Explicit import for sync worker
+            import gunicorn.workers.gthread  # Explicit import for gthread worker
 
             class StandaloneApplication(BaseApplication):
                 def __init__(self, app, options=None):
@@ -51,13 +198,9 @@ def main():
                 def load(self):
                     return self.application
 
-            options = {
-                'bind': '0.0.0.0:5000',
-                'workers': 4,
-            }
-            
-            StandaloneApplication(app, options).run()
-            
+            print_config(config, cpus)
+            StandaloneApplication(app, config).run()
+
         except ImportError:
             print("Gunicorn not found in environment. Please install it with 'pip install gunicorn'.")
             sys.exit(1)
@@ -0,0 +1,324 @@
+"""
+Admission control for submission endpoints.
+
+`@admission_control.limit()` runs in front of a view (for POST requests only) and
+turns requests away before WTForms validation, the store, the rendered email
+and the outbox ever see them. Checks run cheapest first:
+
+1. Bot checks (`bot_checks=True`, the wizard form). The page carries a
+   honeypot input (`admission_honeypot()`, HONEYPOT_FIELD) hidden from people
+   and from the tab order; a request that fills it in is a bot. The CSRF token
+   in the form is signed with the time the page was rendered (Flask-WTF),
+   so a form sent back less than ADMISSION_MIN_FILL_SECONDS after that was not
+   filled in by hand. Both get the same redirect as a successful submission,
+   so the bot learns nothing, but nothing is stored or sent.
+2. Token buckets, shared by every gunicorn worker through a small SQLite
+   database (ADMISSION_DB): one per client IP (ADMISSION_IP_LIMIT) and one for
+   the whole site (ADMISSION_GLOBAL_LIMIT). A limit is `<burst>/<seconds>`:
+   up to <burst> submissions at once, refilled at <burst> per <seconds>. An
+   empty bucket gives `429 Too Many Requests` with `Retry-After`. A request
+   normally costs one token; `cost` charges a batch one per submission, and
+   callers that `trusted` vouches for (partner API keys) skip the per-IP bucket.
+3. A cap of ADMISSION_MAX_INFLIGHT submissions being processed at once across
+   all workers (one `flock`ed slot file each, released by the kernel even if a
+   worker dies); with every slot taken the request gets an immediate 429
+   instead of queueing behind disk and SMTP work.
+
+Set a limit to 0 to disable it. If the SQLite database cannot be used, requests
+are admitted (and the error is printed). Every decision is counted in
+`admission_requests_total{endpoint,result}` on /metrics. Behind a reverse proxy,
+set ADMISSION_PROXY_HOPS to the number of proxies appending to X-Forwarded-For
+so the client IP is the real one (the Dockerfile and Procfile set 1). With 0
+behind a proxy, every visitor shares the proxy's per-IP bucket; the first
+forwarded request logs a warning.
+"""
+import os
+import math
+import time
+import random
+import sqlite3
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from flask import Flask, current_app, jsonify, redirect, request
+from itsdangerous import BadData, URLSafeTimedSerializer
+from markupsafe import Markup, escape
+from werkzeug.exceptions import TooManyRequests
+
+from .metrics import REGISTRY
+
+try:
+    import fcntl  # Optional: shares the in-flight cap across workers (POSIX)
+except ImportError:
+    fcntl = None
+
+ADMISSION_DB = os.getenv("ADMISSION_DB", os.path.join("submissions", "admission.db"))
+ADMISSION_IP_LIMIT = os.getenv("ADMISSION_IP_LIMIT", "5/600")
+ADMISSION_GLOBAL_LIMIT = os.getenv("ADMISSION_GLOBAL_LIMIT", "120/60")
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "8"))
+ADMISSION_MIN_FILL_SECONDS = float(os.getenv("ADMISSION_MIN_FILL_SECONDS", "3"))
+ADMISSION_PROXY_HOPS = int(os.getenv("ADMISSION_PROXY_HOPS", "0"))
+HONEYPOT_FIELD = os.getenv("HONEYPOT_FIELD", "website")
+# Flask-WTF signs CSRF tokens with this salt.
+CSRF_SALT = "wtf-csrf-token"
+GLOBAL_KEY = "*"
+# Fraction of admissions that also delete idle (full again) buckets.
+PRUNE_PROBABILITY = 0.01
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key      TEXT PRIMARY KEY,
+    tokens   REAL NOT NULL,
+    updated  REAL NOT NULL
+);
+"""
+
+
+def parse_limit(value: str) -> Optional[Tuple[float, float]]:
+    """`"5/600"` -> (capacity 5, refill 5/600 tokens per second); `"0"` or `""` -> None (no limit)."""
+    value = (value or "").strip()
+    if value in ("", "0"):
+        return None
+    burst, _, seconds = value.partition("/")
+    try:
+        capacity = float(burst)
+        period = float(seconds or 1)
+    except ValueError:
+        print(f"Ignoring admission limit {value!r}: expected <burst>/<seconds>.")
+        return None
+    if capacity <= 0 or period <= 0:
+        return None
+    return capacity, capacity / period
+
+
+class TokenBuckets:
+    """Token buckets in SQLite, shared by every process that opens the same file."""
+
+    def __init__(self, path: str = ADMISSION_DB):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross fork, so each worker opens its own.
+        if self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last refills in a power cut is harmless.
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def take(self, buckets: List[Tuple[str, float, float]], cost: float = 1,
+             now: Optional[float] = None) -> Tuple[Optional[str], float]:
+        """
+        Take `cost` tokens from every (key, capacity, rate) bucket, or from none.
+
+        Returns (None, 0) when admitted, else (the first empty key, seconds until it has a token).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = []
+                for key, capacity, rate in buckets:
+                    row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                    tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                    if tokens < cost:
+                        conn.execute("ROLLBACK")
+                        return key, (cost - tokens) / rate
+                    levels.append((key, tokens - cost))
+                conn.executemany("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                                 [(key, tokens, now) for key, tokens in levels])
+                if random.random() < PRUNE_PROBABILITY:
+                    # A bucket untouched for longer than it takes to refill is full: same as no row.
+                    slowest = max(capacity / rate for _, capacity, rate in buckets)
+                    conn.execute("DELETE FROM buckets WHERE updated < ?", (now - slowest,))
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        return None, 0.0
+
+
+class InflightSlots:
+    """At most `size` holders at once across processes (flock'ed slot files; per process without fcntl)."""
+
+    def __init__(self, directory: str, size: int):
+        self.directory = directory
+        self.size = size
+        self._semaphore = threading.BoundedSemaphore(size) if size > 0 else None
+
+    @contextmanager
+    def acquire(self) -> Iterator[bool]:
+        """Yields whether a slot was free (never waits)."""
+        if self.size <= 0:
+            yield True
+            return
+        if fcntl is None:
+            acquired = self._semaphore.acquire(blocking=False)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    self._semaphore.release()
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        start = random.randrange(self.size)
+        for i in range(self.size):
+            # A fresh descriptor per attempt: flock conflicts between threads of one worker too.
+            f = open(os.path.join(self.directory, f"slot-{(start + i) % self.size}"), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            try:
+                yield True
+            finally:
+                f.close()
+            return
+        yield False
+
+
+class Admission:
+    """Rate limits, an in-flight cap and bot checks in front of submission views."""
+
+    def __init__(self, app: Optional[Flask] = None, path: str = ADMISSION_DB,
+                 ip_limit: str = ADMISSION_IP_LIMIT, global_limit: str = ADMISSION_GLOBAL_LIMIT,
+                 max_inflight: int = ADMISSION_MAX_INFLIGHT, min_fill_seconds: float = ADMISSION_MIN_FILL_SECONDS,
+                 proxy_hops: int = ADMISSION_PROXY_HOPS, honeypot_field: str = HONEYPOT_FIELD):
+        self.buckets = TokenBuckets(path)
+        self.slots = InflightSlots(path + ".slots", max_inflight)
+        self.ip_limit = parse_limit(ip_limit)
+        self.global_limit = parse_limit(global_limit)
+        self.min_fill_seconds = min_fill_seconds
+        self.proxy_hops = proxy_hops
+        self.honeypot_field = honeypot_field
+        self._warned_proxy = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        app.extensions["admission"] = self
+        app.add_template_global(self.honeypot, "admission_honeypot")
+
+    def honeypot(self) -> Markup:
+        """Hidden input that people never see or reach with Tab; bots filling every field do fill it."""
+        # The CSS purge keeps .visually-hidden for this markup through styles.HELPER_CLASSES.
+        name = escape(self.honeypot_field)
+        return Markup(
+            f'<div class="visually-hidden" aria-hidden="true">'
+            f'<label for="{name}">Leave this field empty</label>'
+            f'<input type="text" id="{name}" name="{name}" value="" tabindex="-1" autocomplete="off">'
+            f'</div>'
+        )
+
+    # --- Checks ----------------------------------------------------------------------
+
+    def client_ip(self) -> str:
+        if self.proxy_hops > 0:
+            forwarded = [part.strip() for part in request.headers.get("X-Forwarded-For", "").split(",") if part.strip()]
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        elif "X-Forwarded-For" in request.headers and not self._warned_proxy:
+            self._warned_proxy = True
+            print(f"Admission: X-Forwarded-For received with ADMISSION_PROXY_HOPS=0; the per-IP limit applies to "
+                  f"{request.remote_addr} (the proxy?) for every client. Set ADMISSION_PROXY_HOPS behind a proxy.")
+        return request.remote_addr or "unknown"
+
+    def _form_age(self) -> Optional[float]:
+        """Seconds since the page holding this form's CSRF token was rendered (None if unknown)."""
+        token = request.form.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"))
+        secret_key = current_app.config.get("WTF_CSRF_SECRET_KEY") or current_app.secret_key
+        if not token or not secret_key:
+            return None
+        try:
+            _, issued = URLSafeTimedSerializer(secret_key, salt=CSRF_SALT).loads(token, return_timestamp=True)
+        except BadData:
+            # WTForms reports the bad token.
+            return None
+        return time.time() - issued.timestamp()
+
+    def bot_reason(self) -> Optional[str]:
+        if self.honeypot_field and request.form.get(self.honeypot_field):
+            return "honeypot"
+        if self.min_fill_seconds > 0:
+            age = self._form_age()
+            if age is not None and age < self.min_fill_seconds:
+                return "too_fast"
+        return None
+
+    def rate_limited(self, cost: int = 1, per_ip: bool = True) -> Tuple[Optional[str], float]:
+        """("ip_rate" / "global_rate", retry after seconds), or (None, 0)."""
+        buckets = []
+        if self.ip_limit and per_ip:
+            buckets.append((f"ip:{self.client_ip()}",) + self.ip_limit)
+        if self.global_limit:
+            buckets.append((GLOBAL_KEY,) + self.global_limit)
+        if not buckets:
+            return None, 0.0
+        try:
+            key, retry_after = self.buckets.take(buckets, cost)
+        except sqlite3.Error as e:
+            print(f"Admission rate limit unavailable, admitting: {e}")
+            return None, 0.0
+        if key is None:
+            return None, 0.0
+        return ("global_rate" if key == GLOBAL_KEY else "ip_rate"), retry_after
+
+    # --- Decorator -------------------------------------------------------------------
+
+    def _count(self, result: str) -> None:
+        REGISTRY.inc("admission_requests_total", {"endpoint": request.endpoint or "", "result": result})
+
+    def _too_many(self, retry_after: float):
+        retry_after = max(1, math.ceil(retry_after))
+        if request.is_json:
+            response = jsonify(error="Too many submissions, try again later")
+            response.status_code = 429
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+        raise TooManyRequests("Too many submissions right now. Please try again shortly.", retry_after=retry_after)
+
+    def limit(self, bot_checks: bool = False, methods: Tuple[str, ...] = ("POST",),
+              cost: Optional[Callable[[], int]] = None, trusted: Optional[Callable[[], bool]] = None) -> Callable:
+        """
+        Decorate a view: admission checks for `methods` requests (bot checks only for HTML forms).
+
+        `cost()` is the number of tokens the request takes from each bucket (default 1); when
+        `trusted()` is true the per-IP bucket is skipped (the global bucket and in-flight cap still apply).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method not in methods:
+                    return view(*args, **kwargs)
+                if bot_checks:
+                    reason = self.bot_reason()
+                    if reason is not None:
+                        self._count(reason)
+                        # Looks like success to the bot; nothing is stored or sent.
+                        return redirect(request.path)
+                reason, retry_after = self.rate_limited(cost() if cost else 1, not (trusted and trusted()))
+                if reason is not None:
+                    self._count(reason)
+                    return self._too_many(retry_after)
+                with self.slots.acquire() as admitted:
+                    if not admitted:
+                        self._count("busy")
+                        return self._too_many(1)
+                    self._count("admitted")
+                    return view(*args, **kwargs)
+            return wrapper
+        return decorator
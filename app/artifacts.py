@@ -0,0 +1,111 @@
+"""
+Per-lead artifacts (JSON, CSV, HTML) rendered on demand from a stored submission.
+
+These used to be written eagerly into `submissions/` on every request; they are
+now produced from the submission store when an email is sent or an operator
+asks for them (`python -m app submissions show <id> --format csv`).
+
+`normalize` turns the form data into the stored record (all strings) once per
+submission; the JSON, CSV and HTML renderers all work from that record. The
+email body is joined once from fixed head/row/tail strings instead of growing
+a string field by field, and values are HTML-escaped, so a free-text answer
+can no longer inject markup into the email.
+"""
+import io
+import csv
+import html
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from .metrics import timed
+
+
+def render_json(data: Dict[str, str]) -> str:
+    return json.dumps(data, indent=4, ensure_ascii=False)
+
+
+def render_csv(data: Dict[str, str]) -> str:
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer)
+    writer.writerow(data.keys())
+    writer.writerow(data.values())
+    return buffer.getvalue()
+
+
+# The fixed parts of the email body, formatted once per submission around the rows.
+_EMAIL_HEAD = """
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ width: 100%; max-width: 600px; margin: 0 auto; }}
+                .header {{ background-color: #f8f9fa; padding: 20px; text-align: center; border-bottom: 3px solid #dc3545; }}
+                h2 {{ margin: 0; color: #dc3545; }}
+                .meta {{ color: #777; font-size: 0.9em; margin-bottom: 20px; text-align: center; }}
+                table {{ border-collapse: collapse; width: 100%; margin-top: 20px; }}
+                th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
+                th {{ background-color: #f8f9fa; font-weight: bold; width: 35%; color: #555; }}
+                tr:hover {{ background-color: #f1f1f1; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h2>New Submission: {title}</h2>
+                </div>
+                <div class="meta">
+                    Received on: {received_at}
+                </div>
+                <table>
+        """
+_EMAIL_TAIL = """
+                </table>
+            </div>
+        </body>
+        </html>
+        """
+
+
+@lru_cache(maxsize=512)
+def field_label(key: str) -> str:
+    """`incident_description` -> `Incident Description` (HTML-escaped)."""
+    return html.escape(key.replace('_', ' ').title())
+
+
+def normalize(form_data: Dict) -> Dict[str, str]:
+    """The stored record, in one pass: every value a string (dates ISO 8601, None empty), CSRF token dropped."""
+    record = {}
+    for key, value in form_data.items():
+        if key == 'csrf_token':
+            continue
+        if isinstance(value, str):
+            record[key] = value
+        elif isinstance(value, (datetime, date)):
+            record[key] = value.isoformat()
+        else:
+            record[key] = str(value) if value is not None else ""
+    return record
+
+
+def render_html(form_type: str, data: Dict[str, str], received_at: datetime) -> str:
+    """Email body: one table row per field, joined in a single pass with every value HTML-escaped."""
+    parts = [_EMAIL_HEAD.format(title=field_label(form_type), received_at=received_at.strftime("%Y-%m-%d %H:%M:%S"))]
+    parts.extend(f"<tr><th>{field_label(key)}</th><td>{html.escape(value)}</td></tr>" for key, value in data.items())
+    parts.append(_EMAIL_TAIL)
+    return "".join(parts)
+
+
+def base_filename(submission: Dict) -> str:
+    """`<form_type>_<submission id>`; the id starts with `%Y%m%d_%H%M%S` like the legacy file names."""
+    return f"{submission['form_type']}_{submission['id']}"
+
+
+def email_attachments(submission: Dict) -> List[Tuple[str, bytes]]:
+    """In-memory (filename, content) pairs for the JSON and CSV attachments."""
+    name = base_filename(submission)
+    with timed("json"):
+        json_bytes = render_json(submission["data"]).encode("utf-8")
+    with timed("csv"):
+        csv_bytes = render_csv(submission["data"]).encode("utf-8")
+    return [(f"{name}.json", json_bytes), (f"{name}.csv", csv_bytes)]
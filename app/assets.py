@@ -0,0 +1,125 @@
+"""
+Content-hashed static asset URLs with long-lived caching.
+
+`asset_url('css/custom.min.css')` in a template emits
+`/static/css/custom.min.<hash>.css`. Fingerprinted URLs are served with
+`Cache-Control: public, max-age=31536000, immutable`; any other static file is
+served with a strong content-hash ETag and `no-cache`, so browsers revalidate
+and get `304 Not Modified` when nothing changed.
+
+Entries are validated against the file's size/mtime on use, so editing an
+asset (e.g. in debug mode) produces a new hash without restarting. Files are
+sent with pipeline/sendfile.py (byte ranges, the server's sendfile path, or a
+front-proxy handoff).
+"""
+import os
+import stat
+import hashlib
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from flask import Flask, abort, url_for
+from werkzeug.security import safe_join
+
+from pipeline.sendfile import send_static
+
+IMMUTABLE_MAX_AGE = 31536000  # one year
+HASH_LENGTH = 12
+
+
+class AssetEntry(NamedTuple):
+    size: int
+    mtime: float
+    digest: str
+
+
+def fingerprinted_name(filename: str, digest: str) -> str:
+    """`css/custom.min.css` -> `css/custom.min.<digest>.css`"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class AssetManifest:
+    """Maps static files to fingerprinted names and serves them (replaces Flask's `static` view)."""
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.static_folder = ""
+        self._entries: Dict[str, AssetEntry] = {}
+        # fingerprinted name -> source name
+        self._sources: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.static_folder = os.path.abspath(app.static_folder)
+        self.scan()
+        app.add_template_global(self.url, "asset_url")
+        app.view_functions["static"] = self.send
+        app.extensions["assets"] = self
+
+    def scan(self) -> None:
+        """Hash every file under the static folder (done once at startup)."""
+        for directory, _, files in os.walk(self.static_folder):
+            for name in files:
+                rel = os.path.relpath(os.path.join(directory, name), self.static_folder).replace(os.sep, "/")
+                self.entry(rel)
+
+    def entry(self, filename: str) -> Optional[AssetEntry]:
+        path = safe_join(self.static_folder, filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        cached = self._entries.get(filename)
+        if cached is not None and cached.size == st.st_size and cached.mtime == st.st_mtime:
+            return cached
+        entry = AssetEntry(st.st_size, st.st_mtime, file_digest(path))
+        with self._lock:
+            self._entries[filename] = entry
+            self._sources[fingerprinted_name(filename, entry.digest)] = filename
+        return entry
+
+    def url(self, filename: str) -> str:
+        """Template helper: URL of the fingerprinted copy (falls back to the plain URL)."""
+        entry = self.entry(filename)
+        if entry is None:
+            return url_for("static", filename=filename)
+        return url_for("static", filename=fingerprinted_name(filename, entry.digest))
+
+    def resolve(self, filename: str) -> Tuple[str, bool]:
+        """(source filename, immutable) for a requested static path."""
+        source = self._sources.get(filename)
+        if source is not None:
+            entry = self.entry(source)
+            # Only the current content may be cached forever; an outdated hash is just revalidated.
+            if entry is not None and fingerprinted_name(source, entry.digest) == filename:
+                return source, True
+            return source, False
+        return filename, False
+
+    def send(self, filename: str):
+        source, immutable = self.resolve(filename)
+        entry = self.entry(source)
+        if entry is None:
+            abort(404)
+        path = safe_join(self.static_folder, source)
+        response = send_static(path, etag=entry.digest, last_modified=entry.mtime, size=entry.size,
+                               max_age=IMMUTABLE_MAX_AGE if immutable else None, internal=source)
+        if immutable:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
@@ -0,0 +1,131 @@
+"""
+Digest delivery mode for the email outbox.
+
+With EMAIL_DELIVERY_MODE=digest the outbox worker holds queued submissions
+until either the oldest one has waited DIGEST_WINDOW seconds or
+DIGEST_MAX_COUNT have piled up, then sends them as ONE message (one table per
+lead, combined JSON/CSV attachments) over one pooled SMTP session.
+Form types listed in DIGEST_BYPASS_FORMS are always sent immediately.
+"""
+import io
+import os
+import csv
+import json
+import html
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EMAIL_DELIVERY_MODE = os.getenv("EMAIL_DELIVERY_MODE", "immediate").lower()
+DIGEST_WINDOW = float(os.getenv("DIGEST_WINDOW", "300"))
+DIGEST_MAX_COUNT = int(os.getenv("DIGEST_MAX_COUNT", "20"))
+DIGEST_BYPASS_FORMS = os.getenv("DIGEST_BYPASS_FORMS", "")
+
+
+class DigestPolicy:
+    """Decides which queued jobs may be batched and when a batch is due."""
+
+    def __init__(self, mode: str = EMAIL_DELIVERY_MODE, window: float = DIGEST_WINDOW,
+                 max_count: int = DIGEST_MAX_COUNT, bypass_forms: Iterable[str] = ()):
+        self.mode = mode
+        self.window = window
+        self.max_count = max(1, max_count)
+        self.bypass_forms = set(bypass_forms) or {f.strip() for f in DIGEST_BYPASS_FORMS.split(",") if f.strip()}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "digest"
+
+    def bypasses(self, job: Dict) -> bool:
+        """High-priority form types (and legacy jobs without lead data) go out on their own."""
+        meta = job.get("meta") or {}
+        return "data" not in meta or meta.get("form_type") in self.bypass_forms
+
+    def is_due(self, jobs: List[Dict], now: Optional[float] = None) -> bool:
+        if not jobs:
+            return False
+        now = time.time() if now is None else now
+        oldest = min(job.get("created_at", now) for job in jobs)
+        return len(jobs) >= self.max_count or now - oldest >= self.window
+
+
+def _readable(name: str) -> str:
+    return name.replace('_', ' ').title()
+
+
+def build_digest(jobs: List[Dict]) -> Tuple[str, str, List[Tuple[str, bytes]]]:
+    """
+    Render one digest email for a batch of outbox jobs.
+
+    Returns (subject, body_html, attachments). The combined in-memory attachments
+    are a JSON array of every lead and a CSV with one row per lead over the union
+    of their columns.
+    """
+    records = []
+    for job in jobs:
+        meta = job["meta"]
+        record = {"form_type": meta.get("form_type", ""), "received_at": meta.get("received_at", "")}
+        record.update(meta["data"])
+        records.append(record)
+
+    now = datetime.now()
+    form_counts: Dict[str, int] = {}
+    for record in records:
+        form_counts[record["form_type"]] = form_counts.get(record["form_type"], 0) + 1
+    summary = ", ".join(f"{_readable(ft)} x{count}" for ft, count in sorted(form_counts.items()))
+    subject = f"[{now.strftime('%Y-%m-%d')}] Submission Digest - {len(records)} leads ({summary})"
+
+    sections = []
+    for index, (job, record) in enumerate(zip(jobs, records), start=1):
+        client_name = html.escape(str(job["meta"].get("client_name") or "Unknown Client"))
+        rows = "".join(
+            f"<tr><th>{html.escape(_readable(key))}</th><td>{html.escape(str(value))}</td></tr>"
+            for key, value in job["meta"]["data"].items()
+        )
+        sections.append(
+            f'<h3>{index}. {html.escape(_readable(record["form_type"]))} - {client_name}</h3>'
+            f'<div class="meta">Received on: {html.escape(str(record["received_at"]))}</div>'
+            f'<table>{rows}</table>'
+        )
+
+    body_html = f"""
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ width: 100%; max-width: 600px; margin: 0 auto; }}
+                .header {{ background-color: #f8f9fa; padding: 20px; text-align: center; border-bottom: 3px solid #dc3545; }}
+                h2 {{ margin: 0; color: #dc3545; }}
+                h3 {{ margin: 32px 0 4px; color: #dc3545; }}
+                .meta {{ color: #777; font-size: 0.9em; }}
+                table {{ border-collapse: collapse; width: 100%; margin-top: 12px; }}
+                th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
+                th {{ background-color: #f8f9fa; font-weight: bold; width: 35%; color: #555; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h2>Submission Digest: {len(records)} New Leads</h2>
+                    <div class="meta">{html.escape(summary)}</div>
+                </div>
+                {"".join(sections)}
+            </div>
+        </body>
+        </html>
+        """
+
+    stamp = now.strftime('%Y%m%d_%H%M%S')
+    columns: List[str] = []
+    for record in records:
+        columns.extend(key for key in record if key not in columns)
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=columns, restval="")
+    writer.writeheader()
+    writer.writerows(records)
+
+    attachments = [
+        (f"digest_{stamp}.json", json.dumps(records, indent=4, ensure_ascii=False).encode("utf-8")),
+        (f"digest_{stamp}.csv", buffer.getvalue().encode("utf-8")),
+    ]
+    return subject, body_html, attachments
@@ -0,0 +1,240 @@
+"""
+Streaming bulk export of submissions.
+
+Records are pulled from the SQLite submission store and from the legacy
+per-file layout (`submissions/<form_type>_<YYYYmmdd_HHMMSS>.json`, written
+before the store existed) through a generator pipeline, so memory stays flat
+no matter how many leads are exported. Legacy files are indexed by the
+timestamp in their file names, so filtered-out files are never opened.
+
+CSV and Parquet need every column name before the first row is written. Rows
+are read from the sources once and spooled to a temporary JSONL file while the
+field names are collected; the output is then written from the spool (or
+straight from the sources when `--columns` is given).
+
+Command-line interface
+    python -m app export [--format csv|jsonl|parquet] [--out FILE]
+                         [--form-type T] [--since DATE] [--until DATE]
+                         [--where field=value ...] [--source all|store|files]
+
+    python -m app export --form-type auto_accident_wizard --since 2025-01-01 --until 2026-01-01 -o leads.csv
+    python -m app export --format jsonl --where zip_code=30301
+
+Parquet output requires `pyarrow` (pip install pyarrow).
+"""
+import os
+import re
+import sys
+import csv
+import json
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .store import STORE_PATH, SubmissionStore
+
+LEGACY_DIR = "submissions"
+LEGACY_NAME = re.compile(r"^(?P<form_type>.+)_(?P<stamp>\d{8}_\d{6})\.json$")
+BASE_COLUMNS = ["id", "form_type", "created_at"]
+PARQUET_ROW_GROUP = 10000
+
+
+def _parse_when(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    when = datetime.fromisoformat(value)
+    # Submissions carry naive local times (received_at); an offset is converted to that.
+    return when.astimezone().replace(tzinfo=None) if when.tzinfo else when
+
+
+def legacy_index(directory: str = LEGACY_DIR, form_type: Optional[str] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Tuple[datetime, str, str]]:
+    """(timestamp, form_type, path) for legacy JSON files, filtered and sorted using only their names."""
+    entries = []
+    if not os.path.isdir(directory):
+        return entries
+    with os.scandir(directory) as it:
+        for entry in it:
+            match = LEGACY_NAME.match(entry.name)
+            if not match or not entry.is_file():
+                continue
+            if form_type and match.group("form_type") != form_type:
+                continue
+            stamp = datetime.strptime(match.group("stamp"), "%Y%m%d_%H%M%S")
+            if (since and stamp < since) or (until and stamp >= until):
+                continue
+            entries.append((stamp, match.group("form_type"), entry.path))
+    entries.sort()
+    return entries
+
+
+def iter_legacy(directory: str = LEGACY_DIR, form_type: Optional[str] = None,
+                since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[Dict]:
+    for stamp, entry_form_type, path in legacy_index(directory, form_type, since, until):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Skipping unreadable file {path}: {e}", file=sys.stderr)
+            continue
+        yield {
+            "id": os.path.splitext(os.path.basename(path))[0],
+            "form_type": entry_form_type,
+            "created_at": stamp.isoformat(),
+            "data": data,
+        }
+
+
+def iter_store(store: SubmissionStore, form_type: Optional[str] = None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[Dict]:
+    return store.query(form_type, since.isoformat() if since else None, until.isoformat() if until else None)
+
+
+def flatten(submission: Dict) -> Dict[str, str]:
+    row = {"id": submission["id"], "form_type": submission["form_type"], "created_at": submission["created_at"]}
+    for key, value in submission["data"].items():
+        if key not in row:
+            row[key] = "" if value is None else str(value)
+    return row
+
+
+def matches(where: Dict[str, str]) -> Callable[[Dict[str, str]], bool]:
+    return lambda row: all(row.get(field) == value for field, value in where.items())
+
+
+def spool_rows(rows: Iterable[Dict[str, str]], columns: List[str]) -> TextIO:
+    """Copy rows to a temporary JSONL file, appending unseen field names to `columns`; returns it rewound."""
+    seen = set(columns)
+    spool = tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+        spool.write(json.dumps(row, ensure_ascii=False))
+        spool.write("\n")
+    spool.seek(0)
+    return spool
+
+
+def read_spool(spool: TextIO) -> Iterator[Dict[str, str]]:
+    for line in spool:
+        yield json.loads(line)
+
+
+def write_jsonl(rows: Iterable[Dict[str, str]], out: TextIO) -> int:
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[Dict[str, str]], columns: List[str], out: TextIO) -> int:
+    writer = csv.DictWriter(out, fieldnames=columns, restval="", extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_parquet(rows: Iterable[Dict[str, str]], columns: List[str], path: str) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet export requires pyarrow: pip install pyarrow")
+    schema = pa.schema([(name, pa.string()) for name in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batch: Dict[str, List[str]] = {name: [] for name in columns}
+        for row in rows:
+            for name in columns:
+                batch[name].append(row.get(name, ""))
+            count += 1
+            if count % PARQUET_ROW_GROUP == 0:
+                writer.write_table(pa.table(batch, schema=schema))
+                batch = {name: [] for name in columns}
+        if count % PARQUET_ROW_GROUP:
+            writer.write_table(pa.table(batch, schema=schema))
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app export", description="Stream submissions to CSV, JSONL or Parquet.")
+    parser.add_argument("--format", choices=("csv", "jsonl", "parquet"), default="csv")
+    parser.add_argument("-o", "--out", default="-", help="Output file (default: stdout; required for parquet)")
+    parser.add_argument("--form-type")
+    parser.add_argument("--since", help="ISO date/time, inclusive (e.g. 2025-01-01; an offset is converted to local time)")
+    parser.add_argument("--until", help="ISO date/time, exclusive")
+    parser.add_argument("--where", action="append", default=[], metavar="FIELD=VALUE",
+                        help="Only rows whose field equals value (repeatable)")
+    parser.add_argument("--columns", help="Comma-separated column list (writes rows directly instead of spooling them)")
+    parser.add_argument("--source", choices=("all", "store", "files"), default="all")
+    parser.add_argument("--db", help="Submission store path")
+    parser.add_argument("--dir", default=LEGACY_DIR, help=f"Legacy per-file directory (default: {LEGACY_DIR})")
+    args = parser.parse_args(argv)
+
+    try:
+        since, until = _parse_when(args.since), _parse_when(args.until)
+        where = dict(item.split("=", 1) for item in args.where)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.format == "parquet" and args.out == "-":
+        parser.error("--out is required for parquet")
+
+    store = None
+    if args.source in ("all", "store"):
+        db = args.db or STORE_PATH
+        # SubmissionStore creates a missing database; a mistyped --db should be an error, not an empty export.
+        if os.path.exists(db):
+            store = SubmissionStore(db)
+        elif args.db or args.source == "store":
+            parser.error(f"submission store not found: {db}")
+    keep = matches(where)
+
+    def rows() -> Iterator[Dict[str, str]]:
+        if args.source in ("all", "files"):
+            for submission in iter_legacy(args.dir, args.form_type, since, until):
+                row = flatten(submission)
+                if keep(row):
+                    yield row
+        if store is not None:
+            for submission in iter_store(store, args.form_type, since, until):
+                row = flatten(submission)
+                if keep(row):
+                    yield row
+
+    spool = None
+    source = rows()
+    if args.format != "jsonl":
+        if args.columns:
+            columns = [c.strip() for c in args.columns.split(",") if c.strip()]
+        else:
+            # Columnar formats need the header up front: collect the field names while spooling the rows.
+            columns = list(BASE_COLUMNS)
+            spool = spool_rows(source, columns)
+            source = read_spool(spool)
+
+    try:
+        if args.format == "parquet":
+            count = write_parquet(source, columns, args.out)
+        else:
+            out = sys.stdout if args.out == "-" else open(args.out, 'w', newline='', encoding='utf-8')
+            try:
+                if args.format == "csv":
+                    count = write_csv(source, columns, out)
+                else:
+                    count = write_jsonl(source, out)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+    finally:
+        if spool is not None:
+            spool.close()
+    print(f"Exported {count} submission(s).", file=sys.stderr)
+    return 0
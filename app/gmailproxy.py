@@ -1,11 +1,14 @@
 import os
 import smtplib
 import ssl
+import time
+import atexit
+import threading
 import mimetypes
 from pathlib import Path
 from abc import ABC, abstractmethod
 from email.message import EmailMessage
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import sys
 from dotenv import load_dotenv
 
@@ -31,12 +34,144 @@ Comparison of Dotenv Loading Strategies in Python
 """
 
 
+# An attachment is a file path or an in-memory (filename, content) pair.
+Attachment = Union[str, Tuple[str, bytes]]
+
+# Connection pool tuning: sessions kept per process, and seconds a session may sit idle before it is dropped.
+# SMTP_POOL_SIZE=0 disables pooling (every send opens and closes its own session).
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_POOL_MAX_IDLE = float(os.getenv("SMTP_POOL_MAX_IDLE", "60"))
+
+
 class IEmailService(ABC):
     """Interface for Email Service."""
     @abstractmethod
-    def send_email(self, recipients: List[str], subject: str, body_html: str, attachments: Optional[List[str]] = None) -> Tuple[bool, Optional[str]]:
+    def send_email(self, recipients: List[str], subject: str, body_html: str, attachments: Optional[List[Attachment]] = None) -> Tuple[bool, Optional[str]]:
         pass
 
+class SMTPConnectionPool:
+    """
+    Per-process pool of authenticated SMTP sessions.
+
+    Idle sessions are checked with NOOP before reuse and dropped once they have
+    been idle longer than `max_idle` seconds, so steady-state sends skip the TCP,
+    TLS and AUTH round-trips. The pool is reset after a fork so workers never
+    share a socket with their parent.
+    """
+    def __init__(self, host: str, port: int, security: str, username: str, password: str, timeout: int,
+                 max_size: int = SMTP_POOL_SIZE, max_idle: float = SMTP_POOL_MAX_IDLE,
+                 context: Optional[ssl.SSLContext] = None):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_size = max_size
+        self.max_idle = max_idle
+        # TLS context for SSL / STARTTLS (None: system CAs with hostname checks)
+        self.context = context
+        self.stats = {"connects": 0, "reuses": 0, "discards": 0}
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.security == "SSL":
+            server = smtplib.SMTP_SSL(self.host, self.port, context=self.context or ssl.create_default_context(),
+                                      timeout=self.timeout)
+        elif self.security == "STARTTLS":
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            server.ehlo()
+            server.starttls(context=self.context or ssl.create_default_context())
+            server.ehlo()
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._count("connects")
+        return server
+
+    def _count(self, name: str) -> None:
+        # gthread workers send from several threads at once; `+=` on a dict entry is not atomic.
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            # Inherited sockets belong to the parent; forget them without sending QUIT.
+            self._idle = []
+            self._lock = threading.Lock()
+            self._stats_lock = threading.Lock()
+            self._pid = os.getpid()
+
+    def acquire(self) -> smtplib.SMTP:
+        self._check_fork()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            if time.monotonic() - last_used > self.max_idle:
+                self.discard(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    self._count("reuses")
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.discard(server)
+        return self._connect()
+
+    def release(self, server: smtplib.SMTP) -> None:
+        self._check_fork()
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self.discard(server)
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        self._count("discards")
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def close_all(self) -> None:
+        self._check_fork()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self.discard(server)
+
+
+_POOLS: Dict[Tuple[str, int, str, str], SMTPConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(host: str, port: int, security: str, username: str, password: str, timeout: int) -> SMTPConnectionPool:
+    """Return the shared pool for these SMTP settings, creating it on first use."""
+    key = (host, port, security, username)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.password != password:
+            pool = SMTPConnectionPool(host, port, security, username, password, timeout)
+            _POOLS[key] = pool
+        return pool
+
+
+@atexit.register
+def _close_pools() -> None:
+    for pool in list(_POOLS.values()):
+        pool.close_all()
+
+
 class RealGmailService(IEmailService):
     """Actual implementation using SMTP (Gmail)."""
     def __init__(self):
@@ -47,8 +182,9 @@ class RealGmailService(IEmailService):
         self.sender = os.getenv("SMTP_SENDER") or self.username
         self.security = os.getenv("SMTP_SECURITY", "SSL").upper()
         self.timeout = int(os.getenv("EMAIL_TIMEOUT", "10"))
+        self.pool = get_pool(self.smtp_host, self.port, self.security, self.username, self.password, self.timeout)
 
-    def send_email(self, recipients: List[str], subject: str, body_html: str, attachments: Optional[List[str]] = None) -> Tuple[bool, Optional[str]]:
+    def send_email(self, recipients: List[str], subject: str, body_html: str, attachments: Optional[List[Attachment]] = None) -> Tuple[bool, Optional[str]]:
         if not self.username or not self.password:
              return False, "Missing SMTP_USERNAME or SMTP_PASSWORD in environment."
 
@@ -59,37 +195,42 @@ class RealGmailService(IEmailService):
         msg.set_content(body_html, subtype="html")
 
         if attachments:
-            for fp in attachments:
-                if not os.path.isfile(fp):
-                    return False, f"Attachment not found: {fp}"
-                ctype, encoding = mimetypes.guess_type(fp)
+            for attachment in attachments:
+                # Either a file path or an in-memory (filename, content) pair.
+                if isinstance(attachment, tuple):
+                    filename, data = attachment
+                else:
+                    fp = attachment
+                    if not os.path.isfile(fp):
+                        return False, f"Attachment not found: {fp}"
+                    filename = os.path.basename(fp)
+                    try:
+                        with open(fp, "rb") as f:
+                            data = f.read()
+                    except Exception as e:
+                        return False, f"Failed to attach {fp}: {e}"
+                ctype, encoding = mimetypes.guess_type(filename)
                 if ctype is None:
                     ctype = "application/octet-stream"
                 maintype, subtype = ctype.split("/", 1)
-                try:
-                    with open(fp, "rb") as f:
-                        data = f.read()
-                    msg.add_attachment(data, maintype=maintype, subtype=subtype, filename=os.path.basename(fp))
-                except Exception as e:
-                    return False, f"Failed to attach {fp}: {e}"
+                msg.add_attachment(data, maintype=maintype, subtype=subtype, filename=filename)
 
         try:
-            if self.security == "SSL":
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(self.smtp_host, self.port, context=context, timeout=self.timeout) as server:
-                    server.login(self.username, self.password)
-                    server.send_message(msg)
-            elif self.security == "STARTTLS":
-                with smtplib.SMTP(self.smtp_host, self.port, timeout=self.timeout) as server:
-                    server.ehlo()
-                    server.starttls(context=ssl.create_default_context())
-                    server.ehlo()
-                    server.login(self.username, self.password)
-                    server.send_message(msg)
-            else:
-                 with smtplib.SMTP(self.smtp_host, self.port, timeout=self.timeout) as server:
-                    server.login(self.username, self.password)
+            # A pooled session can die between the NOOP check and the send; retry once on a fresh one.
+            for attempt in range(2):
+                server = self.pool.acquire()
+                try:
                     server.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    self.pool.discard(server)
+                    if attempt:
+                        raise
+                    continue
+                except Exception:
+                    self.pool.discard(server)
+                    raise
+                self.pool.release(server)
+                break
             return True, None
         except smtplib.SMTPAuthenticationError:
             return False, "Authentication failed. Check username/app password."
@@ -101,7 +242,7 @@ class GmailProxy(IEmailService):
     def __init__(self):
         self._real_service = RealGmailService()
 
-    def send_email(self, recipients: List[str], subject: str, body_html: str, attachments: Optional[List[str]] = None) -> Tuple[bool, Optional[str]]:
+    def send_email(self, recipients: List[str], subject: str, body_html: str, attachments: Optional[List[Attachment]] = None) -> Tuple[bool, Optional[str]]:
         print(f"[GmailProxy] Sending email to {recipients} with subject '{subject}'...")
         if not recipients:
              return False, "No recipients provided"
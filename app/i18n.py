@@ -0,0 +1,246 @@
+"""
+Server-side locale negotiation and per-page translation payloads.
+
+`static/ext-module-i18n.js` used to fetch a whole 19-22 KB `static/locales/<locale>.json`
+after load and then rewrite every `data-i18n` element, so pages painted their
+placeholder keys first and re-laid out once the file arrived. Now the app
+negotiates the locale per request (the `locale` cookie written by the language
+switcher, then `Accept-Language`, then DEFAULT_LOCALE) and:
+
+- renders the translated text into the `data-i18n` elements of the page, so
+  the first paint is already in the right language (PageCache keeps one copy
+  per locale, so this runs once per page and locale);
+- inlines, via `i18n_payload('<page>')`, only the keys that page uses as a
+  `<script type="application/json" id="i18n-payload">` block, plus the URLs of
+  the same subset in the other locales for the language switcher. Those are
+  served at `/i18n/<page>/<locale>.<hash>.json` with immutable caching.
+
+Locale files are parsed and the per-page subsets computed once per process (in
+the gunicorn master, before workers fork); in debug mode they are rebuilt
+when a locale file or template changes. Keys missing from a locale fall back to
+DEFAULT_LOCALE.
+"""
+import os
+import re
+import copy
+import json
+import html
+import hashlib
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from flask import Flask, abort, current_app, g, request, url_for
+from markupsafe import Markup
+
+LOCALES_DIR = "locales"
+DEFAULT_LOCALE = "en-US"
+LOCALE_COOKIE = "locale"
+PAYLOAD_ID = "i18n-payload"
+IMMUTABLE_MAX_AGE = 31536000  # one year
+HASH_LENGTH = 12
+
+_KEY_CANDIDATE = re.compile(r"[A-Za-z_][\w-]*(?:\.[A-Za-z0-9_][\w-]*)+")
+# `<tag ... data-i18n="key" ...>text</tag>`; the templates only put plain text inside these elements.
+_I18N_ELEMENT = re.compile(r"(<([A-Za-z][\w-]*)\b[^>]*?\sdata-i18n=\"([^\"]+)\"[^>]*>)([^<]*)(</\2>)")
+
+
+class Payload(NamedTuple):
+    data: Dict
+    json: str
+    digest: str
+
+
+def flatten(tree: Dict, prefix: str = "") -> Dict[str, object]:
+    """`{"nav": {"home": "Home"}}` -> `{"nav": {...}, "nav.home": "Home"}` (subtrees included)."""
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        flat[path] = value
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+    return flat
+
+
+def used_keys(sources: Iterable[str], known: Set[str]) -> Set[str]:
+    """Dotted keys (leaves or whole subtrees) that appear anywhere in the given template/script sources."""
+    keys = set()
+    for source in sources:
+        keys.update(token for token in _KEY_CANDIDATE.findall(source) if token in known)
+    return keys
+
+
+def subset(translations: Dict, fallback: Dict, keys: Iterable[str]) -> Dict:
+    """Nested dict holding only `keys`, each taken from `translations` or else `fallback`."""
+    flat, flat_fallback = flatten(translations), flatten(fallback)
+    out: Dict = {}
+    for key in sorted(keys):
+        value = flat.get(key, flat_fallback.get(key))
+        if value is None:
+            continue
+        node = out
+        parts = key.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        # Copied: a whole subtree may later receive fallback leaves.
+        node[parts[-1]] = copy.deepcopy(value)
+    return out
+
+
+def localize(markup: str, translations: Dict) -> str:
+    """Put the translated text into every `data-i18n` element (what applyTranslations does in the browser)."""
+    flat = flatten(translations)
+
+    def element(match):
+        value = flat.get(match.group(3))
+        if value is None or isinstance(value, dict):
+            return match.group(0)
+        return f"{match.group(1)}{value}{match.group(5)}"
+
+    return _I18N_ELEMENT.sub(element, markup)
+
+
+class I18n:
+    """Locale negotiation plus precomputed per-page translation payloads."""
+
+    def __init__(self, app: Optional[Flask] = None, default: str = DEFAULT_LOCALE):
+        self.default = default
+        self.locales_dir = ""
+        self.template_folder = ""
+        self.script_dirs: List[str] = []
+        self.locales: Dict[str, Dict] = {}
+        # (page, locale) -> payload
+        self.payloads: Dict[Tuple[str, str], Payload] = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        static = os.path.abspath(app.static_folder)
+        self.locales_dir = os.path.join(static, LOCALES_DIR)
+        self.template_folder = os.path.abspath(os.path.join(app.root_path, app.template_folder))
+        self.script_dirs = [static, os.path.join(static, "js")]
+        self.load()
+        app.add_template_global(self.negotiate, "current_locale")
+        app.add_template_global(self.payload_tag, "i18n_payload")
+        app.add_url_rule("/i18n/<page>/<locale>.<digest>.json", "i18n_payload", self.send)
+        app.after_request(self._vary)
+        app.extensions["i18n"] = self
+
+    # --- Loading ---------------------------------------------------------------------
+
+    def _files(self) -> List[str]:
+        files = []
+        for directory in [self.locales_dir, self.template_folder] + self.script_dirs:
+            if os.path.isdir(directory):
+                files += [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                          if name.endswith((".json", ".html", ".js"))]
+        return files
+
+    def _stamp_now(self) -> Tuple:
+        stamp = []
+        for path in self._files():
+            try:
+                stamp.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                pass
+        return tuple(stamp)
+
+    def load(self) -> None:
+        """Parse every locale file once and compute the payload of each page template in each locale."""
+        locales = {}
+        for name in sorted(os.listdir(self.locales_dir)) if os.path.isdir(self.locales_dir) else []:
+            if name.endswith(".json"):
+                with open(os.path.join(self.locales_dir, name), "r", encoding="utf-8") as f:
+                    locales[name[:-5]] = json.load(f)
+        scripts = []
+        for directory in self.script_dirs:
+            if os.path.isdir(directory):
+                for name in sorted(os.listdir(directory)):
+                    if name.endswith(".js"):
+                        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                            scripts.append(f.read())
+        fallback = locales.get(self.default, {})
+        known = set()
+        for translations in locales.values():
+            known |= set(flatten(translations))
+        payloads = {}
+        for name in sorted(os.listdir(self.template_folder)) if os.path.isdir(self.template_folder) else []:
+            if not name.endswith(".html"):
+                continue
+            with open(os.path.join(self.template_folder, name), "r", encoding="utf-8") as f:
+                keys = used_keys([f.read()] + scripts, known)
+            for locale, translations in locales.items():
+                data = subset(translations, fallback, keys)
+                encoded = json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+                digest = hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+                payloads[(name[:-5], locale)] = Payload(data, encoded, digest)
+        with self._lock:
+            self.locales, self.payloads = locales, payloads
+            self._stamp = self._stamp_now()
+
+    def _refresh(self) -> None:
+        # Debug mode: pick up edited locale files, templates and scripts without a restart.
+        if current_app.debug and self._stamp_now() != self._stamp:
+            self.load()
+
+    # --- Requests --------------------------------------------------------------------
+
+    def negotiate(self) -> str:
+        """Locale for the current request: cookie, then Accept-Language, then the default (cached on `g`)."""
+        if "locale" not in g:
+            self._refresh()
+            cookie = request.cookies.get(LOCALE_COOKIE)
+            if cookie in self.locales:
+                g.locale = cookie
+            else:
+                g.locale = request.accept_languages.best_match(list(self.locales), self.default) or self.default
+        return g.locale
+
+    def payload(self, page: str, locale: Optional[str] = None) -> Optional[Payload]:
+        return self.payloads.get((page, locale or self.negotiate()))
+
+    def payload_url(self, page: str, locale: str) -> Optional[str]:
+        payload = self.payloads.get((page, locale))
+        if payload is None:
+            return None
+        return url_for("i18n_payload", page=page, locale=locale, digest=payload.digest)
+
+    def payload_tag(self, page: str) -> Markup:
+        """Template helper: the page's keys in the negotiated locale, plus URLs for the other locales."""
+        locale = self.negotiate()
+        payload = self.payload(page, locale)
+        if payload is None:
+            return Markup("")
+        urls = {other: self.payload_url(page, other) for other in sorted(self.locales) if other != locale}
+        # `<` escaped so a translation can never close the script element.
+        body = payload.json.replace("<", "\\u003c")
+        return Markup(f'<script type="application/json" id="{PAYLOAD_ID}" data-locale="{html.escape(locale)}" '
+                      f'data-urls="{html.escape(json.dumps(urls, separators=(",", ":")))}">{body}</script>')
+
+    def localize(self, page: str, markup: str) -> str:
+        """The rendered page with its `data-i18n` elements translated into the negotiated locale."""
+        payload = self.payload(page)
+        return localize(markup, payload.data) if payload is not None else markup
+
+    def send(self, page: str, locale: str, digest: str):
+        payload = self.payloads.get((page, locale))
+        if payload is None:
+            abort(404)
+        response = current_app.response_class(payload.json, mimetype="application/json")
+        response.set_etag(payload.digest)
+        if digest == payload.digest:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # An outdated hash still gets the current subset, but only until the next revalidation.
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _vary(response):
+        if response.mimetype == "text/html":
+            response.vary.add("Accept-Language")
+            response.vary.add("Cookie")
+        return response
@@ -0,0 +1,230 @@
+"""
+JSON intake API validated by schemas compiled from `static/forms/*.json`.
+
+Each schema file (`criminal-en.json`, `personal_injury-kr.json`, ...) lists its
+fields with `id`, `type`, `required` and, for radio/checkbox fields, `options`.
+At startup every schema is compiled once into a chain of small validator
+closures, so checking a submission is a dict walk with no per-request WTForms
+objects (form instance, bound fields, meta, CSRF). `AutoAccidentWizardForm` has
+no schema file; its schema is derived from the form class so the wizard can
+post the same data over XHR.
+
+`POST /api/intake/<form>` accepts one JSON object, a JSON array of objects, or
+`{"submissions": [...]}`. Batches (up to INTAKE_MAX_BATCH) need a partner key from
+INTAKE_API_KEYS in the API_KEY_HEADER header; anonymous callers send one submission
+per request. Admission control charges one token per submission, so a batch
+costs what the same submissions would cost one by one. `<form>` is a schema name
+(`criminal-kr`) or a form type (`criminal` uses the `-en` schema); the stored
+form type never includes the language suffix. Valid submissions go through
+`save_submission`, exactly like the HTML forms. Unknown fields are dropped.
+"""
+import os
+import re
+import hmac
+import json
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from wtforms import BooleanField, DateField, EmailField, RadioField, SelectField, TelField, TextAreaField
+from wtforms.validators import DataRequired
+
+FORMS_DIR = "forms"
+DEFAULT_LANGUAGE = "en"
+INTAKE_MAX_BATCH = int(os.getenv("INTAKE_MAX_BATCH", "50"))
+# Comma-separated partner keys allowed to post batches.
+INTAKE_API_KEYS = [key.strip() for key in os.getenv("INTAKE_API_KEYS", "").split(",") if key.strip()]
+API_KEY_HEADER = "X-API-Key"
+MAX_FIELD_LENGTH = 5000
+
+# Same shape as WTForms' Email() check without the DNS/IDNA work: one @, a dot in the domain, no spaces.
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_TRUE = {"y", "yes", "on", "true", "1"}
+
+# (cleaned value, error message or None)
+Check = Callable[[object], Tuple[object, Optional[str]]]
+
+
+def _text(field: Dict) -> Check:
+    required = field.get("required", False)
+
+    def check(value):
+        if value is None:
+            value = ""
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            return None, "Must be a string."
+        value = str(value).strip()
+        if len(value) > MAX_FIELD_LENGTH:
+            return None, f"Must be at most {MAX_FIELD_LENGTH} characters."
+        if required and not value:
+            return None, "This field is required."
+        return value, None
+
+    return check
+
+
+def _email(field: Dict) -> Check:
+    text = _text(field)
+
+    def check(value):
+        value, error = text(value)
+        if error is None and value and not _EMAIL.match(value):
+            return None, "Invalid email address."
+        return value, error
+
+    return check
+
+
+def _date(field: Dict) -> Check:
+    text = _text(field)
+
+    def check(value):
+        value, error = text(value)
+        if error is not None or not value:
+            return (None if error else ""), error
+        try:
+            return date.fromisoformat(value), None
+        except ValueError:
+            return None, "Not a valid date value (YYYY-MM-DD)."
+
+    return check
+
+
+def _choice(field: Dict) -> Check:
+    text = _text(field)
+    options = frozenset(field.get("options") or ())
+
+    def check(value):
+        value, error = text(value)
+        if error is None and value and options and value not in options:
+            return None, "Not a valid choice."
+        return value, error
+
+    return check
+
+
+def _checkbox(field: Dict) -> Check:
+    required = field.get("required", False)
+    # A single-option checkbox may be submitted with its option text, as an HTML form would.
+    accepted = _TRUE | {str(option).lower() for option in field.get("options") or ()}
+
+    def check(value):
+        checked = value is True or (isinstance(value, (str, int)) and not isinstance(value, bool)
+                                    and str(value).strip().lower() in accepted)
+        if required and not checked:
+            return None, "This field is required."
+        return checked, None
+
+    return check
+
+
+COMPILERS: Dict[str, Callable[[Dict], Check]] = {
+    "text": _text,
+    "textarea": _text,
+    "tel": _text,
+    "email": _email,
+    "date": _date,
+    "radio": _choice,
+    "select": _choice,
+    "checkbox": _checkbox,
+}
+
+
+def compile_schema(schema: Dict) -> Callable[[Dict], Tuple[Dict, Dict[str, str]]]:
+    """Compile a form schema into `validate(payload) -> (data, errors)`."""
+    checks = []
+    for field in schema["fields"]:
+        compiler = COMPILERS.get(field.get("type", "text"))
+        if compiler is None:
+            raise ValueError(f"Field '{field['id']}' has unsupported type '{field.get('type')}'")
+        checks.append((field["id"], compiler(field)))
+
+    def validate(payload: Dict) -> Tuple[Dict, Dict[str, str]]:
+        data, errors = {}, {}
+        for name, check in checks:
+            value, error = check(payload.get(name))
+            if error is None:
+                data[name] = value
+            else:
+                errors[name] = error
+        return data, errors
+
+    return validate
+
+
+def schema_from_form(form_class) -> Dict:
+    """A schema with the fields of a FlaskForm class (for forms without a static/forms file)."""
+    fields = []
+    for name, unbound in form_class.__dict__.items():
+        field_class = getattr(unbound, "field_class", None)
+        if field_class is None:
+            continue
+        kwargs = unbound.kwargs
+        validators = kwargs.get("validators") or (unbound.args[1] if len(unbound.args) > 1 else [])
+        field = {"id": name, "label": kwargs.get("label", unbound.args[0] if unbound.args else name),
+                 "required": any(isinstance(v, DataRequired) for v in validators)}
+        if issubclass(field_class, EmailField):
+            field["type"] = "email"
+        elif issubclass(field_class, DateField):
+            field["type"] = "date"
+        elif issubclass(field_class, BooleanField):
+            field["type"] = "checkbox"
+        elif issubclass(field_class, (RadioField, SelectField)):
+            field["type"] = "radio"
+            field["options"] = [value for value, _ in kwargs.get("choices", [])]
+        elif issubclass(field_class, TextAreaField):
+            field["type"] = "textarea"
+        elif issubclass(field_class, TelField):
+            field["type"] = "tel"
+        else:
+            field["type"] = "text"
+        fields.append(field)
+    return {"form_title": form_class.__name__, "fields": fields}
+
+
+class IntakeSchemas:
+    """Compiled validators by schema name, loaded once per process."""
+
+    def __init__(self, forms_dir: str, extra: Optional[Dict[str, Dict]] = None):
+        self.validators: Dict[str, Callable] = {}
+        self.form_types: Dict[str, str] = {}
+        schemas = {}
+        if os.path.isdir(forms_dir):
+            for name in sorted(os.listdir(forms_dir)):
+                if name.endswith(".json"):
+                    with open(os.path.join(forms_dir, name), "r", encoding="utf-8") as f:
+                        schemas[name[:-5]] = json.load(f)
+        schemas.update(extra or {})
+        for name, schema in schemas.items():
+            self.validators[name] = compile_schema(schema)
+            self.form_types[name] = name.rsplit("-", 1)[0] if "-" in name else name
+
+    def resolve(self, form: str) -> Optional[str]:
+        """Schema name for `criminal-kr`, or for a bare form type (`criminal` -> `criminal-en`)."""
+        if form in self.validators:
+            return form
+        fallback = f"{form}-{DEFAULT_LANGUAGE}"
+        return fallback if fallback in self.validators else None
+
+    def validate(self, name: str, payload: Dict) -> Tuple[Dict, Dict[str, str]]:
+        if not isinstance(payload, dict):
+            return {}, {"_": "Each submission must be a JSON object."}
+        return self.validators[name](payload)
+
+
+def api_key_valid(presented: Optional[str], keys: Optional[List[str]] = None) -> bool:
+    """Whether `presented` is one of the partner keys (constant-time comparison)."""
+    keys = INTAKE_API_KEYS if keys is None else keys
+    if not presented:
+        return False
+    presented = presented.encode("utf-8")
+    return any(hmac.compare_digest(presented, key.encode("utf-8")) for key in keys)
+
+
+def submissions_from(body) -> Optional[List]:
+    """The list of submissions in a request body (object, array, or {"submissions": [...]})."""
+    if isinstance(body, list):
+        return body
+    if isinstance(body, dict):
+        batch = body.get("submissions")
+        return batch if isinstance(batch, list) else [body]
+    return None
@@ -0,0 +1,378 @@
+"""
+Request and submission-phase metrics shared across processes.
+
+Every process (each gunicorn worker, the outbox delivery worker) keeps its
+counters and histograms in memory and a background thread writes them to
+`METRICS_DIR/<pid>-<random>.json` every METRICS_FLUSH_INTERVAL seconds
+(atomic replace, only when something changed). `GET /metrics` merges every
+process file into the Prometheus text format, so the numbers cover all workers
+and survive worker recycling (`MAX_REQUESTS`): files of exited processes are
+folded into `archive.json`. The launcher clears the directory when it starts.
+
+- `http_requests_total{route,method,status}` and
+  `http_request_duration_seconds{route,method}`: recorded by `Metrics`, a WSGI
+  wrapper around the whole app (including the StaticFiles layer). `route` is
+  the URL rule (`/static/<path:filename>`), never the raw path. Flask's matched
+  rule (or the one StaticFiles stood in for) is left in the environ under
+  ROUTE_KEY, so the URL is never matched a second time.
+- `submission_phase_duration_seconds{phase}`: the steps of save_submission
+  (prepare, store, render_html, enqueue) and of delivery (json, csv,
+  smtp_send), timed with `with timed("store"): ...`.
+
+Responses carry `Server-Timing: app;dur=<ms>` plus the phases that ran during
+the request, so browser dev tools show them. The time to first byte of each
+process's first request is kept in `first_request_seconds{route}` (and logged),
+to see the cold-start cost after a deploy or worker recycle. /metrics requires
+`Authorization: Bearer <METRICS_TOKEN>`, and is a 404 while no token is set.
+
+Command-line interface
+    python -m app metrics    # print the merged metrics
+"""
+import os
+import hmac
+import json
+import time
+import uuid
+import atexit
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, abort, has_request_context, request
+
+try:
+    import fcntl  # Optional: folds the files of exited workers into one (POSIX)
+except ImportError:
+    fcntl = None
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join("submissions", "metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Upper bounds in seconds; the +Inf bucket is implicit.
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+HELP = {
+    "http_requests_total": ("counter", "Requests by URL rule, method and status."),
+    "http_request_duration_seconds": ("histogram", "Time to produce the response, by URL rule and method."),
+    "submission_phase_duration_seconds": ("histogram", "Time spent in each step of saving and delivering a submission."),
+    "first_request_seconds": ("histogram", "Time to first byte of the first request each process served after boot."),
+    "admission_requests_total": ("counter", "Submission requests by endpoint and admission result (admitted or the rejection reason)."),
+    "static_cache_requests_total": ("counter", "Static files answered in front of Flask by cache result (hit, miss, uncached) or handed to Flask (stale, passthrough)."),
+    "static_cache_evictions_total": ("counter", "Files evicted from the static hot-file cache (it is full: raise STATIC_CACHE_BYTES)."),
+}
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = ".lock"
+TIMINGS_KEY = "metrics.timings"
+# URL rule of the request: set at teardown for Flask requests, and by layers that answer before
+# Flask routing (StaticFiles) to the rule they stand in for.
+ROUTE_KEY = "metrics.route"
+UNMATCHED = "<unmatched>"
+
+
+class Registry:
+    """In-process counters and histograms, flushed to a per-process file."""
+
+    def __init__(self, directory: str = METRICS_DIR, interval: float = METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        # name -> labels (tuple of pairs) -> value, or [bucket counts..., +Inf count, sum]
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        self.histograms: Dict[str, Dict[Tuple, List[float]]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pid = None
+        self._file = ""
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+            self._dirty = True
+        self._ensure_flusher()
+
+    def observe(self, name: str, labels: Dict[str, str], seconds: float) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * (len(BUCKETS) + 2)
+            # Non-cumulative per bucket here; cumulated when exported.
+            values[bisect_left(BUCKETS, seconds)] += 1
+            values[-1] += seconds
+            self._dirty = True
+        self._ensure_flusher()
+
+    # --- Files -----------------------------------------------------------------------
+
+    def _ensure_flusher(self) -> None:
+        # Threads do not survive fork, so every worker starts its own (and drops the master's numbers).
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self.counters, self.histograms = {}, {}
+            self._pid = pid
+            # Unique per process, so a recycled pid never overwrites a dead worker's numbers.
+            self._file = f"{pid}-{uuid.uuid4().hex[:8]}.json"
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Could not write metrics: {e}")
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or self._pid != os.getpid():
+                return
+            snapshot = _snapshot(self.counters, self.histograms)
+            self._dirty = False
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json_atomic(os.path.join(self.directory, self._file), snapshot)
+
+    @contextmanager
+    def _directory_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _process_files(self) -> List[str]:
+        names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+        return sorted(name for name in names if name.endswith(".json") and name != ARCHIVE_FILE)
+
+    def compact(self) -> int:
+        """Fold the files of exited processes into ARCHIVE_FILE (POSIX only); returns how many."""
+        if fcntl is None:
+            return 0
+        dead = []
+        for name in self._process_files():
+            try:
+                os.kill(int(name.split("-", 1)[0]), 0)
+            except ProcessLookupError:
+                dead.append(name)
+            except (ValueError, OSError):
+                continue
+        if not dead:
+            return 0
+        with self._directory_lock(exclusive=True):
+            counters, histograms = _load(os.path.join(self.directory, ARCHIVE_FILE))
+            for name in dead:
+                _add(counters, histograms, *_load(os.path.join(self.directory, name)))
+            _write_json_atomic(os.path.join(self.directory, ARCHIVE_FILE), _snapshot(counters, histograms))
+            for name in dead:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        return len(dead)
+
+    def merged(self) -> Tuple[Dict, Dict]:
+        """(counters, histograms) summed over every process file in the directory."""
+        self.flush()
+        self.compact()
+        counters: Dict[str, Dict[Tuple, float]] = {}
+        histograms: Dict[str, Dict[Tuple, List[float]]] = {}
+        with self._directory_lock(exclusive=False):
+            for name in [ARCHIVE_FILE] + self._process_files():
+                _add(counters, histograms, *_load(os.path.join(self.directory, name)))
+        return counters, histograms
+
+    def clear(self) -> None:
+        """Remove every process file (the launcher does this at startup)."""
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith((".json", ".tmp")):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+
+def _snapshot(counters: Dict, histograms: Dict) -> Dict:
+    return {
+        "counters": {name: [[list(key), value] for key, value in series.items()] for name, series in counters.items()},
+        "histograms": {name: [[list(key), list(values)] for key, values in series.items()]
+                       for name, series in histograms.items()},
+    }
+
+
+def _load(path: str) -> Tuple[Dict, Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}
+    counters = {name: {tuple(tuple(pair) for pair in key): value for key, value in series}
+                for name, series in snapshot.get("counters", {}).items()}
+    histograms = {name: {tuple(tuple(pair) for pair in key): values for key, values in series}
+                  for name, series in snapshot.get("histograms", {}).items()}
+    return counters, histograms
+
+
+def _add(counters: Dict, histograms: Dict, more_counters: Dict, more_histograms: Dict) -> None:
+    for name, series in more_counters.items():
+        target = counters.setdefault(name, {})
+        for key, value in series.items():
+            target[key] = target.get(key, 0) + value
+    for name, series in more_histograms.items():
+        target = histograms.setdefault(name, {})
+        for key, values in series.items():
+            target[key] = [a + b for a, b in zip(target[key], values)] if key in target else list(values)
+
+
+def _write_json_atomic(path: str, data: Dict) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: Tuple, le: Optional[str] = None) -> str:
+    pairs = list(key) + ([("le", le)] if le is not None else [])
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def exposition(registry: Registry = REGISTRY) -> str:
+    """Merged metrics in the Prometheus text format (version 0.0.4)."""
+    counters, histograms = registry.merged()
+    lines = []
+    for name in sorted(set(counters) | set(histograms)):
+        kind, text = HELP.get(name, ("counter" if name in counters else "histogram", name))
+        lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+        for key, value in sorted(counters.get(name, {}).items()):
+            lines.append(f"{name}{_labels(key)} {value:g}")
+        for key, values in sorted(histograms.get(name, {}).items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ["+Inf"], values[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(key, str(bound))} {cumulative:g}")
+            lines.append(f"{name}_sum{_labels(key)} {values[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(key)} {cumulative:g}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def timed(phase: str, registry: Registry = REGISTRY):
+    """Time one phase of saving/delivering a submission (and add it to Server-Timing inside a request)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("submission_phase_duration_seconds", {"phase": phase}, elapsed)
+        if has_request_context():
+            timings = request.environ.get(TIMINGS_KEY)
+            if timings is not None:
+                timings.append((phase, elapsed))
+
+
+class Metrics:
+    """WSGI wrapper recording per-route latency and counts, plus the `/metrics` endpoint."""
+
+    def __init__(self, app: Optional[Flask] = None, registry: Registry = REGISTRY):
+        self.registry = registry
+        self.app: Optional[Flask] = None
+        self.wsgi_app = None
+        self._first_request_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        # Install last, so the timing covers every other WSGI layer (e.g. StaticFiles).
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+        app.add_url_rule("/metrics", "metrics", self.endpoint)
+        app.teardown_request(self._remember_route)
+        app.extensions["metrics"] = self
+
+    def endpoint(self):
+        if not METRICS_TOKEN:
+            # Never public: without a token the endpoint does not exist (`python -m app metrics` still works).
+            abort(404)
+        presented = request.headers.get("Authorization", "").encode("utf-8")
+        if not hmac.compare_digest(presented, f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+            abort(401)
+        response = self.app.response_class(exposition(self.registry), mimetype="text/plain")
+        response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        response.cache_control.no_store = True
+        return response
+
+    def _remember_route(self, exc=None) -> None:
+        # Flask unbinds its request (and the matched rule) from the environ when the context ends.
+        if request.url_rule is not None:
+            request.environ[ROUTE_KEY] = request.url_rule.rule
+
+    def _route(self, environ) -> str:
+        return environ.get(ROUTE_KEY, UNMATCHED)
+
+    def _claim_first_request(self) -> bool:
+        """True for exactly one request per process (workers are forked after the master imported the app)."""
+        pid = os.getpid()
+        if self._first_request_pid == pid:
+            return False
+        with self._lock:
+            if self._first_request_pid == pid:
+                return False
+            self._first_request_pid = pid
+            return True
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        timings: List[Tuple[str, float]] = []
+        environ[TIMINGS_KEY] = timings
+        status_code = ["500"]
+        first_byte = [0.0]
+        first = self._claim_first_request()
+
+        def timed_start_response(status, headers, exc_info=None):
+            status_code[0] = status.split(" ", 1)[0]
+            first_byte[0] = time.perf_counter() - start
+            entries = [f"app;dur={1000 * first_byte[0]:.1f}"]
+            entries += [f"{phase};dur={1000 * seconds:.1f}" for phase, seconds in timings]
+            headers = list(headers) + [("Server-Timing", ", ".join(entries))]
+            return start_response(status, headers, exc_info) if exc_info else start_response(status, headers)
+
+        try:
+            # The body is returned untouched: wrapping it would hide wsgi.file_wrapper (sendfile) from the server.
+            return self.wsgi_app(environ, timed_start_response)
+        finally:
+            route = self._route(environ)
+            method = environ.get("REQUEST_METHOD", "GET")
+            self.registry.observe("http_request_duration_seconds", {"route": route, "method": method},
+                                  time.perf_counter() - start)
+            self.registry.inc("http_requests_total", {"route": route, "method": method, "status": status_code[0]})
+            if first:
+                # Cold-start cost: template compilation, lazy imports, connections (see app/templatecache.py).
+                self.registry.observe("first_request_seconds", {"route": route}, first_byte[0])
+                print(f"First request of process {os.getpid()}: {method} {environ.get('PATH_INFO', '')} "
+                      f"{status_code[0]}, {1000 * first_byte[0]:.1f} ms to first byte")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    print(exposition(), end="")
+    return 0
@@ -0,0 +1,381 @@
+"""
+Durable on-disk outbox for submission emails.
+
+`save_submission` enqueues a job here and returns immediately; a separate
+delivery worker (started by the launcher, or via `python -m app outbox worker`)
+drains the queue with retries and exponential backoff.
+
+Layout (one JSON file per job, moved between folders with atomic renames):
+
+    submissions/outbox/
+        pending/      jobs waiting for delivery (or for their next retry)
+        processing/   jobs claimed by a worker
+        dead/         jobs that exhausted OUTBOX_MAX_ATTEMPTS
+
+Command-line interface
+    python -m app outbox status             # job counts per folder
+    python -m app outbox list [--state S]   # list jobs in a folder (default: pending)
+    python -m app outbox show <id>          # dump a single job
+    python -m app outbox replay <id>... | --all   # move dead jobs back to pending
+    python -m app outbox drain              # deliver every due job once (flushing digests), then exit
+    python -m app outbox worker             # run the delivery loop forever
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import argparse
+import subprocess
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .store import get_store
+from .digest import DigestPolicy, build_digest
+from .artifacts import email_attachments
+from .gmailproxy import GmailProxy, IEmailService
+from .metrics import timed
+
+OUTBOX_DIR = os.getenv("OUTBOX_DIR", os.path.join("submissions", "outbox"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+BASE_DELAY = float(os.getenv("OUTBOX_BASE_DELAY", "30"))
+MAX_DELAY = float(os.getenv("OUTBOX_MAX_DELAY", "3600"))
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+# A job left in processing/ longer than this is assumed to belong to a crashed worker.
+STALE_AFTER = float(os.getenv("OUTBOX_STALE_AFTER", "300"))
+
+STATES = ("pending", "processing", "dead")
+
+
+def _write_json_atomic(path: str, data: Dict) -> None:
+    """Write JSON to a temp file in the same folder, fsync, then rename over `path`."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Outbox:
+    """Persistent job queue backed by plain folders."""
+
+    def __init__(self, root: Optional[str] = None, max_attempts: int = MAX_ATTEMPTS,
+                 base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY):
+        self.root = root or OUTBOX_DIR
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        for state in STATES:
+            os.makedirs(self._dir(state), exist_ok=True)
+
+    def _dir(self, state: str) -> str:
+        return os.path.join(self.root, state)
+
+    def _path(self, state: str, job_id: str) -> str:
+        return os.path.join(self._dir(state), f"{job_id}.json")
+
+    # --- Producer side ---------------------------------------------------
+
+    def enqueue(self, recipients: List[str], subject: str, body_html: str,
+                attachments: Optional[List[str]] = None, **meta) -> str:
+        """Persist a new email job and return its id. Extra keyword arguments are stored as metadata."""
+        # Time-ordered ids keep `ls` and the worker's scan order FIFO.
+        job_id = f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        now = time.time()
+        job = {
+            "id": job_id,
+            "created_at": now,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "last_error": None,
+            "recipients": list(recipients),
+            "subject": subject,
+            "body_html": body_html,
+            "attachments": list(attachments or []),
+            "meta": meta,
+        }
+        _write_json_atomic(self._path("pending", job_id), job)
+        return job_id
+
+    # --- Inspection --------------------------------------------------------
+
+    def job_ids(self, state: str = "pending") -> List[str]:
+        names = [n for n in os.listdir(self._dir(state)) if n.endswith(".json")]
+        return sorted(n[:-len(".json")] for n in names)
+
+    def jobs(self, state: str = "pending") -> Iterator[Dict]:
+        for job_id in self.job_ids(state):
+            try:
+                yield _read_json(self._path(state, job_id))
+            except (FileNotFoundError, json.JSONDecodeError):
+                # Claimed or being rewritten by another worker; skip it this round.
+                continue
+
+    def find(self, job_id: str) -> Tuple[Optional[str], Optional[Dict]]:
+        for state in STATES:
+            path = self._path(state, job_id)
+            if os.path.exists(path):
+                return state, _read_json(path)
+        return None, None
+
+    def counts(self) -> Dict[str, int]:
+        return {state: len(self.job_ids(state)) for state in STATES}
+
+    # --- Consumer side -----------------------------------------------------
+
+    def claim(self, job_id: str) -> Optional[Dict]:
+        """Atomically move a pending job into processing/. Returns None if another worker won the race."""
+        src = self._path("pending", job_id)
+        dst = self._path("processing", job_id)
+        try:
+            os.rename(src, dst)
+        except FileNotFoundError:
+            return None
+        # Touch so stale-claim recovery measures time since the claim, not since enqueue.
+        os.utime(dst, None)
+        return _read_json(dst)
+
+    def complete(self, job: Dict) -> None:
+        os.remove(self._path("processing", job["id"]))
+
+    def fail(self, job: Dict, error: str) -> str:
+        """Record a failed attempt; reschedule with exponential backoff or dead-letter the job."""
+        job["attempts"] += 1
+        job["last_error"] = error
+        job["last_attempt_at"] = time.time()
+        if job["attempts"] >= self.max_attempts:
+            state = "dead"
+        else:
+            state = "pending"
+            delay = min(self.base_delay * (2 ** (job["attempts"] - 1)), self.max_delay)
+            job["next_attempt_at"] = time.time() + delay
+        _write_json_atomic(self._path(state, job["id"]), job)
+        os.remove(self._path("processing", job["id"]))
+        return state
+
+    def replay(self, job_id: str) -> bool:
+        """Move a dead job back to pending with a fresh attempt budget."""
+        src = self._path("dead", job_id)
+        if not os.path.exists(src):
+            return False
+        job = _read_json(src)
+        job["attempts"] = 0
+        job["next_attempt_at"] = time.time()
+        _write_json_atomic(self._path("pending", job_id), job)
+        os.remove(src)
+        return True
+
+    def recover_stale(self, older_than: float = STALE_AFTER) -> int:
+        """Return jobs orphaned in processing/ by a crashed worker to pending/."""
+        recovered = 0
+        cutoff = time.time() - older_than
+        for job_id in self.job_ids("processing"):
+            path = self._path("processing", job_id)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                os.rename(path, self._path("pending", job_id))
+                recovered += 1
+            except FileNotFoundError:
+                continue
+        return recovered
+
+    def deliver_due(self, email_service: IEmailService, policy: Optional[DigestPolicy] = None) -> int:
+        """Claim and send every job whose retry time has come. Returns the number of jobs attempted."""
+        policy = policy or DigestPolicy()
+        attempted = 0
+        now = time.time()
+        batchable = []
+        for job in list(self.jobs("pending")):
+            if job.get("next_attempt_at", 0) > now:
+                continue
+            if policy.enabled and not policy.bypasses(job):
+                batchable.append(job)
+                continue
+            job = self.claim(job["id"])
+            if job is None:
+                continue
+            attempted += 1
+            self.deliver(job, email_service)
+
+        # Digest mode: hold batchable jobs until the window elapses or the count threshold is hit.
+        while policy.is_due(batchable, now):
+            batch, batchable = batchable[:policy.max_count], batchable[policy.max_count:]
+            claimed = [job for job in (self.claim(j["id"]) for j in batch) if job is not None]
+            if claimed:
+                attempted += len(claimed)
+                self.deliver_digest(claimed, email_service)
+        return attempted
+
+    def deliver_digest(self, jobs: List[Dict], email_service: IEmailService) -> None:
+        """Send a batch of jobs as one digest message; on failure every job is retried individually."""
+        try:
+            subject, body_html, attachments = build_digest(jobs)
+            recipients = sorted({r for job in jobs for r in job["recipients"]})
+            with timed("smtp_send"):
+                success, error = email_service.send_email(recipients, subject, body_html, attachments)
+        except Exception as e:
+            success, error = False, f"Unexpected error: {e}"
+        for job in jobs:
+            if success:
+                self.complete(job)
+            else:
+                self.fail(job, error or "Unknown error")
+        if success:
+            print(f"[Outbox] Delivered digest of {len(jobs)} job(s)")
+        else:
+            print(f"[Outbox] Digest of {len(jobs)} job(s) failed ({error}); jobs rescheduled")
+
+    def deliver(self, job: Dict, email_service: IEmailService) -> None:
+        try:
+            attachments = job["attachments"] + submission_attachments(job)
+            with timed("smtp_send"):
+                success, error = email_service.send_email(
+                    job["recipients"], job["subject"], job["body_html"], attachments)
+        except Exception as e:
+            success, error = False, f"Unexpected error: {e}"
+        if success:
+            self.complete(job)
+            print(f"[Outbox] Delivered {job['id']}")
+        else:
+            state = self.fail(job, error or "Unknown error")
+            print(f"[Outbox] Attempt {job['attempts']} for {job['id']} failed ({error}); moved to {state}/")
+
+
+def submission_attachments(job: Dict) -> List[Tuple[str, bytes]]:
+    """Render the lead's JSON/CSV attachments from the submission store (falling back to the job's copy)."""
+    meta = job.get("meta") or {}
+    submission = None
+    if meta.get("submission_id"):
+        submission = get_store().get(meta["submission_id"])
+    if submission is None and "data" in meta:
+        submission = {"id": job["id"], "form_type": meta.get("form_type", "submission"), "data": meta["data"]}
+    return email_attachments(submission) if submission else []
+
+
+def run_worker(outbox: Optional[Outbox] = None, poll_interval: float = POLL_INTERVAL) -> None:
+    """Delivery loop: recover orphaned claims, then drain due jobs until interrupted."""
+    outbox = outbox or Outbox()
+    email_service = GmailProxy()
+    policy = DigestPolicy()
+    mode = f"digest (window {policy.window:g}s, max {policy.max_count})" if policy.enabled else "immediate"
+    print(f"[Outbox] Delivery worker {os.getpid()} watching {os.path.abspath(outbox.root)}; mode: {mode}")
+    last_recovery = 0.0
+    while True:
+        if time.time() - last_recovery > STALE_AFTER / 2:
+            recovered = outbox.recover_stale()
+            if recovered:
+                print(f"[Outbox] Recovered {recovered} stale job(s)")
+            last_recovery = time.time()
+        if not outbox.deliver_due(email_service, policy):
+            time.sleep(poll_interval)
+
+
+def start_delivery_worker() -> Optional[subprocess.Popen]:
+    """
+    Spawn the delivery worker as a child process of the launcher.
+
+    A separate process (rather than a thread) keeps SMTP work out of the gunicorn
+    master, which forks request workers. Set OUTBOX_WORKER=0 only when
+    `python -m app outbox worker` runs as its own service on the same disk: it
+    reads the outbox and the submission store, so a separate container (e.g. a
+    Dokku/Heroku process type) needs both on a shared persistent volume.
+    """
+    if os.getenv("OUTBOX_WORKER", "1").lower() in ("0", "false", "no"):
+        return None
+    if getattr(sys, "frozen", False):
+        # PyInstaller bundle: the executable itself understands the `outbox` subcommand.
+        cmd = [sys.executable, "outbox", "worker"]
+    else:
+        cmd = [sys.executable, "-m", "app", "outbox", "worker"]
+    proc = subprocess.Popen(cmd)
+    print(f"Started outbox delivery worker (pid {proc.pid}).")
+
+    def _stop():
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    atexit.register(_stop)
+    return proc
+
+
+def _print_job_line(job: Dict) -> None:
+    created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job.get("created_at", 0)))
+    line = f"{job['id']}  {created}  attempts={job.get('attempts', 0)}  {job.get('subject', '')}"
+    if job.get("last_error"):
+        line += f"  last_error={job['last_error']}"
+    print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app outbox", description="Inspect and drain the email outbox.")
+    parser.add_argument("--dir", help=f"Outbox directory (default: {OUTBOX_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show job counts per folder")
+    p_list = sub.add_parser("list", help="List jobs")
+    p_list.add_argument("--state", choices=STATES, default="pending")
+    p_show = sub.add_parser("show", help="Print a job as JSON")
+    p_show.add_argument("job_id")
+    p_replay = sub.add_parser("replay", help="Move dead jobs back to pending")
+    p_replay.add_argument("job_ids", nargs="*")
+    p_replay.add_argument("--all", action="store_true", help="Replay every dead job")
+    sub.add_parser("drain", help="Deliver all due jobs once and exit")
+    sub.add_parser("worker", help="Run the delivery loop forever")
+    args = parser.parse_args(argv)
+
+    outbox = Outbox(args.dir)
+
+    if args.command == "status":
+        for state, count in outbox.counts().items():
+            print(f"{state:<11} {count}")
+    elif args.command == "list":
+        for job in outbox.jobs(args.state):
+            _print_job_line(job)
+    elif args.command == "show":
+        state, job = outbox.find(args.job_id)
+        if job is None:
+            print(f"Job not found: {args.job_id}")
+            return 1
+        print(f"# state: {state}")
+        print(json.dumps(job, indent=4, ensure_ascii=False))
+    elif args.command == "replay":
+        job_ids = outbox.job_ids("dead") if args.all else args.job_ids
+        if not job_ids:
+            print("Nothing to replay (pass job ids or --all).")
+            return 1
+        failed = 0
+        for job_id in job_ids:
+            if outbox.replay(job_id):
+                print(f"Replayed {job_id}")
+            else:
+                print(f"Not in dead/: {job_id}")
+                failed += 1
+        return 1 if failed else 0
+    elif args.command == "drain":
+        outbox.recover_stale()
+        email_service = GmailProxy()
+        # In digest mode, flush whatever is batched now rather than waiting out the window.
+        policy = DigestPolicy(window=0)
+        total = 0
+        while True:
+            attempted = outbox.deliver_due(email_service, policy)
+            if not attempted:
+                break
+            total += attempted
+        print(f"Attempted {total} job(s); {outbox.counts()}")
+    elif args.command == "worker":
+        try:
+            run_worker(outbox)
+        except KeyboardInterrupt:
+            print("\nOutbox worker stopped.")
+    return 0
@@ -0,0 +1,140 @@
+"""
+Per-worker full-page cache for the GET routes.
+
+The three pages render 25-48 KB templates on every GET, and `index` also builds
+the whole `AutoAccidentWizardForm`, although the only per-request part of the
+output is the CSRF token. `page_cache.render(template, context)` renders once
+per (route, locale, template mtime, static manifests) and stores the HTML split
+around the request's CSRF token; later requests splice their own token into the
+holes without touching Jinja or WTForms (`context` is only called on a miss).
+Pages without a token get a precomputed ETag and answer `If-None-Match` with 304.
+
+Requests with pending flashed messages bypass the cache, since the messages
+are part of the page. Entries are evicted least-recently-used once the cache
+holds more than PAGE_CACHE_BYTES of HTML (0 disables the cache). In debug
+mode template mtimes are checked on every request, so edits show up at once;
+otherwise they are read once per worker.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, current_app, g, make_response, render_template, request, session
+from flask_wtf.csrf import generate_csrf
+
+PAGE_CACHE_BYTES = int(os.getenv("PAGE_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+
+class CachedPage(NamedTuple):
+    parts: List[str]      # the HTML split around the CSRF token (one part: no token)
+    etag: Optional[str]   # content hash, for pages without a token
+    size: int
+
+
+class PageCache:
+    """LRU cache of rendered pages with the CSRF token punched out."""
+
+    def __init__(self, app: Optional[Flask] = None, max_bytes: int = PAGE_CACHE_BYTES,
+                 locale: Callable[[], str] = lambda: "",
+                 transform: Callable[[str, str], str] = lambda page, html: html):
+        self.max_bytes = max_bytes
+        # Locale the page is rendered for; part of the key.
+        self.locale = locale
+        # Applied to each freshly rendered page: (template name without .html, html) -> html.
+        self.transform = transform
+        self.template_folder = ""
+        self._pages: "OrderedDict[Tuple, CachedPage]" = OrderedDict()
+        self._mtimes: Dict[str, float] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.bypasses = self.evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.template_folder = os.path.abspath(os.path.join(app.root_path, app.template_folder))
+        app.extensions["page_cache"] = self
+
+    def template_mtime(self, template: str) -> float:
+        if current_app.debug or template not in self._mtimes:
+            try:
+                self._mtimes[template] = os.stat(os.path.join(self.template_folder, template)).st_mtime_ns
+            except OSError:
+                self._mtimes[template] = 0
+        return self._mtimes[template]
+
+    def key(self, template: str) -> Tuple:
+        # Rebuilt bundles / page stylesheets / image variants change the URLs a page links to.
+        stamps = []
+        for name in ("bundles", "styles", "images"):
+            manifest = current_app.extensions.get(name)
+            if manifest is not None:
+                stamps.append(manifest.stamp())
+        return (request.endpoint, self.locale(), template, self.template_mtime(template), tuple(stamps))
+
+    def _store(self, key: Tuple, page: CachedPage) -> None:
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+            self._pages[key] = page
+            self._size += page.size
+            while self._size > self.max_bytes and self._pages:
+                _, evicted = self._pages.popitem(last=False)
+                self._size -= evicted.size
+                self.evictions += 1
+
+    def _lookup(self, key: Tuple) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def _render(self, template: str, context: Callable[[], Dict]) -> str:
+        return self.transform(os.path.splitext(template)[0], render_template(template, **context()))
+
+    def render(self, template: str, context: Callable[[], Dict] = dict):
+        """Response for a GET of `template`, rendered with `context()` on a cache miss."""
+        if self.max_bytes <= 0 or "_flashes" in session:
+            self.bypasses += 1
+            response = make_response(self._render(template, context))
+            response.headers["X-Page-Cache"] = "bypass"
+            return response
+
+        key = self.key(template)
+        page = self._lookup(key)
+        status = "hit"
+        if page is None:
+            status = "miss"
+            self.misses += 1
+            html = self._render(template, context)
+            # The token rendered into the page, if any (generate_csrf caches it on `g` per request).
+            token = g.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"))
+            parts = html.split(token) if token else [html]
+            etag = hashlib.sha256(html.encode("utf-8")).hexdigest()[:32] if len(parts) == 1 else None
+            page = CachedPage(parts, etag, len(html.encode("utf-8")))
+            self._store(key, page)
+            body = html
+        else:
+            self.hits += 1
+            body = generate_csrf().join(page.parts) if len(page.parts) > 1 else page.parts[0]
+
+        response = make_response(body)
+        response.headers["X-Page-Cache"] = status
+        if page.etag:
+            response.set_etag(page.etag)
+            response.make_conditional(request)
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._mtimes.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._pages), "bytes": self._size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "bypasses": self.bypasses, "evictions": self.evictions}
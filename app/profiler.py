@@ -0,0 +1,411 @@
+"""
+Opt-in profiling of live requests.
+
+`Profiler` wraps the WSGI app and profiles:
+
+- one in PROFILE_SAMPLE_RATE requests (0, the default, disables sampling), and
+- any request carrying a valid `X-Profile-Token` header: `<expiry>.<signature>`,
+  an HMAC-SHA256 of the expiry (unix seconds) keyed with SECRET_KEY, so only
+  someone holding the key can switch it on (`python -m app profile token`).
+  Tokens are refused while SECRET_KEY is the development fallback.
+
+PROFILE_MODE selects the profiler:
+
+- `sampler` (default): a thread reads the request thread's stack every
+  PROFILE_INTERVAL seconds (`sys._current_frames`), so the request itself runs
+  at full speed; the result is a count of samples per stack. The sampler needs
+  the GIL to look, so a CPU-bound request is sampled at most once per
+  `sys.getswitchinterval()` (5 ms by default) whatever the interval.
+- `cprofile`: `cProfile` for the request thread (exact call counts, but every
+  call pays for it); the `.prof` file loads in pstats/snakeviz. cProfile keeps
+  only caller -> callee edges, so its collapsed stacks (in microseconds) are
+  rebuilt from them: each function's own time is split over its callers in
+  proportion to the time spent on each edge, up to the root. That is exact for
+  a call tree, and an estimate where a function is reached by several paths.
+
+Each profile is written to PROFILE_DIR as `<time>-<pid>-<route>.json` (route,
+method, status, worker pid, duration, top functions) plus `.collapsed`
+(`frame;frame;frame count` lines, flamegraph.pl / speedscope ready); only
+the newest PROFILE_KEEP profiles are kept. Profiled responses carry an
+`X-Profile` header naming the file. Requests answered by the StaticFiles layer
+never reach the profiler (it is installed inside it).
+
+Command-line interface
+    python -m app profile token [--ttl 900]             # header value for one request
+    python -m app profile list                          # profiles on disk
+    python -m app profile merge [--route /] [--top 25] [--output all.collapsed]
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import pstats
+import random
+import hashlib
+import cProfile
+import argparse
+import sysconfig
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask
+
+from .metrics import UNMATCHED
+
+PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sampler").lower()
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("submissions", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "500"))
+MODES = ("sampler", "cprofile")
+TOKEN_HEADER = "HTTP_X_PROFILE_TOKEN"
+TOKEN_TTL = 900
+DEV_SECRET_KEY = "dev-secret-key-change-in-prod"
+EXTENSIONS = (".json", ".collapsed", ".prof")
+TOP_FUNCTIONS = 25
+# cprofile mode: deepest caller chain rebuilt, and the smallest share of time (seconds) still split over several callers.
+CPROFILE_MAX_DEPTH = 128
+CPROFILE_MIN_SHARE = 1e-6
+
+if PROFILE_MODE not in MODES:
+    print(f"Ignoring PROFILE_MODE={PROFILE_MODE!r}: expected sampler or cprofile.")
+    PROFILE_MODE = "sampler"
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_labels: Dict[object, str] = {}
+
+
+def _short_path(path: str) -> str:
+    """Project-relative, or relative to site-packages / the standard library."""
+    marker = path.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        path = path[marker + len("site-packages") + 1:]
+    elif path.startswith(_PROJECT_ROOT + os.sep):
+        path = os.path.relpath(path, _PROJECT_ROOT)
+    elif path.startswith(_STDLIB + os.sep):
+        path = os.path.relpath(path, _STDLIB)
+    return path.replace(os.sep, "/")
+
+
+def _label(code) -> str:
+    """`path/to/module.py:function` for a code object (cached)."""
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{_short_path(code.co_filename)}:{code.co_name}"
+    return label
+
+
+def _stack(frame, stop) -> str:
+    """Collapsed stack (root first) of `frame`, up to but excluding the frame `stop`."""
+    labels = []
+    while frame is not None and frame is not stop:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sign(expires: int, secret_key: str) -> str:
+    return hmac.new(secret_key.encode("utf-8"), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def make_token(secret_key: str, ttl: int = TOKEN_TTL) -> str:
+    expires = int(time.time()) + ttl
+    return f"{expires}.{sign(expires, secret_key)}"
+
+
+def verify_token(token: str, secret_key: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, sign(int(expires), secret_key))
+
+
+class _Sampler(threading.Thread):
+    """Samples one thread's stack every `interval` seconds until stopped."""
+
+    def __init__(self, ident: int, stop_frame, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.ident_ = ident
+        self.stop_frame = stop_frame
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.done = threading.Event()
+
+    def run(self) -> None:
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.ident_)
+            if frame is not None:
+                stack = _stack(frame, self.stop_frame)
+                # Once done is set the request has returned and the thread is only waiting for this one.
+                if not self.done.is_set():
+                    self.stacks[stack] += 1
+
+
+def _cprofile_stacks(profile: cProfile.Profile) -> Counter:
+    """Collapsed caller chains (`root;...;function microseconds`) of own time, rebuilt from cProfile's edges."""
+    stats = pstats.Stats(profile).stats
+    labels = {func: f"{_short_path(func[0])}:{func[2]}" for func in stats}
+    seconds: Counter = Counter()
+
+    def climb(path: List, weight: float) -> None:
+        # path runs from the function whose own time is being placed up to its outermost known caller.
+        func = path[-1]
+        edges = [(caller, edge[3]) for caller, edge in stats[func][4].items() if caller in stats and caller not in path]
+        total = sum(spent for _, spent in edges)
+        if not edges or total <= 0 or len(path) >= CPROFILE_MAX_DEPTH:
+            # A root (or a recursion back into the chain).
+            seconds[";".join(labels[f] for f in reversed(path))] += weight
+            return
+        if weight < CPROFILE_MIN_SHARE:
+            # Too little time to be worth splitting: follow the busiest caller only.
+            climb(path + [max(edges, key=lambda edge: edge[1])[0]], weight)
+            return
+        for caller, spent in edges:
+            climb(path + [caller], weight * spent / total)
+
+    for func, (_, _, own, _, callers) in stats.items():
+        if own <= 0:
+            continue
+        # First step by the callee's own time on each edge, then by inclusive time further up.
+        edges = [(caller, edge[2]) for caller, edge in callers.items() if caller in stats and caller != func]
+        total = sum(spent for _, spent in edges)
+        if total <= 0:
+            climb([func], own)
+            continue
+        for caller, spent in edges:
+            climb([func, caller], own * spent / total)
+    stacks: Counter = Counter()
+    for stack, weight in seconds.items():
+        micros = int(round(weight * 1e6))
+        if micros > 0:
+            stacks[stack] = micros
+    return stacks
+
+
+def _self_counts(stacks: Counter) -> Counter:
+    leaves: Counter = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return leaves
+
+
+def _inclusive_counts(stacks: Counter) -> Counter:
+    totals: Counter = Counter()
+    for stack, count in stacks.items():
+        for label in set(stack.split(";")):
+            totals[label] += count
+    return totals
+
+
+class Profiler:
+    """WSGI wrapper profiling sampled or token-bearing requests into PROFILE_DIR."""
+
+    def __init__(self, app: Optional[Flask] = None, directory: str = PROFILE_DIR, rate: int = PROFILE_SAMPLE_RATE,
+                 mode: str = PROFILE_MODE, interval: float = PROFILE_INTERVAL, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.rate = rate
+        self.mode = mode
+        self.interval = interval
+        self.keep = keep
+        self.app: Optional[Flask] = None
+        self.wsgi_app = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+        app.extensions["profiler"] = self
+
+    def _reason(self, environ) -> Optional[str]:
+        token = environ.get(TOKEN_HEADER)
+        if token:
+            secret_key = self.app.config.get("SECRET_KEY") or ""
+            if secret_key and (secret_key != DEV_SECRET_KEY or self.app.debug) and verify_token(token, secret_key):
+                return "token"
+        if self.rate > 0 and random.randrange(self.rate) == 0:
+            return "sampled"
+        return None
+
+    def _route(self, environ) -> str:
+        try:
+            rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except Exception:
+            return UNMATCHED
+        return rule.rule
+
+    def __call__(self, environ, start_response):
+        reason = self._reason(environ)
+        if reason is None:
+            return self.wsgi_app(environ, start_response)
+
+        route = self._route(environ)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}-{os.getpid()}-" \
+               f"{route.strip('/').replace('/', '_').replace('<', '').replace('>', '').replace(':', '-') or 'root'}"
+        status = ["500"]
+
+        def profiled_start_response(status_line, headers, exc_info=None):
+            status[0] = status_line.split(" ", 1)[0]
+            headers = list(headers) + [("X-Profile", name)]
+            return start_response(status_line, headers, exc_info) if exc_info else start_response(status_line, headers)
+
+        start = time.perf_counter()
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return self.wsgi_app(environ, profiled_start_response)
+            finally:
+                profile.disable()
+                self._save(name, route, environ, status[0], reason, time.perf_counter() - start,
+                           _cprofile_stacks(profile), profile)
+        sampler = _Sampler(threading.get_ident(), sys._getframe(), self.interval)
+        sampler.start()
+        try:
+            # As in Metrics, the body is returned untouched (sendfile); the profile covers producing the response.
+            return self.wsgi_app(environ, profiled_start_response)
+        finally:
+            sampler.done.set()
+            sampler.join()
+            self._save(name, route, environ, status[0], reason, time.perf_counter() - start, sampler.stacks)
+
+    def _save(self, name: str, route: str, environ, status: str, reason: str, duration: float,
+              stacks: Counter, profile: Optional[cProfile.Profile] = None) -> None:
+        unit = "us" if profile is not None else "samples"
+        meta = {
+            "route": route, "method": environ.get("REQUEST_METHOD", "GET"), "path": environ.get("PATH_INFO", ""),
+            "status": status, "pid": os.getpid(), "reason": reason, "mode": self.mode, "unit": unit,
+            "interval": self.interval if profile is None else None, "duration_ms": round(1000 * duration, 3),
+            "timestamp": time.time(), "samples": sum(stacks.values()),
+            "self": _self_counts(stacks).most_common(TOP_FUNCTIONS),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, name)
+            with open(base + ".collapsed", "w", encoding="utf-8") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sorted(stacks.items()) if stack)
+            if profile is not None:
+                profile.dump_stats(base + ".prof")
+            # Written last: a profile is listed once its .json exists.
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            self._rotate()
+        except OSError as e:
+            print(f"Could not write profile {name}: {e}")
+
+    def _rotate(self) -> None:
+        with self._lock:
+            names = list_profiles(self.directory)
+            for name in names[:max(0, len(names) - self.keep)]:
+                for extension in EXTENSIONS:
+                    try:
+                        os.remove(os.path.join(self.directory, name + extension))
+                    except OSError:
+                        pass
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> List[str]:
+    """Profile names (without extension), oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def load_profile(directory: str, name: str) -> Tuple[Dict, Counter]:
+    with open(os.path.join(directory, name + ".json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    stacks: Counter = Counter()
+    try:
+        with open(os.path.join(directory, name + ".collapsed"), "r", encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    except OSError:
+        pass
+    return meta, stacks
+
+
+def merge(directory: str = PROFILE_DIR, route: Optional[str] = None) -> Tuple[List[Dict], Dict[str, Counter]]:
+    """(metadata of the profiles used, unit -> merged collapsed stacks) across every worker's profiles."""
+    metas, merged = [], {}
+    for name in list_profiles(directory):
+        try:
+            meta, stacks = load_profile(directory, name)
+        except (OSError, ValueError):
+            continue
+        if route is not None and meta.get("route") != route:
+            continue
+        meta["name"] = name
+        metas.append(meta)
+        merged.setdefault(meta.get("unit", "samples"), Counter()).update(stacks)
+    return metas, merged
+
+
+def _print_table(title: str, counts: Counter, total: int, top: int) -> None:
+    print(f"\n{title}")
+    for label, count in counts.most_common(top):
+        print(f"  {100 * count / total:6.1f}%  {count:>10}  {label}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app profile", description="Request profiles written by the profiler.")
+    parser.add_argument("--dir", default=PROFILE_DIR, help=f"Profile directory (default: {PROFILE_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_token = sub.add_parser("token", help="Print an X-Profile-Token header value (signed with SECRET_KEY)")
+    p_token.add_argument("--ttl", type=int, default=TOKEN_TTL, help=f"Seconds the token stays valid (default {TOKEN_TTL})")
+    sub.add_parser("list", help="List profiles on disk")
+    p_merge = sub.add_parser("merge", help="Merge profiles across workers into one hot-path report")
+    p_merge.add_argument("--route", help="Only profiles of this URL rule (e.g. / or /api/intake/<form>)")
+    p_merge.add_argument("--top", type=int, default=TOP_FUNCTIONS, help="Rows per table")
+    p_merge.add_argument("--output", help="Also write the merged collapsed stacks here (flamegraph input)")
+    args = parser.parse_args(argv)
+
+    if args.command == "token":
+        secret_key = os.environ.get("SECRET_KEY", "")
+        if not secret_key:
+            print("SECRET_KEY is not set; the server would not accept a token signed with the development key.")
+            return 1
+        print(f"X-Profile-Token: {make_token(secret_key, args.ttl)}")
+    elif args.command == "list":
+        for name in list_profiles(args.dir):
+            try:
+                meta, _ = load_profile(args.dir, name)
+            except (OSError, ValueError):
+                continue
+            print(f"{name}  {meta['method']:<6} {meta['route']:<28} {meta['status']}  {meta['duration_ms']:>9.1f} ms  "
+                  f"{meta['samples']:>7} {meta['unit']}  ({meta['reason']})")
+    elif args.command == "merge":
+        metas, merged = merge(args.dir, args.route)
+        if not metas:
+            print(f"No profiles in {args.dir}" + (f" for route {args.route}" if args.route else ""))
+            return 1
+        by_route = Counter(meta["route"] for meta in metas)
+        pids = sorted({meta["pid"] for meta in metas})
+        print(f"{len(metas)} profile(s) from {len(pids)} worker(s) (pids {', '.join(map(str, pids))})")
+        for route, count in by_route.most_common():
+            durations = sorted(meta["duration_ms"] for meta in metas if meta["route"] == route)
+            print(f"  {route:<30} {count:>5} profiles  median {durations[len(durations) // 2]:.1f} ms  "
+                  f"max {durations[-1]:.1f} ms")
+        for unit, stacks in merged.items():
+            total = sum(stacks.values()) or 1
+            _print_table(f"Hottest functions, own time ({unit}, {total} total):", _self_counts(stacks), total, args.top)
+            if unit == "samples":
+                _print_table("Hottest functions, including callees:", _inclusive_counts(stacks), total, args.top)
+                _print_table("Hottest stacks:", stacks, total, min(args.top, 10))
+        profs = [os.path.join(args.dir, meta["name"] + ".prof") for meta in metas if meta.get("mode") == "cprofile"]
+        profs = [path for path in profs if os.path.exists(path)]
+        if profs:
+            print(f"\ncProfile totals over {len(profs)} request(s):")
+            pstats.Stats(*profs).sort_stats("cumulative").print_stats(args.top)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                for unit, stacks in merged.items():
+                    f.writelines(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+            print(f"\nWrote {args.output}")
+    return 0
@@ -0,0 +1,323 @@
+"""
+WSGI static layer in front of Flask, with a hot-file byte cache.
+
+Every `/static/...` request used to go through Flask's request context, URL
+routing, `AssetManifest.send` and an `os.stat`. `StaticFiles` wraps
+`app.wsgi_app` and answers them first, from an index built once per process
+(in the gunicorn master, before workers fork): size, mtime, MIME type and
+content hash of every file under the static folder, its fingerprinted name and
+any precompressed `.br` / `.gz` sibling. Content hashes come from the app's
+AssetManifest, so each file is hashed once per process, not once per index.
+Responses carry the same headers as AssetManifest.send (immutable for
+fingerprinted names, ETag + `no-cache` otherwise, 304 on a matching
+`If-None-Match`), plus `X-Static-Cache`.
+
+Small text assets (CACHEABLE_EXTENSIONS up to STATIC_CACHE_MAX_FILE bytes: CSS,
+JS, locale JSON, the favicon, robots.txt, sitemap.xml) are kept in a per-worker
+LRU cache bounded to STATIC_CACHE_BYTES; everything else is handed to the
+server's `wsgi.file_wrapper` (sendfile under gunicorn). Files that are not in
+the index, `Range` requests, debug mode and (with STATIC_OFFLOAD) uncached
+files fall through to Flask. The index is fixed for the life of the process:
+the build steps (`python -m app css` / `bundle` / `images`) run before the
+server starts, and debug mode bypasses this layer. A file is checked against
+its index entry (size and mtime, from the open file) whenever it is read from
+disk, so one rebuilt in place is never sent with the indexed Content-Length:
+it falls through to Flask until the index is rebuilt. Set
+STATIC_RESCAN_INTERVAL to have a background thread per worker rescan the
+folder every that many seconds and rehash only files whose size or mtime
+changed, so such files are served from here again without a restart (each
+rescan walks and stats the whole tree).
+
+Cache results are counted in `static_cache_requests_total{result}` (hit, miss,
+uncached, stale, passthrough) and evictions in `static_cache_evictions_total`
+on /metrics, next to the per-worker numbers of `stats()`.
+"""
+import os
+import time
+import threading
+import mimetypes
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, NamedTuple, Optional, Tuple
+
+from flask import Flask
+from werkzeug.http import http_date, is_resource_modified, parse_accept_header
+from werkzeug.utils import get_content_type
+
+from .assets import IMMUTABLE_MAX_AGE, file_digest, fingerprinted_name
+from .metrics import REGISTRY, ROUTE_KEY
+from pipeline.sendfile import STATIC_OFFLOAD
+
+STATIC_CACHE_BYTES = int(os.getenv("STATIC_CACHE_BYTES", str(16 * 1024 * 1024)))
+STATIC_CACHE_MAX_FILE = int(os.getenv("STATIC_CACHE_MAX_FILE", str(256 * 1024)))
+STATIC_RESCAN_INTERVAL = float(os.getenv("STATIC_RESCAN_INTERVAL", "0"))
+CACHEABLE_EXTENSIONS = {".css", ".js", ".mjs", ".json", ".map", ".ico", ".svg", ".txt", ".xml", ".webmanifest"}
+# In server preference order.
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+# Site-root URLs served from the static folder.
+ROOT_FILES = {"/robots.txt": "robots.txt", "/sitemap.xml": "sitemap.xml"}
+BLOCK_SIZE = 1 << 16
+
+
+class Variant(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    etag: str
+
+
+class StaticEntry(NamedTuple):
+    name: str                        # path below the static folder
+    digest: str
+    mtime_ns: int
+    mimetype: str                    # Content-Type header value
+    last_modified: str               # Last-Modified header value
+    modified: datetime
+    variants: Dict[str, Variant]     # "" (identity), "br", "gzip"
+
+
+def _read(f: BinaryIO):
+    with f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            yield block
+
+
+class StaticFiles:
+    """WSGI middleware serving indexed static files (and caching hot ones) before Flask dispatch."""
+
+    def __init__(self, app: Optional[Flask] = None, max_bytes: int = STATIC_CACHE_BYTES,
+                 max_file: int = STATIC_CACHE_MAX_FILE, interval: float = STATIC_RESCAN_INTERVAL):
+        self.max_bytes = max_bytes
+        self.max_file = max_file
+        self.interval = interval
+        self.app: Optional[Flask] = None
+        self.assets = None
+        self.wsgi_app = None
+        self.static_folder = ""
+        self.prefix = ""
+        self.static_rule = ""
+        # request name (plain or fingerprinted) -> (entry, immutable)
+        self.index: Dict[str, Tuple[StaticEntry, bool]] = {}
+        self._entries: Dict[str, StaticEntry] = {}
+        # (file path, ETag) -> contents; a rewritten file gets a new key.
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self.hits = self.misses = self.uncached = self.evictions = self.passthrough = self.stale = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        self.static_folder = os.path.abspath(app.static_folder)
+        self.prefix = app.static_url_path.rstrip("/") + "/"
+        # Flask's own rule for the static view, so Metrics labels these responses without matching the URL.
+        self.static_rule = self.prefix + "<path:filename>"
+        # Shares the AssetManifest's digests (installed first) instead of hashing static/ a second time.
+        self.assets = app.extensions.get("assets")
+        self.scan()
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+        app.extensions["static_files"] = self
+
+    # --- Index -----------------------------------------------------------------------
+
+    def _entry(self, name: str, path: str, st: os.stat_result) -> StaticEntry:
+        previous = self._entries.get(name)
+        if previous is not None and previous.mtime_ns == st.st_mtime_ns and previous.variants[""].size == st.st_size:
+            return previous
+        asset = self.assets.entry(name) if self.assets is not None else None
+        digest = asset.digest if asset is not None else file_digest(path)
+        variants = {"": Variant(path, st.st_size, st.st_mtime_ns, f'"{digest}"')}
+        for encoding, suffix in ENCODINGS:
+            try:
+                sibling = os.stat(path + suffix)
+            except OSError:
+                continue
+            # Each encoding gets its own ETag so caches never mix variants.
+            variants[encoding] = Variant(path + suffix, sibling.st_size, sibling.st_mtime_ns, f'"{digest}-{encoding}"')
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        modified = datetime.fromtimestamp(int(st.st_mtime), timezone.utc)
+        return StaticEntry(name, digest, st.st_mtime_ns, get_content_type(mimetype, "utf-8"), http_date(modified),
+                           modified, variants)
+
+    def scan(self) -> None:
+        """(Re)build the index; only new or modified files are hashed again."""
+        entries: Dict[str, StaticEntry] = {}
+        siblings = {suffix for _, suffix in ENCODINGS}
+        for directory, _, files in os.walk(self.static_folder):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.static_folder).replace(os.sep, "/")
+                if os.path.splitext(name)[1] in siblings and os.path.isfile(path[:-len(os.path.splitext(name)[1])]):
+                    continue
+                try:
+                    entries[name] = self._entry(name, path, os.stat(path))
+                except OSError:
+                    continue
+        index = {}
+        for name, entry in entries.items():
+            index[name] = (entry, False)
+            index[fingerprinted_name(name, entry.digest)] = (entry, True)
+        current = {(variant.path, variant.etag) for entry in entries.values() for variant in entry.variants.values()}
+        with self._lock:
+            for key in [key for key in self._cache if key not in current]:
+                self._size -= len(self._cache.pop(key))
+            self._entries, self.index = entries, index
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"Static index rescan failed: {e}")
+
+    def _ensure_watcher(self) -> None:
+        # Threads do not survive fork, so each worker starts its own (the index itself is inherited).
+        pid = os.getpid()
+        if self.interval > 0 and self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._pid = pid
+                    threading.Thread(target=self._watch, name="static-index-rescan", daemon=True).start()
+
+    # --- Cache -----------------------------------------------------------------------
+
+    def _count(self, result: str) -> None:
+        REGISTRY.inc("static_cache_requests_total", {"result": result})
+
+    def _open(self, variant: Variant) -> Optional[BinaryIO]:
+        """The variant's file, or None if it is gone or changed since it was indexed (rebuilt in place)."""
+        try:
+            f = open(variant.path, "rb")
+        except OSError:
+            return None
+        st = os.fstat(f.fileno())
+        if st.st_size != variant.size or st.st_mtime_ns != variant.mtime_ns:
+            f.close()
+            return None
+        return f
+
+    def _cached(self, variant: Variant) -> Tuple[Optional[bytes], bool]:
+        """(contents, whether they came from the cache); contents are None if the file changed on disk."""
+        key = (variant.path, variant.etag)
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data, True
+        f = self._open(variant)
+        if f is None:
+            return None, False
+        with f:
+            data = f.read()
+        if len(data) != variant.size:
+            return None, False
+        evictions = 0
+        with self._lock:
+            self.misses += 1
+            if key not in self._cache:
+                self._cache[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+                evictions += 1
+            self.evictions += evictions
+        if evictions:
+            REGISTRY.inc("static_cache_evictions_total", {}, evictions)
+        return data, False
+
+    def stats(self) -> Dict[str, int]:
+        return {"files": len(self._entries), "entries": len(self._cache), "bytes": self._size,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "uncached": self.uncached,
+                "evictions": self.evictions, "passthrough": self.passthrough, "stale": self.stale}
+
+    # --- WSGI ------------------------------------------------------------------------
+
+    def _lookup(self, environ) -> Optional[Tuple[StaticEntry, bool]]:
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD") or "HTTP_RANGE" in environ or self.app.debug:
+            return None
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(self.prefix):
+            name = path[len(self.prefix):]
+        else:
+            name = ROOT_FILES.get(path)
+            if name is None:
+                return None
+        try:
+            # WSGI carries the raw path bytes as latin-1.
+            name = name.encode("latin-1").decode("utf-8")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            return None
+        return self.index.get(name)
+
+    def __call__(self, environ, start_response):
+        found = self._lookup(environ)
+        if found is None:
+            if environ.get("PATH_INFO", "").startswith(self.prefix):
+                self.passthrough += 1
+                self._count("passthrough")
+            return self.wsgi_app(environ, start_response)
+        self._ensure_watcher()
+        entry, immutable = found
+        path = environ.get("PATH_INFO", "")
+        environ[ROUTE_KEY] = self.static_rule if path.startswith(self.prefix) else path
+
+        encoding = ""
+        if len(entry.variants) > 1:
+            accepted = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING"))
+            encoding = next((name for name, _ in ENCODINGS if name in entry.variants and accepted[name]), "")
+        variant = entry.variants[encoding]
+
+        headers = [("Content-Type", entry.mimetype), ("ETag", variant.etag),
+                   ("Last-Modified", entry.last_modified), ("Accept-Ranges", "bytes")]
+        if immutable:
+            headers += [("Cache-Control", f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"),
+                        ("Expires", http_date(time.time() + IMMUTABLE_MAX_AGE))]
+        else:
+            headers.append(("Cache-Control", "no-cache"))
+        if encoding:
+            headers.append(("Content-Encoding", encoding))
+        if len(entry.variants) > 1:
+            headers.append(("Vary", "Accept-Encoding"))
+
+        if not is_resource_modified(environ, etag=variant.etag.strip('"'), last_modified=entry.modified):
+            start_response("304 Not Modified", [h for h in headers if h[0] not in ("Content-Type", "Content-Encoding")])
+            return []
+
+        headers.append(("Content-Length", str(variant.size)))
+        extension = os.path.splitext(entry.name)[1].lower()
+        if variant.size <= self.max_file and extension in CACHEABLE_EXTENSIONS and self.max_bytes > 0:
+            body, hit = self._cached(variant)
+            if body is not None:
+                self._count("hit" if hit else "miss")
+                headers.append(("X-Static-Cache", "hit" if hit else "miss"))
+                start_response("200 OK", headers)
+                return [] if environ["REQUEST_METHOD"] == "HEAD" else [body]
+        elif self.app.config.get("STATIC_OFFLOAD", STATIC_OFFLOAD):
+            # Large files go to the front proxy (pipeline/sendfile.py).
+            self.passthrough += 1
+            self._count("passthrough")
+            return self.wsgi_app(environ, start_response)
+        else:
+            f = self._open(variant)
+            if f is not None:
+                self.uncached += 1
+                self._count("uncached")
+                headers.append(("X-Static-Cache", "uncached"))
+                start_response("200 OK", headers)
+                if environ["REQUEST_METHOD"] == "HEAD":
+                    f.close()
+                    return []
+                file_wrapper = environ.get("wsgi.file_wrapper")
+                if file_wrapper is not None:
+                    return file_wrapper(f, BLOCK_SIZE)
+                return _read(f)
+        # Changed on disk since it was indexed: the headers above would not match it, Flask serves it.
+        self.stale += 1
+        self._count("stale")
+        return self.wsgi_app(environ, start_response)
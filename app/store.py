@@ -0,0 +1,256 @@
+"""
+Append-only submission store (SQLite in WAL mode).
+
+Every lead becomes one row keyed by a unique, time-ordered submission id and
+indexed by form type and timestamp. WAL mode lets any number of gunicorn
+workers append concurrently while readers (exports, the outbox worker) never
+block writers.
+
+Within a process, appends are group-committed: a single writer thread drains
+every append queued while the previous transaction was being fsynced and
+commits them together, so a burst of leads costs one fsync instead of one each.
+
+Command-line interface
+    python -m app submissions list [--form-type T] [--since ISO] [--until ISO] [--limit N]
+    python -m app submissions show <id> [--format json|csv|html]
+    python -m app submissions materialize <id>... [--out DIR]   # write the .json/.csv/.html files
+"""
+import os
+import json
+import uuid
+import queue
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from .artifacts import base_filename, render_csv, render_html, render_json
+
+STORE_PATH = os.getenv("SUBMISSION_STORE", os.path.join("submissions", "submissions.db"))
+# FULL fsyncs the WAL on every commit (durable leads); NORMAL defers fsync to checkpoints.
+STORE_SYNC = os.getenv("SUBMISSION_STORE_SYNC", "FULL").upper()
+GROUP_COMMIT_MAX = int(os.getenv("SUBMISSION_GROUP_COMMIT_MAX", "256"))
+# Seconds append() waits for its group commit before giving up (longer than the 30 s busy timeout).
+APPEND_TIMEOUT = float(os.getenv("SUBMISSION_STORE_TIMEOUT", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id          TEXT PRIMARY KEY,
+    form_type   TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_form_created ON submissions (form_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_submissions_created ON submissions (created_at);
+"""
+
+
+def new_submission_id(now: Optional[datetime] = None) -> str:
+    """Sortable unique id, e.g. `20250101_120000_123456_1a2b3c4d`."""
+    now = now or datetime.now()
+    return f"{now.strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+
+
+def _row_to_submission(row) -> Dict:
+    return {"id": row[0], "form_type": row[1], "created_at": row[2], "data": json.loads(row[3])}
+
+
+class SubmissionStore:
+    """Append-only, indexed record of every submission."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or STORE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        self._pid = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._start_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={STORE_SYNC}")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    # --- Writes ------------------------------------------------------------
+
+    def _enqueue(self, item) -> None:
+        # Threads do not survive fork, so each gunicorn worker starts its own writer. Items are queued
+        # under the start lock so a writer that is shutting down (see _writer_failed) cannot strand one.
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._writer_loop, args=(self._queue,), name="submission-store-writer",
+                                 daemon=True).start()
+                self._pid = os.getpid()
+            self._queue.put(item)
+
+    def _writer_failed(self, pending: "queue.Queue", batch: List, error: Exception) -> None:
+        """Stop this writer: fail its batch and everything still queued; the next append starts a new one."""
+        print(f"Submission store writer stopped: {error}")
+        with self._start_lock:
+            if self._queue is pending:
+                self._pid = None
+        while True:
+            try:
+                batch.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        for _, done, outcome in batch:
+            outcome["error"] = error
+            done.set()
+
+    def _writer_loop(self, pending: "queue.Queue") -> None:
+        try:
+            conn = self._connect()
+        except Exception as e:
+            self._writer_failed(pending, [], e)
+            return
+        while True:
+            batch = [pending.get()]
+            while len(batch) < GROUP_COMMIT_MAX:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            error = None
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT INTO submissions (id, form_type, created_at, data) VALUES (?, ?, ?, ?)",
+                                 [row for row, _, _ in batch])
+                conn.execute("COMMIT")
+            except Exception as e:
+                error = e
+                try:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                except Exception:
+                    # The connection is unusable; a fresh writer reconnects on the next append.
+                    conn.close()
+                    self._writer_failed(pending, batch, error)
+                    return
+            for _, done, outcome in batch:
+                outcome["error"] = error
+                done.set()
+
+    def append(self, form_type: str, data: Dict[str, str], created_at: Optional[datetime] = None) -> str:
+        """Durably record a submission and return its id (blocks until its group commit lands)."""
+        created_at = created_at or datetime.now()
+        submission_id = new_submission_id(created_at)
+        row = (submission_id, form_type, created_at.isoformat(), json.dumps(data, ensure_ascii=False))
+        done, outcome = threading.Event(), {}
+        self._enqueue((row, done, outcome))
+        if not done.wait(APPEND_TIMEOUT):
+            raise TimeoutError(f"Submission store did not commit within {APPEND_TIMEOUT:g}s")
+        if outcome["error"] is not None:
+            raise outcome["error"]
+        return submission_id
+
+    # --- Reads -------------------------------------------------------------
+
+    def get(self, submission_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT id, form_type, created_at, data FROM submissions WHERE id = ?",
+                               (submission_id,)).fetchone()
+        finally:
+            conn.close()
+        return _row_to_submission(row) if row else None
+
+    def query(self, form_type: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Stream submissions in timestamp order. `since`/`until` are ISO strings (inclusive/exclusive)."""
+        clauses, params = [], []
+        if form_type:
+            clauses.append("form_type = ?")
+            params.append(form_type)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until)
+        sql = "SELECT id, form_type, created_at, data FROM submissions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        conn = self._connect()
+        try:
+            for row in conn.execute(sql, params):
+                yield _row_to_submission(row)
+        finally:
+            conn.close()
+
+
+_store: Optional[SubmissionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SubmissionStore:
+    """Process-wide store instance (created on first use)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SubmissionStore()
+        return _store
+
+
+def render_artifact(submission: Dict, fmt: str) -> str:
+    if fmt == "json":
+        return render_json(submission["data"])
+    if fmt == "csv":
+        return render_csv(submission["data"])
+    return render_html(submission["form_type"], submission["data"], datetime.fromisoformat(submission["created_at"]))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app submissions", description="Inspect the submission store.")
+    parser.add_argument("--db", help=f"Store path (default: {STORE_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="List submissions")
+    p_list.add_argument("--form-type")
+    p_list.add_argument("--since", help="ISO date/time (inclusive)")
+    p_list.add_argument("--until", help="ISO date/time (exclusive)")
+    p_list.add_argument("--limit", type=int)
+    p_show = sub.add_parser("show", help="Render one submission")
+    p_show.add_argument("submission_id")
+    p_show.add_argument("--format", choices=("json", "csv", "html"), default="json")
+    p_mat = sub.add_parser("materialize", help="Write the per-lead .json/.csv/.html files")
+    p_mat.add_argument("submission_ids", nargs="+")
+    p_mat.add_argument("--out", default="submissions")
+    args = parser.parse_args(argv)
+
+    store = SubmissionStore(args.db)
+
+    if args.command == "list":
+        for submission in store.query(args.form_type, args.since, args.until, args.limit):
+            print(f"{submission['id']}  {submission['created_at']}  {submission['form_type']}")
+    elif args.command == "show":
+        submission = store.get(args.submission_id)
+        if submission is None:
+            print(f"Submission not found: {args.submission_id}")
+            return 1
+        print(render_artifact(submission, args.format))
+    elif args.command == "materialize":
+        os.makedirs(args.out, exist_ok=True)
+        for submission_id in args.submission_ids:
+            submission = store.get(submission_id)
+            if submission is None:
+                print(f"Submission not found: {submission_id}")
+                return 1
+            for fmt in ("json", "csv", "html"):
+                path = os.path.join(args.out, f"{base_filename(submission)}.{fmt}")
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    f.write(render_artifact(submission, fmt))
+                print(f"Saved {fmt.upper()} to {path}")
+    return 0
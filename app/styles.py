@@ -0,0 +1,551 @@
+"""
+Per-page stylesheets: unused-CSS elimination and critical-CSS inlining.
+
+Every page links the whole of `static/css/custom.min.css` (Bootstrap plus the
+site rules, ~230 KB) as a render-blocking stylesheet, while each template uses a
+small fraction of it. The purge step reads the class names, ids and tag names
+that appear in a page's template and in the scripts that build markup at
+runtime (`static/*.js`, `static/js/*.js`), drops every selector that cannot
+match, and writes one stylesheet per page:
+
+    static/css/pages/<page>.css           the purged stylesheet
+    static/css/pages/<page>.critical.css  rules for the markup above the fold
+
+The `page_styles('<page>')` template helper inlines the critical rules into
+`<head>` and loads the purged stylesheet asynchronously (preload + onload, with
+a `<noscript>` fallback). The async stylesheet is the complete purged sheet, not
+just the remainder, so the cascade order is exactly the original one once it
+has loaded. Without a purge output (or in debug mode) the helper falls back to
+the plain render-blocking `custom.min.css` link.
+
+Classes added by Bootstrap's own scripts or composed from template variables
+(`alert-{{ category }}`) never appear literally, so they are kept through
+SAFELIST / SAFELIST_PATTERNS. Classes in markup that template globals build in
+Python (`admission_honeypot()`) are kept through HELPER_CLASSES, wherever the
+global is called. Extra names can be added with `CSS_SAFELIST` (comma-separated,
+`/regex/` entries allowed) or `--safelist`. The fold is the
+`<!-- fold -->` marker in a template, or the first CRITICAL_BYTES of its body.
+
+Command-line interface
+    python -m app css [--root static] [--templates templates] [--safelist NAME ...] [--force] [--check]
+
+Outputs are skipped when the manifest already records the hash of the current
+stylesheet, templates, scripts and safelist.
+"""
+import os
+import re
+import json
+import html
+import hashlib
+import argparse
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+from flask import Flask, current_app
+from markupsafe import Markup
+
+STYLESHEET = "css/custom.min.css"
+STYLES_DIR = "css/pages"
+STYLES_MANIFEST = "styles-manifest.json"
+TEMPLATE_PAGES = ["index", "motor_vehicle_accident", "personal_injury"]
+FOLD_MARKER = "<!-- fold -->"
+CRITICAL_BYTES = int(os.getenv("CSS_CRITICAL_BYTES", "6000"))
+# Bump when the output format changes so existing outputs are regenerated.
+STYLES_VERSION = "2"
+
+# Classes toggled by bootstrap.bundle.js (collapse, dropdown, modal, alert, tooltip, carousel, validation).
+SAFELIST = [
+    "show", "showing", "hiding", "fade", "collapse", "collapsing", "collapsed", "active", "disabled",
+    "modal-open", "modal-backdrop", "modal-static", "offcanvas-backdrop", "dropdown-menu-end",
+    "dropdown-menu-start", "dropup", "dropend", "dropstart", "was-validated", "is-valid", "is-invalid",
+    "tooltip", "tooltip-inner", "tooltip-arrow", "popover", "popover-arrow", "popover-header", "popover-body",
+    "carousel-item-next", "carousel-item-prev", "carousel-item-start", "carousel-item-end", "pointer-event",
+]
+# Classes in markup that template globals build in Python: `{global name: classes}`. Kept
+# for (and above the fold of) any template that calls the global.
+HELPER_CLASSES = {
+    "admission_honeypot": ["visually-hidden"],   # Admission.honeypot
+}
+SAFELIST_PATTERNS = [
+    r"^alert-",                     # flash categories: alert-{{ category }}
+    r"^bs-(tooltip|popover)-",      # placement classes set by Popper
+]
+
+# Groups that are kept when any rule inside them is kept.
+_GROUPING_RULES = {"media", "supports", "layer", "container", "document"}
+_TOKEN = re.compile(r"[A-Za-z0-9_-]+")
+_FUNCTIONAL_PSEUDO = re.compile(r":(?:not|is|where|has|matches|-webkit-any|-moz-any)\((?:[^()]|\([^()]*\))*\)")
+_ATTRIBUTE = re.compile(r"\[[^\]]*\]")
+_PSEUDO = re.compile(r"::?[A-Za-z-]+(?:\([^()]*\))?")
+_SIMPLE = re.compile(r"([.#]?)((?:-?[_A-Za-z]|\\.)(?:[\w-]|\\.)*)")
+_UNESCAPE = re.compile(r"\\(.)")
+_ANIMATION = re.compile(r"animation(?:-name)?\s*:([^;}]*)")
+
+
+class Rule(NamedTuple):
+    at: str                          # at-rule name ("" for a style rule)
+    prelude: str                     # selector list / at-rule prelude
+    body: Optional[str]              # declarations or raw block (None for `@import ...;`)
+    children: Optional[List["Rule"]]  # nested rules of a grouping at-rule
+
+
+class PageStyles(NamedTuple):
+    page: str
+    css: str
+    critical: str
+
+
+# --- CSS parsing ---------------------------------------------------------------------
+
+def _skip_string(css: str, i: int) -> int:
+    quote, i = css[i], i + 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == "\\" else 1
+    return i + 1
+
+
+def _scan(css: str, i: int, stops: str) -> int:
+    """Index of the first `stops` character at paren depth 0, skipping strings and comments."""
+    depth = 0
+    while i < len(css):
+        ch = css[i]
+        if ch in "\"'":
+            i = _skip_string(css, i)
+            continue
+        if css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = len(css) if end < 0 else end + 2
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth <= 0 and ch in stops:
+            return i
+        i += 1
+    return i
+
+
+def _block_end(css: str, i: int) -> int:
+    """Index of the `}` closing the block opened at `css[i] == '{'`."""
+    depth = 0
+    while i < len(css):
+        i = _scan(css, i, "{}")
+        if i >= len(css):
+            break
+        depth += 1 if css[i] == "{" else -1
+        if depth == 0:
+            return i
+        i += 1
+    return len(css)
+
+
+def parse_css(css: str) -> Tuple[List[str], List[Rule]]:
+    """(preserved `/*! ... */` comments, rules) of a stylesheet."""
+    notices, rules, i = [], [], 0
+    css = css.lstrip("﻿")
+    while i < len(css):
+        if css[i].isspace() or css[i] == ";":
+            i += 1
+            continue
+        if css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            end = len(css) if end < 0 else end + 2
+            if css.startswith("/*!", i):
+                notices.append(css[i:end])
+            i = end
+            continue
+        stop = _scan(css, i, "{;")
+        head = css[i:stop].strip()
+        if stop >= len(css) or css[stop] == ";":
+            if head.startswith("@"):
+                name = re.match(r"@([\w-]*)", head).group(1)
+                rules.append(Rule(name, head[len(name) + 1:], None, None))
+            i = stop + 1
+            continue
+        end = _block_end(css, stop)
+        body = css[stop + 1:end]
+        if head.startswith("@"):
+            name = re.match(r"@([\w-]*)", head).group(1)
+            prelude = head[len(name) + 1:]
+            if name.lower() in _GROUPING_RULES:
+                rules.append(Rule(name, prelude, None, parse_css(body)[1]))
+            else:
+                rules.append(Rule(name, prelude, body, None))
+        else:
+            rules.append(Rule("", head, body, None))
+        i = end + 1
+    return notices, rules
+
+
+def serialize(rules: Iterable[Rule]) -> str:
+    out = []
+    for rule in rules:
+        if rule.children is not None:
+            out.append(f"@{rule.at}{rule.prelude}{{{serialize(rule.children)}}}")
+        elif rule.at and rule.body is None:
+            out.append(f"@{rule.at}{rule.prelude};")
+        elif rule.at:
+            out.append(f"@{rule.at}{rule.prelude}{{{rule.body}}}")
+        else:
+            out.append(f"{rule.prelude}{{{rule.body}}}")
+    return "".join(out)
+
+
+def split_selectors(prelude: str) -> List[str]:
+    selectors, start, i = [], 0, 0
+    while True:
+        i = _scan(prelude, i, ",")
+        selectors.append(prelude[start:i].strip())
+        if i >= len(prelude):
+            return [s for s in selectors if s]
+        i = start = i + 1
+
+
+# --- Purging -------------------------------------------------------------------------
+
+class Usage:
+    """The names a page can match: tokens from its markup and scripts, plus the safelist."""
+
+    def __init__(self, tokens: Set[str], safelist: Iterable[str] = (), patterns: Iterable[Pattern] = ()):
+        self.tokens = set(tokens) | set(safelist)
+        self.patterns = list(patterns)
+
+    def uses(self, name: str) -> bool:
+        return name in self.tokens or any(p.search(name) for p in self.patterns)
+
+    def matches(self, selector: str) -> bool:
+        """
+        False only if the selector needs a class, id or element that never appears.
+
+        Arguments of `:not()` / `:is()` / `:where()` / `:has()`, attribute selectors and
+        pseudo-classes are not required, which keeps e.g. `:root`, `*` and `[data-bs-theme=dark]`.
+        """
+        bare = _PSEUDO.sub(" ", _ATTRIBUTE.sub(" ", _FUNCTIONAL_PSEUDO.sub(" ", selector)))
+        for prefix, name in _SIMPLE.findall(bare):
+            name = _UNESCAPE.sub(r"\1", name)
+            if not self.uses(name if prefix else name.lower()):
+                return False
+        return True
+
+
+def _purge(rules: List[Rule], usage: Usage) -> List[Rule]:
+    kept = []
+    for rule in rules:
+        if rule.children is not None:
+            children = _purge(rule.children, usage)
+            if children:
+                kept.append(rule._replace(children=children))
+        elif rule.at.lower().endswith("keyframes"):
+            kept.append(rule)  # dropped afterwards unless a kept rule animates with it
+        elif rule.at:
+            kept.append(rule)  # @import, @font-face, @page, @property, ...
+        else:
+            selectors = [s for s in split_selectors(rule.prelude) if usage.matches(s)]
+            if selectors:
+                kept.append(rule._replace(prelude=",".join(selectors)))
+    return kept
+
+
+def _animation_names(rules: List[Rule]) -> Set[str]:
+    names = set()
+    for rule in rules:
+        if rule.children is not None:
+            names |= _animation_names(rule.children)
+        elif not rule.at and rule.body:
+            for value in _ANIMATION.findall(rule.body):
+                names.update(_TOKEN.findall(value))
+    return names
+
+
+def _drop_keyframes(rules: List[Rule], used: Set[str]) -> List[Rule]:
+    kept = []
+    for rule in rules:
+        if rule.children is not None:
+            children = _drop_keyframes(rule.children, used)
+            if children:
+                kept.append(rule._replace(children=children))
+        elif rule.at.lower().endswith("keyframes") and rule.prelude.strip() not in used:
+            continue
+        else:
+            kept.append(rule)
+    return kept
+
+
+def purge(rules: List[Rule], usage: Usage, imports: bool = True) -> List[Rule]:
+    """Rules of the stylesheet that can apply to a page using `usage` (optionally without `@import`s)."""
+    kept = _purge(rules, usage)
+    if not imports:
+        kept = [rule for rule in kept if rule.at.lower() != "import"]
+    return _drop_keyframes(kept, _animation_names(kept))
+
+
+# --- Content scanning ----------------------------------------------------------------
+
+def tokens(text: str) -> Set[str]:
+    """Every identifier-like word: class/id attributes, tag names, and strings such as `classList.add('show')`."""
+    return set(_TOKEN.findall(text))
+
+
+def markup_tokens(markup: str) -> Set[str]:
+    # Tag names are matched lowercase, like the selectors they are compared with.
+    return tokens(markup) | {tag.lower() for tag in re.findall(r"<([A-Za-z][\w-]*)", markup)}
+
+
+def helper_tokens(markup: str) -> Set[str]:
+    """HELPER_CLASSES of the template globals called in `markup`."""
+    names = tokens(markup)
+    return {cls for helper, classes in HELPER_CLASSES.items() if helper in names for cls in classes}
+
+
+def above_the_fold(template: str, limit: int = CRITICAL_BYTES) -> str:
+    """The `<head>` plus the first part of the `<body>`: up to FOLD_MARKER, else `limit` characters."""
+    marker = template.find(FOLD_MARKER)
+    if marker >= 0:
+        return template[:marker]
+    body = re.search(r"<body\b", template, re.IGNORECASE)
+    start = body.start() if body else 0
+    return template[:start + limit]
+
+
+def parse_safelist(entries: Iterable[str]) -> Tuple[List[str], List[Pattern]]:
+    """Split safelist entries into exact names and `/regex/` patterns."""
+    names, patterns = [], []
+    for entry in entries:
+        entry = entry.strip()
+        if len(entry) > 2 and entry.startswith("/") and entry.endswith("/"):
+            patterns.append(re.compile(entry[1:-1]))
+        elif entry:
+            names.append(entry)
+    return names, patterns
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _scripts(root: str) -> Dict[str, str]:
+    """The site's own scripts: `<root>/*.js` and `<root>/js/*.js`."""
+    scripts = {}
+    for directory in (root, os.path.join(root, "js")):
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.endswith((".js", ".mjs")):
+                path = os.path.join(directory, name)
+                scripts[os.path.relpath(path, root).replace(os.sep, "/")] = _read(path)
+    return scripts
+
+
+def purge_pages(stylesheet: str, templates: Dict[str, str], scripts: Dict[str, str],
+                safelist: Iterable[str] = (), critical_bytes: int = CRITICAL_BYTES) -> List[PageStyles]:
+    """Purged and critical stylesheets for each page template (`{page: template source}`)."""
+    notices, rules = parse_css(stylesheet)
+    names, patterns = parse_safelist(list(SAFELIST) + list(safelist))
+    patterns += [re.compile(p) for p in SAFELIST_PATTERNS]
+    script_tokens = set()
+    for source in scripts.values():
+        script_tokens |= tokens(source)
+    header = "".join(notices)
+    pages = []
+    for page, template in templates.items():
+        usage = Usage(markup_tokens(template) | helper_tokens(template) | script_tokens, names, patterns)
+        # Only what is visible on first paint: no runtime classes, no web font import (it loads with the full sheet).
+        fold_markup = above_the_fold(template, critical_bytes)
+        fold = Usage(markup_tokens(fold_markup) | helper_tokens(fold_markup))
+        pages.append(PageStyles(page, header + serialize(purge(rules, usage)),
+                                serialize(purge(rules, fold, imports=False))))
+    return pages
+
+
+# --- Build step ----------------------------------------------------------------------
+
+def load_manifest(out_dir: str) -> Dict:
+    try:
+        with open(os.path.join(out_dir, STYLES_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def input_hash(stylesheet: str, templates: Dict[str, str], scripts: Dict[str, str],
+               safelist: List[str], critical_bytes: int) -> str:
+    sha = hashlib.sha256(f"{STYLES_VERSION}\0{critical_bytes}\0{','.join(safelist)}\0".encode())
+    sha.update(stylesheet.encode("utf-8"))
+    for group in (templates, scripts):
+        for name in sorted(group):
+            sha.update(f"\0{name}\0".encode("utf-8"))
+            sha.update(group[name].encode("utf-8"))
+    return sha.hexdigest()
+
+
+def _write_atomic(path: str, data: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_styles(root: str, template_dir: str, pages: Optional[List[str]] = None,
+                 safelist: Iterable[str] = (), force: bool = False,
+                 critical_bytes: int = CRITICAL_BYTES) -> Tuple[Dict, bool]:
+    """
+    Write `<root>/css/pages/<page>.css` and `.critical.css` for each page template.
+
+    Returns (manifest, rebuilt); the manifest's "pages" entry holds the byte report.
+    """
+    out_dir = os.path.join(root, *STYLES_DIR.split("/"))
+    stylesheet = _read(os.path.join(root, *STYLESHEET.split("/")))
+    templates = {page: _read(os.path.join(template_dir, f"{page}.html")) for page in pages or TEMPLATE_PAGES}
+    scripts = _scripts(root)
+    safelist = sorted(set(safelist))
+    key = input_hash(stylesheet, templates, scripts, safelist, critical_bytes)
+    manifest = load_manifest(out_dir)
+    if not force and manifest.get("input_hash") == key and all(
+            os.path.exists(os.path.join(out_dir, f"{page}.css")) for page in templates):
+        return manifest, False
+
+    os.makedirs(out_dir, exist_ok=True)
+    original = len(stylesheet.encode("utf-8"))
+    report = {}
+    for styles in purge_pages(stylesheet, templates, scripts, safelist, critical_bytes):
+        _write_atomic(os.path.join(out_dir, f"{styles.page}.css"), styles.css)
+        _write_atomic(os.path.join(out_dir, f"{styles.page}.critical.css"), styles.critical)
+        purged, critical = len(styles.css.encode("utf-8")), len(styles.critical.encode("utf-8"))
+        report[styles.page] = {"original": original, "purged": purged, "critical": critical,
+                               "saved": original - purged}
+    manifest = {"input_hash": key, "stylesheet": STYLESHEET, "pages": report}
+    # Written last: the app only switches to the page stylesheets once they are all in place.
+    _write_atomic(os.path.join(out_dir, STYLES_MANIFEST), json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest, True
+
+
+def _has_class_rule(rules: List[Rule], name: str) -> bool:
+    only = Usage({name})
+    for rule in rules:
+        if rule.children is not None:
+            if _has_class_rule(rule.children, name):
+                return True
+        elif not rule.at and any(f".{name}" in s and only.matches(s) for s in split_selectors(rule.prelude)):
+            return True
+    return False
+
+
+def check_styles(root: str, template_dir: str, pages: Optional[List[str]] = None,
+                 critical_bytes: int = CRITICAL_BYTES) -> List[str]:
+    """Problems with the written outputs: HELPER_CLASSES a page calls for but no longer styles."""
+    out_dir = os.path.join(root, *STYLES_DIR.split("/"))
+    problems = []
+    for page in pages or TEMPLATE_PAGES:
+        template = _read(os.path.join(template_dir, f"{page}.html"))
+        for suffix, markup in ((".css", template), (".critical.css", above_the_fold(template, critical_bytes))):
+            needed = helper_tokens(markup)
+            if not needed:
+                continue
+            rules = parse_css(_read(os.path.join(out_dir, f"{page}{suffix}")))[1]
+            problems += [f"{page}{suffix}: no rule for .{name}" for name in sorted(needed)
+                         if not _has_class_rule(rules, name)]
+    return problems
+
+
+# --- App integration -----------------------------------------------------------------
+
+class StylesManifest:
+    """
+    `page_styles('index')` template helper: inline critical CSS + async purged stylesheet.
+
+    Falls back to the render-blocking STYLESHEET link when `python -m app css` has not
+    been run for the page, and always in debug mode so stylesheet edits show up at once.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.out_dir = ""
+        self._stamp = None
+        self._manifest: Dict = {}
+        self._critical: Dict[str, str] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.out_dir = os.path.join(os.path.abspath(app.static_folder), *STYLES_DIR.split("/"))
+        app.add_template_global(self.render, "page_styles")
+        app.extensions["styles"] = self
+
+    def manifest(self) -> Dict:
+        """The styles manifest, reloaded when `python -m app css` replaces it; empty in debug mode."""
+        if current_app.debug:
+            return {}
+        try:
+            stamp = os.stat(os.path.join(self.out_dir, STYLES_MANIFEST)).st_mtime_ns
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            self._manifest = load_manifest(self.out_dir) if stamp else {}
+            self._critical = {}
+            self._stamp = stamp
+        return self._manifest
+
+    def stamp(self):
+        """Changes whenever `python -m app css` replaces the outputs (None without any)."""
+        self.manifest()
+        return self._stamp
+
+    def critical(self, page: str) -> Optional[str]:
+        if page not in self._critical:
+            try:
+                css = _read(os.path.join(self.out_dir, f"{page}.critical.css"))
+            except OSError:
+                return None
+            # A literal `</style` would end the inline block early.
+            self._critical[page] = re.sub(r"</(style)", r"<\\/\1", css, flags=re.IGNORECASE)
+        return self._critical[page]
+
+    def render(self, page: str) -> Markup:
+        assets = current_app.extensions["assets"]
+        critical = self.critical(page) if page in self.manifest().get("pages", {}) else None
+        if critical is None:
+            return Markup(f'<link href="{html.escape(assets.url(STYLESHEET))}" rel="stylesheet">')
+        href = html.escape(assets.url(f"{STYLES_DIR}/{page}.css"))
+        return Markup(
+            f"<style>{critical}</style>\n"
+            f'  <link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+            f'  <noscript><link href="{href}" rel="stylesheet"></noscript>'
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    project = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(prog="python -m app css", description="Write purged and critical stylesheets per page.")
+    parser.add_argument("--root", default=os.path.join(project, "static"), help="Static folder (default: ./static)")
+    parser.add_argument("--templates", default=os.path.join(project, "templates"), help="Template folder (default: ./templates)")
+    parser.add_argument("--page", action="append", help=f"Template name without .html (default: {', '.join(TEMPLATE_PAGES)})")
+    parser.add_argument("--safelist", action="append", default=[], metavar="NAME",
+                        help="Class/id to keep even if unused; /regex/ allowed (repeatable, also CSS_SAFELIST)")
+    parser.add_argument("--critical-bytes", type=int, default=CRITICAL_BYTES,
+                        help=f"Body markup treated as above the fold without a {FOLD_MARKER} marker (default: {CRITICAL_BYTES})")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the outputs are up to date")
+    parser.add_argument("--check", action="store_true",
+                        help="Fail unless the outputs still style the markup of helpers such as admission_honeypot()")
+    args = parser.parse_args(argv)
+
+    safelist = args.safelist + [s for s in os.getenv("CSS_SAFELIST", "").split(",") if s.strip()]
+    try:
+        manifest, rebuilt = build_styles(args.root, args.templates, args.page, safelist, args.force, args.critical_bytes)
+    except OSError as e:
+        print(f"Stylesheet purge failed: {e}")
+        return 1
+    print(f"Page stylesheets {'written' if rebuilt else 'up to date'} ({manifest['input_hash'][:12]}).")
+    for page, sizes in sorted(manifest["pages"].items()):
+        print(f"  {page:<24} {sizes['original']:>9,} B -> {sizes['purged']:>8,} B purged "
+              f"(-{sizes['saved'] / sizes['original']:.0%}), {sizes['critical']:>7,} B critical inline")
+    if args.check:
+        try:
+            problems = check_styles(args.root, args.templates, args.page, args.critical_bytes)
+        except OSError as e:
+            problems = [str(e)]
+        for problem in problems:
+            print(f"  check failed: {problem}")
+        if problems:
+            return 1
+        print("Page stylesheet checks passed.")
+    return 0
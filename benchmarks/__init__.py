@@ -0,0 +1,7 @@
+"""
+Benchmarks and measurement helpers.
+
+Run individual benchmarks as modules from the repository root, e.g.
+
+    python -m benchmarks.smtp_pool
+"""
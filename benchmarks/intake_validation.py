@@ -0,0 +1,65 @@
+"""
+Intake validation micro-benchmark.
+
+Compares validations per second of the hand-written WTForms classes in
+app/forms.py (form instance + bound fields per submission, as a form POST
+does) against the validator closures compiled from static/forms/*.json that
+back `POST /api/intake/<form>`, for valid and invalid submissions.
+
+    python -m benchmarks.intake_validation --iterations 20000
+"""
+import os
+import time
+import argparse
+
+from werkzeug.datastructures import MultiDict
+
+from app import app
+from app.forms import CriminalCaseForm, PersonalInjuryForm
+from app.intake import FORMS_DIR, IntakeSchemas
+
+CASES = {
+    "personal_injury": (PersonalInjuryForm, {
+        "full_name": "Jane Doe", "phone_number": "(770) 555-0100", "email_address": "jane@example.com",
+        "preferred_contact_method": "Email", "date_of_incident": "2025-03-01", "incident_type": "Car accident",
+        "incident_description": "Rear-ended at a light. " * 10, "medical_visit": "Yes", "has_auto_insurance": "Yes",
+        "police_responded": "Yes", "fault_party_cited": "I don't know", "legal_disclaimer_agreement": "y",
+    }),
+    "criminal": (CriminalCaseForm, {
+        "full_name": "John Roe", "phone_number": "(770) 555-0101", "email_address": "john@example.com",
+        "preferred_contact_method": "Phone call", "date_of_incident": "2025-02-11", "arrest_status": "No",
+        "court_date_given": "Yes", "court_date": "2025-06-01", "referral_source": "Google",
+    }),
+}
+
+
+def invalid(payload: dict) -> dict:
+    return dict(payload, email_address="not-an-email", date_of_incident="13/45/2025", full_name="")
+
+
+def measure(validate, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        validate()
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare WTForms and compiled-schema validation throughput.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    schemas = IntakeSchemas(os.path.join(app.static_folder, FORMS_DIR))
+    with app.test_request_context(method="POST"):
+        for form_type, (form_class, payload) in CASES.items():
+            name = schemas.resolve(form_type)
+            for label, data in (("valid", payload), ("invalid", invalid(payload))):
+                formdata = MultiDict(data)
+                wtforms = measure(lambda: form_class(formdata=formdata, meta={"csrf": False}).validate(), args.iterations)
+                compiled = measure(lambda: schemas.validate(name, data), args.iterations)
+                print(f"{form_type:<16} {label:<8} WTForms {wtforms:10.0f}/s   compiled {compiled:10.0f}/s   "
+                      f"x{compiled / wtforms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+SMTP connection pool benchmark.
+
+Sends the same batch of messages through RealGmailService against the local
+stub server twice: once with pooling disabled (one session per message, the old
+behaviour) and once with the shared pool. Reports handshakes (connections +
+logins) and wall time for each run.
+
+`--check` instead runs assertions on the pool's recovery paths against the
+stub: a stale idle session (NOOP fails), a session that drops mid-send (the
+single SMTPServerDisconnected retry), the reset in a forked child, and the
+stats counters under concurrent sends. NOOP reuse and both reconnect paths are
+then repeated with SMTP_SECURITY=STARTTLS and SSL (the stub's self-signed
+certificate, trusted through the pool's `context`), where a reused session must
+also skip the TLS handshake. It exits non-zero on the first failure.
+
+    python -m benchmarks.smtp_pool --messages 50 --connect-latency 0.05
+    python -m benchmarks.smtp_pool --check
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+from .smtp_stub import StubSMTPServer, client_context
+
+
+def _use_stub(stub: StubSMTPServer) -> None:
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(stub.port),
+        "SMTP_SECURITY": stub.security,
+        "SMTP_USERNAME": "bench@example.com",
+        "SMTP_PASSWORD": "bench",
+    })
+
+
+def run(messages: int, latency: float, connect_latency: float) -> None:
+    with StubSMTPServer(latency=latency, connect_latency=connect_latency).start() as stub:
+        _use_stub(stub)
+        from app.gmailproxy import RealGmailService, SMTPConnectionPool
+
+        for label, pool_size in (("unpooled", 0), ("pooled", 2)):
+            service = RealGmailService()
+            service.pool = SMTPConnectionPool(service.smtp_host, service.port, service.security,
+                                              service.username, service.password, service.timeout,
+                                              max_size=pool_size)
+            stub.reset_counters()
+            start = time.perf_counter()
+            for i in range(messages):
+                ok, error = service.send_email(["intake@example.com"], f"Benchmark {i}", "<p>benchmark</p>")
+                if not ok:
+                    raise SystemExit(f"Send failed: {error}")
+            elapsed = time.perf_counter() - start
+            service.pool.close_all()
+            counters = stub.counters
+            print(f"{label:<9} messages={counters['messages']:<5} connections={counters['connections']:<5} "
+                  f"logins={counters['logins']:<5} noops={counters['noops']:<5} "
+                  f"elapsed={elapsed:.3f}s ({messages / elapsed:.1f} msg/s)")
+
+
+def _send(service, subject: str) -> None:
+    ok, error = service.send_email(["intake@example.com"], subject, "<p>check</p>")
+    assert ok, f"{subject}: send failed: {error}"
+
+
+def _expect(stub: StubSMTPServer, pool, step: str, **expected: int) -> None:
+    actual = {name: stub.counters.get(name, pool.stats.get(name)) for name in expected}
+    assert actual == expected, f"{step}: expected {expected}, got {actual}"
+    print(f"ok  {step}")
+
+
+def check() -> None:
+    with StubSMTPServer().start() as stub:
+        _use_stub(stub)
+        from app.gmailproxy import RealGmailService, SMTPConnectionPool
+
+        service = RealGmailService()
+        pool = service.pool = SMTPConnectionPool(service.smtp_host, service.port, service.security,
+                                                 service.username, service.password, service.timeout,
+                                                 max_size=1, max_idle=60)
+
+        _send(service, "first")
+        _send(service, "reused")
+        _expect(stub, pool, "idle session is reused after NOOP",
+                connections=1, messages=2, noops=1, connects=1, reuses=1)
+
+        assert stub.drop_connections() == 1, "expected one pooled session on the stub"
+        _send(service, "after server hang-up")
+        _expect(stub, pool, "stale session (NOOP fails) is discarded and replaced",
+                connections=2, messages=3, noops=1, connects=2, reuses=1, discards=1)
+
+        stub.drop_next_mail()
+        _send(service, "dropped mid-send")
+        _expect(stub, pool, "SMTPServerDisconnected during send is retried once on a fresh session",
+                connections=3, messages=4, drops=1, connects=3, reuses=2, discards=2)
+
+        stub.drop_next_mail(2)
+        ok, error = service.send_email(["intake@example.com"], "dropped twice", "<p>check</p>")
+        assert not ok and error, "a second disconnect in the same send must be reported, not retried again"
+        _expect(stub, pool, "second disconnect fails the send", drops=3, discards=4)
+
+        pool.max_idle = 0
+        _send(service, "refill")
+        time.sleep(0.01)
+        _send(service, "after idle timeout")
+        _expect(stub, pool, "session idle past max_idle is dropped without NOOP", connections=6, noops=3)
+
+        if hasattr(os, "fork"):
+            pool.max_idle = 60
+            _send(service, "before fork")
+            assert len(pool._idle) == 1, "expected one idle session before forking"
+            connections = stub.counters["connections"]
+            stats = dict(pool.stats)
+            pid = os.fork()
+            if pid == 0:
+                # Child: the inherited session must be forgotten, not reused or QUIT.
+                code = 0
+                try:
+                    _send(service, "from child")
+                    assert pool.stats["reuses"] == stats["reuses"], f"child reused a parent session: {pool.stats}"
+                    assert pool.stats["connects"] == stats["connects"] + 1, f"child did not connect: {pool.stats}"
+                    pool.close_all()
+                except BaseException as e:
+                    print(f"FAIL child: {e}", file=sys.stderr)
+                    code = 1
+                os._exit(code)
+            _, status = os.waitpid(pid, 0)
+            assert status == 0, "forked child did not reset the pool"
+            _expect(stub, pool, "forked child opens its own session", connections=connections + 1)
+            _send(service, "parent after fork")
+            _expect(stub, pool, "parent keeps its session across the fork", connections=connections + 1)
+        else:
+            print("--  fork reset skipped (no os.fork on this platform)")
+
+        pool.max_size = 4
+        before = dict(pool.stats)
+        threads = [threading.Thread(target=lambda: [_send(service, "concurrent") for _ in range(25)])
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        acquired = (pool.stats["connects"] - before["connects"]) + (pool.stats["reuses"] - before["reuses"])
+        assert acquired == 200, f"stats lost updates under threads: {acquired} acquisitions for 200 sends"
+        print("ok  stats counters are consistent under concurrent sends")
+        pool.close_all()
+
+    for security in ("STARTTLS", "SSL"):
+        check_tls(security)
+    print("All SMTP pool checks passed.")
+
+
+def check_tls(security: str) -> None:
+    """NOOP reuse and reconnects over TLS: only new sessions pay a handshake."""
+    with StubSMTPServer(security=security).start() as stub:
+        _use_stub(stub)
+        from app.gmailproxy import RealGmailService, SMTPConnectionPool
+
+        service = RealGmailService()
+        assert service.security == security, f"service picked up SMTP_SECURITY={service.security}"
+        pool = service.pool = SMTPConnectionPool(service.smtp_host, service.port, service.security,
+                                                 service.username, service.password, service.timeout,
+                                                 max_size=1, max_idle=60, context=client_context())
+
+        _send(service, f"{security} first")
+        _send(service, f"{security} reused")
+        _expect(stub, pool, f"{security}: idle session is reused after NOOP without a new handshake",
+                connections=1, handshakes=1, messages=2, noops=1, connects=1, reuses=1)
+
+        assert stub.drop_connections() == 1, "expected one pooled session on the stub"
+        _send(service, f"{security} after server hang-up")
+        _expect(stub, pool, f"{security}: stale session is discarded and replaced",
+                connections=2, handshakes=2, messages=3, connects=2, discards=1)
+
+        stub.drop_next_mail()
+        _send(service, f"{security} dropped mid-send")
+        _expect(stub, pool, f"{security}: SMTPServerDisconnected during send is retried once on a fresh session",
+                connections=3, handshakes=3, messages=4, drops=1, connects=3, discards=2)
+        pool.close_all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare pooled vs unpooled SMTP sends.")
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub delay before each SMTP reply")
+    parser.add_argument("--connect-latency", type=float, default=0.02, help="Stub delay before the greeting")
+    parser.add_argument("--check", action="store_true", help="Assert reconnect/NOOP/fork behaviour instead of benchmarking")
+    args = parser.parse_args()
+    if args.check:
+        check()
+    else:
+        run(args.messages, args.latency, args.connect_latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Local stand-in SMTP server for benchmarks.
+
+Speaks just enough ESMTP (EHLO/HELO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET,
+NOOP, QUIT, STARTTLS) for smtplib clients. `security` picks the SMTP_SECURITY
+mode it serves: NONE, STARTTLS or SSL (TLS from the first byte), with the
+self-signed STUB_CERT for 127.0.0.1 / localhost; clients trust it through
+`client_context()`. Messages are counted and discarded. `latency` adds a delay
+before every reply, and `connect_latency` delays the greeting to mimic a TCP +
+TLS handshake to a remote server.
+
+For fault injection, `drop_connections()` closes every open session (a pooled
+connection the server timed out), and `drop_next_mail(n)` hangs up instead of
+answering the next `n` MAIL commands (a session that dies mid-send).
+
+    python -m benchmarks.smtp_stub --port 2525 --latency 0.02 [--security STARTTLS]
+"""
+import os
+import ssl
+import time
+import socket
+import argparse
+import threading
+import socketserver
+from typing import Dict, Optional, Set, Tuple
+
+# Self-signed certificate + key for 127.0.0.1 / localhost (test-only, valid until 2126).
+STUB_CERT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_cert.pem")
+
+
+def client_context() -> ssl.SSLContext:
+    """Client-side context that trusts the stub's certificate (and nothing else)."""
+    return ssl.create_default_context(cafile=STUB_CERT)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+        self.wfile.flush()
+
+    def setup(self) -> None:
+        if self.server.security == "SSL":
+            self.request = self.server.tls_context.wrap_socket(self.request, server_side=True)
+            self.server.count("handshakes")
+        super().setup()
+        self.server.track(self.connection, True)
+
+    def _starttls(self) -> None:
+        self._reply("220 2.0.0 Ready to start TLS")
+        self.server.track(self.connection, False)
+        self.request = self.connection = self.server.tls_context.wrap_socket(self.connection, server_side=True)
+        self.server.count("handshakes")
+        self.server.track(self.connection, True)
+        self.rfile = self.connection.makefile("rb", self.rbufsize)
+        self.wfile = self.connection.makefile("wb")
+
+    def finish(self) -> None:
+        self.server.track(self.connection, False)
+        super().finish()
+
+    def handle(self) -> None:
+        server = self.server
+        server.count("connections")
+        if server.connect_latency:
+            time.sleep(server.connect_latency)
+        self._reply("220 localhost stub ESMTP ready")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n")
+                if server.security == "STARTTLS" and not isinstance(self.connection, ssl.SSLSocket):
+                    self.wfile.write(b"250-STARTTLS\r\n")
+                self._reply("250 SMTPUTF8")
+            elif verb == "STARTTLS" and server.security == "STARTTLS" and not isinstance(self.connection, ssl.SSLSocket):
+                self._starttls()
+            elif verb == "HELO":
+                self._reply("250 localhost")
+            elif verb == "AUTH":
+                parts = line.split()
+                if len(parts) == 2 and parts[1].upper() == "LOGIN":
+                    self._reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self._reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self._reply("334 ")
+                    self.rfile.readline()
+                server.count("logins")
+                self._reply("235 2.7.0 Authentication successful")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                server.count("messages")
+                self._reply("250 2.0.0 OK queued")
+            elif verb == "NOOP":
+                server.count("noops")
+                self._reply("250 2.0.0 OK")
+            elif verb == "QUIT":
+                self._reply("221 2.0.0 Bye")
+                return
+            elif verb == "MAIL" and server.take_mail_drop():
+                server.count("drops")
+                return
+            elif verb in ("MAIL", "RCPT", "RSET"):
+                self._reply("250 2.0.0 OK")
+            else:
+                self._reply("502 5.5.2 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0),
+                 latency: float = 0.0, connect_latency: float = 0.0, security: str = "NONE"):
+        super().__init__(address, _SMTPHandler)
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.security = security.upper()
+        self.tls_context: Optional[ssl.SSLContext] = None
+        if self.security in ("SSL", "STARTTLS"):
+            self.tls_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.tls_context.load_cert_chain(STUB_CERT)
+        self.counters: Dict[str, int] = {"connections": 0, "logins": 0, "messages": 0, "noops": 0, "drops": 0,
+                                         "handshakes": 0}
+        self._counter_lock = threading.Lock()
+        self._sessions: Set[socket.socket] = set()
+        self._mail_drops = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count(self, name: str) -> None:
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def reset_counters(self) -> None:
+        with self._counter_lock:
+            for name in self.counters:
+                self.counters[name] = 0
+
+    def track(self, conn: socket.socket, open_: bool) -> None:
+        with self._counter_lock:
+            if open_:
+                self._sessions.add(conn)
+            else:
+                self._sessions.discard(conn)
+
+    def drop_connections(self) -> int:
+        """Hang up on every open session; returns how many were closed."""
+        with self._counter_lock:
+            sessions = list(self._sessions)
+        for conn in sessions:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return len(sessions)
+
+    def drop_next_mail(self, count: int = 1) -> None:
+        with self._counter_lock:
+            self._mail_drops = count
+
+    def take_mail_drop(self) -> bool:
+        with self._counter_lock:
+            if self._mail_drops <= 0:
+                return False
+            self._mail_drops -= 1
+            return True
+
+    def start(self) -> "StubSMTPServer":
+        """Serve from a daemon thread and return self (handy for `with StubSMTPServer().start() as s:`)."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local stand-in SMTP server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each reply")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="Seconds to wait before the greeting")
+    parser.add_argument("--security", choices=["NONE", "STARTTLS", "SSL"], default="NONE",
+                        help=f"SMTP_SECURITY mode to serve (TLS uses {os.path.basename(STUB_CERT)})")
+    args = parser.parse_args()
+    server = StubSMTPServer((args.host, args.port), args.latency, args.connect_latency, args.security)
+    print(f"Stub SMTP server listening on {args.host}:{server.port} ({server.security}, Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. {server.counters}")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
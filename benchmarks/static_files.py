@@ -0,0 +1,54 @@
+"""
+Static file micro-benchmark.
+
+Requests per second for static assets answered by the StaticFiles middleware
+(index lookup + hot-file byte cache, app/staticfiles.py) against the same
+requests dispatched through Flask (`AssetManifest.send`), calling the WSGI app
+in-process so only the Python-side cost per request is measured.
+
+    python -m benchmarks.static_files --iterations 5000
+"""
+import time
+import argparse
+
+from werkzeug.test import EnvironBuilder
+
+from app import app, assets, static_files
+
+FILES = ["css/custom.min.css", "locales/en-US.json", "robots.txt", "images/about_Joan_Suh.avif"]
+
+
+def run(wsgi_app, environ: dict, iterations: int) -> float:
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = wsgi_app(dict(environ), start_response)
+        for _ in body:
+            pass
+        if hasattr(body, "close"):
+            body.close()
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare static serving with and without the StaticFiles middleware.")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with app.test_request_context():
+        urls = [assets.url(name) for name in FILES] + ["/static/css/custom.min.css", "/robots.txt"]
+    client = app.test_client()
+    for url in urls:
+        etag = client.get(url).headers["ETag"]
+        for label, headers in (("200", {}), ("304", {"If-None-Match": etag})):
+            environ = EnvironBuilder(path=url, headers=headers).get_environ()
+            flask = run(static_files.wsgi_app, environ, args.iterations)
+            middleware = run(static_files, environ, args.iterations)
+            print(f"{url[-44:]:<44} {label}  Flask {flask:8.0f}/s   middleware {middleware:9.0f}/s   x{middleware / flask:.1f}")
+    print(static_files.stats())
+
+
+if __name__ == "__main__":
+    main()
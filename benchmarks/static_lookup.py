@@ -0,0 +1,91 @@
+"""
+server.py static lookup micro-benchmark.
+
+Builds a throwaway project with files spread across STATIC_SUBDIRS and compares
+requests per second for the original per-request `os.path.exists` loop against
+create_app's precomputed StaticIndex, for hits in the last subdir (worst case
+for the loop) and for 404s.
+
+    python -m benchmarks.static_lookup --files 300 --requests 3000
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from flask import Flask, send_from_directory
+
+import server
+
+
+def legacy_app(static_root: str) -> Flask:
+    """The pre-index create_app: probe every STATIC_SUBDIR on each request."""
+    app = Flask(__name__, static_folder=static_root)
+
+    @app.route("/<path:filename>")
+    def serve_file(filename: str):
+        for sub in server.STATIC_SUBDIRS:
+            sub_dir = os.path.join(app.static_folder, sub)
+            candidate = os.path.join(sub_dir, filename)
+            if not os.path.exists(candidate):
+                continue
+            if filename.endswith(".js"):
+                return send_from_directory(sub_dir, filename, mimetype="application/javascript")
+            if filename.endswith(".css"):
+                return send_from_directory(sub_dir, filename, mimetype="text/css")
+            return app.send_static_file(f"{sub}/{filename}")
+        return "File not found", 404
+
+    return app
+
+
+def make_project(root: str, files: int) -> list:
+    """Spread `files` small assets over the subdirs; return request paths that live in the LAST subdir."""
+    last = server.STATIC_SUBDIRS[-1]
+    hits = []
+    for i in range(files):
+        sub = server.STATIC_SUBDIRS[i % len(server.STATIC_SUBDIRS)]
+        rel = f"js/module{i}.js" if i % 2 else f"css/style{i}.css"
+        path = os.path.join(root, sub, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("/* asset */\n" * 20)
+        if sub == last:
+            hits.append(rel)
+    return hits
+
+
+def measure(app: Flask, paths: list, requests: int) -> float:
+    client = app.test_client()
+    start = time.perf_counter()
+    for i in range(requests):
+        response = client.get(f"/{paths[i % len(paths)]}")
+        response.close()
+    return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare static path resolution strategies in server.py.")
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="static-lookup-")
+    try:
+        hits = make_project(root, args.files)
+        misses = [f"missing/file{i}.js" for i in range(50)]
+        apps = {
+            "legacy loop": legacy_app(root),
+            "StaticIndex": server.create_app(root, frozen=True),
+        }
+        for case, paths in (("hit (last subdir)", hits), ("404", misses)):
+            for label, app in apps.items():
+                rps = measure(app, paths, args.requests)
+                print(f"{case:<18} {label:<12} {rps:10.0f} req/s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
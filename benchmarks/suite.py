@@ -0,0 +1,538 @@
+"""
+Load and latency benchmark suite.
+
+Drives one target with a fixed, seeded request mix and writes machine-readable
+JSON, so container sizes can be based on numbers and two runs (before/after a
+change) can be compared.
+
+Targets
+    app        app.app in-process (werkzeug test client per thread)
+    server     server.create_app over a generated static project, in-process
+    build      build_project of the same project, served by server.create_build_app in-process
+    gunicorn   `python -m app --bind 127.0.0.1:<port> ...` (the real launcher) over HTTP
+
+Scenarios
+    pages      GET /, /motor-vehicle-accident, /personal-injury (the project's pages for server/build)
+    static     fingerprinted CSS/JS, locale JSON, an image, robots.txt (the project's assets for server/build)
+    intake     POST / with valid AutoAccidentWizardForm payloads (CSRF token from a GET /); app/gunicorn only
+
+Submissions go to a throwaway store/outbox, and the outbox delivery worker
+(a thread in-process, the launcher's child under gunicorn) sends them to the
+local stand-in SMTP server (benchmarks/smtp_stub.py) with `--smtp-latency`
+per reply. The report holds per scenario: throughput, p50/p95/p99/mean/max
+latency and status codes; per process (gunicorn master, each worker, the
+outbox worker): RSS and the read/write syscall and context-switch counts
+during the run (from /proc, Linux only); and the emails delivered.
+
+    python -m benchmarks.suite run --target app --requests 600 --output before.json
+    python -m benchmarks.suite run --target gunicorn --workers 3 --concurrency 8 --smtp-latency 0.05
+    python -m benchmarks.suite compare before.json after.json --threshold 0.10
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import random
+import socket
+import contextlib
+import signal
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .smtp_stub import StubSMTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ("app", "server", "build", "gunicorn")
+SCENARIOS = ("pages", "static", "intake")
+APP_PAGES = ["/", "/motor-vehicle-accident", "/personal-injury"]
+APP_ASSETS = ["css/custom.min.css", "js/index.js", "locales/en-US.json", "images/about_Joan_Suh.avif", "robots.txt"]
+WIZARD_FORM = {
+    "accident_type": ["Car Accident", "Motorcycle Accident", "Truck Accident", "Pedestrian", "Rideshare"],
+    "zip_code": ["30096", "30097", "30043", "30024"],
+    "medical_treatment": ["Yes", "No"],
+    "police_report": ["Yes", "No"],
+    "at_fault": ["No", "Not sure"],
+    "has_lawyer": ["No"],
+    "accident_date": ["Within the last month", "1-6 months ago"],
+    "primary_injury": ["Back / Neck", "Head", "Broken bones"],
+    "first_name": ["Jane", "John", "Minji"],
+    "last_name": ["Doe", "Roe", "Kim"],
+    "email": ["bench@example.com"],
+    "phone": ["(770) 555-0100"],
+}
+CSRF_INPUT = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+# Relative change beyond which `compare` reports a regression.
+DEFAULT_THRESHOLD = 0.10
+
+
+# --- Sessions --------------------------------------------------------------------------
+
+class InProcessSession:
+    """One client of an in-process WSGI app (keeps its own cookies)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, form: Optional[Dict] = None) -> Tuple[int, bytes]:
+        response = self.client.open(path, method=method, data=form)
+        body = response.get_data()
+        response.close()
+        return response.status_code, body
+
+
+class HTTPSession:
+    """One HTTP client of a running server, with a keep-alive connection and a cookie jar."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.cookies: Dict[str, str] = {}
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def request(self, method: str, path: str, form: Optional[Dict] = None) -> Tuple[int, bytes]:
+        headers = {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the keep-alive connection (sync workers do after every response).
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        for header in response.msg.get_all("Set-Cookie") or []:
+            name, _, rest = header.partition("=")
+            self.cookies[name.strip()] = rest.split(";", 1)[0]
+        if response.getheader("Connection", "").lower() == "close":
+            self.conn.close()
+            self.conn = None
+        return response.status, data
+
+
+# --- Measurement -----------------------------------------------------------------------
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], errors: int, elapsed: float) -> Dict:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(1000 * seconds, 3)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(ordered, 50)), "p95": ms(percentile(ordered, 95)), "p99": ms(percentile(ordered, 99)),
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0, "max": ms(ordered[-1]) if ordered else 0.0,
+        },
+    }
+
+
+def drive(new_session: Callable, plan: List[Tuple[str, str, Optional[Dict]]], concurrency: int,
+          prepare: Optional[Callable] = None, expect: Tuple[int, ...] = (200, 302)) -> Dict:
+    """Send `plan` (method, path, form) over `concurrency` sessions; `prepare(session)` runs before the clock starts."""
+    sessions = [new_session() for _ in range(concurrency)]
+    contexts = [prepare(session) if prepare else None for session in sessions]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = [0]
+    lock = threading.Lock()
+    cursor = iter(range(len(plan)))
+
+    def client(session, context):
+        local, local_statuses, local_errors = [], {}, 0
+        while True:
+            with lock:
+                index = next(cursor, None)
+            if index is None:
+                break
+            method, path, form = plan[index]
+            if form is not None and context:
+                form = dict(form, csrf_token=context)
+            start = time.perf_counter()
+            try:
+                status, _ = session.request(method, path, form)
+            except Exception:
+                status = 0
+            local.append(time.perf_counter() - start)
+            local_statuses[str(status)] = local_statuses.get(str(status), 0) + 1
+            if status not in expect:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(s, c)) for s, c in zip(sessions, contexts)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, statuses, errors[0], time.perf_counter() - start)
+
+
+def csrf_token(session) -> Optional[str]:
+    _, body = session.request("GET", "/")
+    match = CSRF_INPUT.search(body.decode("utf-8", "replace"))
+    return match.group(1) if match else None
+
+
+def wizard_forms(count: int, rng: random.Random) -> List[Dict]:
+    return [{name: rng.choice(values) for name, values in WIZARD_FORM.items()} for _ in range(count)]
+
+
+# --- /proc -----------------------------------------------------------------------------
+
+def process_stats(pid: int) -> Optional[Dict]:
+    """RSS and cumulative syscall / context-switch counters of a process (Linux /proc), or None."""
+    stats = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    stats[key.lower() + "_kb"] = int(value.split()[0])
+                elif key in ("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches"):
+                    stats[key] = int(value)
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("syscr", "syscw"):
+                    stats[key] = int(value)
+    except (OSError, ValueError):
+        return stats or None
+    return stats
+
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    for name in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                # The command may contain spaces; fields after the closing parenthesis are fixed.
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(name))
+    return sorted(children)
+
+
+def process_role(pid: int, master: int) -> str:
+    if pid == master:
+        return "master"
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace")
+    except OSError:
+        return "child"
+    return "outbox" if "outbox" in cmdline else "worker"
+
+
+def snapshot(pids: Dict[int, str]) -> Dict[int, Dict]:
+    return {pid: process_stats(pid) or {} for pid in pids}
+
+
+def process_report(pids: Dict[int, str], before: Dict[int, Dict], after: Dict[int, Dict]) -> List[Dict]:
+    report = []
+    for pid, role in sorted(pids.items(), key=lambda item: (item[1], item[0])):
+        start, end = before.get(pid, {}), after.get(pid, {})
+        entry = {"pid": pid, "role": role, "rss_kb": end.get("vmrss_kb"), "peak_rss_kb": end.get("vmhwm_kb")}
+        for key in ("syscr", "syscw", "voluntary_ctxt_switches", "nonvoluntary_ctxt_switches"):
+            if key in end:
+                entry[key] = end[key] - start.get(key, 0)
+        report.append(entry)
+    return report
+
+
+# --- Targets ---------------------------------------------------------------------------
+
+def make_project(root: str) -> Tuple[List[str], List[str]]:
+    """Static project for server/build (pages in public/, assets in src/); returns (page paths, asset paths)."""
+    files = {
+        "public/index.html": None, "public/about.html": None, "public/contact.html": None,
+        "src/css/site.css": os.path.join(ROOT, "static", "css", "custom.min.css"),
+        "src/js/site.js": os.path.join(ROOT, "static", "js", "index.js"),
+        "src/data/en-US.json": os.path.join(ROOT, "static", "locales", "en-US.json"),
+        "src/images/photo.avif": os.path.join(ROOT, "static", "images", "about_Joan_Suh.avif"),
+        "includes/robots.txt": os.path.join(ROOT, "static", "robots.txt"),
+    }
+    for rel, source in files.items():
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if source is None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('<!doctype html><html><head><link rel="stylesheet" href="/css/site.css"></head>'
+                        f'<body>{"<p>Benchmark page.</p>" * 200}<script src="/js/site.js"></script></body></html>')
+        else:
+            shutil.copyfile(source, path)
+    return ["/", "/about.html", "/contact.html"], ["/css/site.css", "/js/site.js", "/data/en-US.json",
+                                                   "/images/photo.avif", "/robots.txt"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited with code {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Server did not listen on port {port} within {timeout:.0f}s")
+
+
+def outbox_drained(outbox_dir: str, timeout: float) -> Optional[float]:
+    """Seconds until the outbox had no pending/processing jobs left (None on timeout)."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        busy = sum(len(os.listdir(os.path.join(outbox_dir, state)))
+                   for state in ("pending", "processing") if os.path.isdir(os.path.join(outbox_dir, state)))
+        if not busy:
+            return round(time.perf_counter() - start, 3)
+        time.sleep(0.05)
+    return None
+
+
+def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    stub = StubSMTPServer(latency=args.smtp_latency).start()
+    env = {
+        "SUBMISSION_STORE": os.path.join(workdir, "submissions.db"),
+        "OUTBOX_DIR": os.path.join(workdir, "outbox"),
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(stub.port), "SMTP_SECURITY": "NONE",
+        "SMTP_USERNAME": "bench@example.com", "SMTP_PASSWORD": "bench",
+        "OUTBOX_POLL_INTERVAL": "0.05", "EMAIL_DELIVERY_MODE": "immediate",
+        # Every client is 127.0.0.1 and posts right after loading the page: measure the pipeline, not the limits.
+        "ADMISSION_DB": os.path.join(workdir, "admission.db"), "ADMISSION_IP_LIMIT": "0",
+        "ADMISSION_GLOBAL_LIMIT": "0", "ADMISSION_MIN_FILL_SECONDS": "0",
+    }
+    os.environ.update(env)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    proc = None
+    try:
+        if args.target in ("app", "gunicorn"):
+            pages, assets = APP_PAGES, APP_ASSETS
+        else:
+            pages, assets = make_project(os.path.join(workdir, "project"))
+            scenarios = [s for s in scenarios if s != "intake"]
+
+        if args.target == "app":
+            # Imported only now: the app reads the store/outbox/metrics locations from the environment.
+            from app import app, assets as asset_manifest
+            from app.outbox import Outbox, run_worker
+            with app.test_request_context():
+                assets = [asset_manifest.url(name) if name != "robots.txt" else "/robots.txt" for name in assets]
+            threading.Thread(target=run_worker, args=(Outbox(),), kwargs={"poll_interval": 0.05}, daemon=True).start()
+            new_session = lambda: InProcessSession(app)
+            pids = {os.getpid(): "in-process"}
+        elif args.target in ("server", "build"):
+            sys.path.insert(0, ROOT)
+            import server
+            project = os.path.join(workdir, "project")
+            if args.target == "server":
+                static_app = server.create_app(project, frozen=True)
+            else:
+                static_app = server.create_build_app(server.build_project(project, out_dir=os.path.join(workdir, "build")))
+            new_session = lambda: InProcessSession(static_app)
+            pids = {os.getpid(): "in-process"}
+        else:
+            port = free_port()
+            cmd = [sys.executable, "-m", "app", "--bind", f"127.0.0.1:{port}", "--worker-class", args.worker_class]
+            if args.workers:
+                cmd += ["--workers", str(args.workers)]
+            proc = subprocess.Popen(cmd, cwd=ROOT, env=dict(os.environ, OUTBOX_WORKER="1"),
+                                    stdout=subprocess.DEVNULL if not args.verbose else None,
+                                    stderr=subprocess.DEVNULL if not args.verbose else None)
+            wait_for_port(port, proc)
+            new_session = lambda: HTTPSession("127.0.0.1", port)
+            # Fingerprinted URLs as the pages link them.
+            probe = new_session()
+            html = b"".join(probe.request("GET", page)[1] for page in APP_PAGES).decode("utf-8", "replace")
+            resolved = []
+            for name in assets:
+                stem, ext = os.path.splitext(name)
+                match = re.search(rf'/static/{re.escape(stem)}\.[0-9a-f]{{12}}{re.escape(ext)}', html)
+                resolved.append(match.group(0) if match else ("/robots.txt" if name == "robots.txt" else f"/static/{name}"))
+            assets = resolved
+            time.sleep(0.5)
+            pids = {proc.pid: "master"}
+            pids.update({pid: process_role(pid, proc.pid) for pid in child_pids(proc.pid)})
+
+        report = {"meta": {
+            "target": args.target, "requests": args.requests, "concurrency": args.concurrency,
+            "warmup": args.warmup, "seed": args.seed, "smtp_latency_s": args.smtp_latency,
+            "workers": args.workers, "worker_class": args.worker_class if args.target == "gunicorn" else None,
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "commit": _git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }, "scenarios": {}}
+
+        plans = {
+            "pages": [("GET", rng.choice(pages), None) for _ in range(args.requests)],
+            "static": [("GET", rng.choice(assets), None) for _ in range(args.requests)],
+            "intake": [("POST", "/", form) for form in wizard_forms(args.requests, rng)],
+        }
+        before = snapshot(pids)
+        for scenario in scenarios:
+            prepare = csrf_token if scenario == "intake" else None
+            if args.warmup:
+                drive(new_session, plans[scenario][:args.warmup], 1, prepare)
+                if scenario == "intake":
+                    outbox_drained(env["OUTBOX_DIR"], args.drain_timeout)
+            stub.reset_counters()
+            result = drive(new_session, plans[scenario], args.concurrency, prepare)
+            if scenario == "intake":
+                result["outbox_drain_s"] = outbox_drained(env["OUTBOX_DIR"], args.drain_timeout)
+                result["emails_delivered"] = stub.counters["messages"]
+            report["scenarios"][scenario] = result
+            print(_line(scenario, result), file=sys.stderr)
+        report["processes"] = process_report(pids, before, snapshot(pids))
+        return report
+    finally:
+        if proc is not None:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _line(scenario: str, result: Dict) -> str:
+    latency = result["latency_ms"]
+    extra = ""
+    if "emails_delivered" in result:
+        extra = f"  emails={result['emails_delivered']} drain={result['outbox_drain_s']}s"
+    return (f"{scenario:<7} {result['requests']:>6} req  {result['throughput_rps']:>9.1f} req/s  "
+            f"p50 {latency['p50']:>8.2f} ms  p95 {latency['p95']:>8.2f} ms  p99 {latency['p99']:>8.2f} ms  "
+            f"errors {result['errors']}{extra}")
+
+
+# --- Compare ---------------------------------------------------------------------------
+
+def compare(base: Dict, new: Dict, threshold: float) -> List[str]:
+    """Print a side-by-side table; returns the regressions (throughput down, p95/p99/errors/RSS up by more than `threshold`)."""
+    regressions = []
+    print(f"{'scenario':<8} {'metric':<14} {'base':>10} {'new':>10} {'change':>8}")
+    for scenario in sorted(set(base["scenarios"]) & set(new["scenarios"])):
+        old, cur = base["scenarios"][scenario], new["scenarios"][scenario]
+        rows = [("throughput_rps", old["throughput_rps"], cur["throughput_rps"], True)]
+        rows += [(f"{q}_ms", old["latency_ms"][q], cur["latency_ms"][q], False) for q in ("p50", "p95", "p99")]
+        rows.append(("errors", old["errors"], cur["errors"], False))
+        for metric, a, b, higher_is_better in rows:
+            change = (b - a) / a if a else (0.0 if a == b else float("inf"))
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold and metric != "p50_ms" and not (metric == "errors" and b == 0):
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario} {metric}: {a} -> {b}")
+            print(f"{scenario:<8} {metric:<14} {a:>10} {b:>10} {change:>+8.1%}{flag}")
+    # Largest resident set per process role (a leak or a fatter worker shows up here).
+    for role in sorted({p["role"] for p in base.get("processes", [])} & {p["role"] for p in new.get("processes", [])}):
+        a, b = (max(p["rss_kb"] or 0 for p in report["processes"] if p["role"] == role) for report in (base, new))
+        change = (b - a) / a if a else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{role} rss_kb: {a} -> {b}")
+        print(f"{role:<8} {'rss_kb':<14} {a:>10} {b:>10} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load and latency benchmarks for the app and server.py.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the suite against one target and report JSON")
+    run_parser.add_argument("--target", choices=TARGETS, default="app")
+    run_parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    run_parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    run_parser.add_argument("--concurrency", type=int, default=4, help="Concurrent client sessions")
+    run_parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per scenario first")
+    run_parser.add_argument("--seed", type=int, default=1, help="Seed of the request mix")
+    run_parser.add_argument("--smtp-latency", type=float, default=0.0, help="Stub SMTP delay before each reply (s)")
+    run_parser.add_argument("--drain-timeout", type=float, default=60, help="Seconds to wait for the outbox to drain")
+    run_parser.add_argument("--workers", type=int, default=0, help="gunicorn: worker processes (default: launcher's)")
+    run_parser.add_argument("--worker-class", default="sync", help="gunicorn: worker class")
+    run_parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    run_parser.add_argument("--verbose", action="store_true", help="gunicorn: show the server's output")
+    compare_parser = commands.add_parser("compare", help="Compare two JSON reports; exit 1 on regressions")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help=f"Relative change counted as a regression (default {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.base, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}.")
+        return
+
+    # The app logs to stdout; keep it free for the JSON report.
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(encoded + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(encoded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Static asset pipeline shared by the site (`app`) and the standalone static server (`server.py`).
+
+- sendfile.py: static responses (Range/If-Range, zero-copy file wrapper, X-Accel-Redirect/X-Sendfile)
+- bundler.py: ES-module bundler (`python -m app bundle`) and the `module_url` template helpers
+- images.py: responsive image variants (`python -m app images`) and the `responsive_image` helper
+
+Nothing here imports `app`: importing that package builds the whole site (Flask app, static
+hashing, i18n, the admission and metrics stores), which server.py and the image encoder's
+worker processes must not pay for.
+"""
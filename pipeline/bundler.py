@@ -0,0 +1,644 @@
+"""
+ES-module bundler for the static/*.js module graph.
+
+`static/index.js` picks the page module (`./js/<page>.js`) at runtime, and
+every page module imports the shared `core-module.js` / `ext-module-*.js`
+modules, so an unbundled page pays a request waterfall several round-trips
+deep. The bundler resolves the static import graph from the entries (and from
+`import()` targets written as `./dir/${name}.js` templates), concatenates the
+modules into one file per entry, moves modules used by more than one entry into
+content-named shared chunks, and strips comments and whitespace.
+
+Every output keeps the path of its entry, so relative `import()` calls keep
+working: `dist/index.js`, `dist/js/<page>.js`, `dist/chunks/shared-<hash>.js`.
+Non-entry modules are hoisted into the bundle as closures that return their
+namespace, so imports become constant bindings (the graph only imports
+functions, which never need live bindings). Results are keyed by a hash of
+every input script; unchanged inputs are not bundled again.
+
+Command-line interface
+    python -m app bundle [--root static] [--out static/dist] [--entry index.js ...] [--force]
+
+The app serves `static/dist/` (when present and not in debug mode) through the
+`module_url` / `module_preloads` template helpers; server.py's build_project
+runs the same bundler over the project sources.
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import argparse
+import posixpath
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, current_app, url_for
+
+BUNDLE_DIR = "dist"
+BUNDLE_MANIFEST = "bundle-manifest.json"
+CHUNK_DIR = "chunks"
+BUNDLE_ENTRIES = ["index.js"]
+BUNDLE_CACHE_KEEP = 16
+# Bump when the output format changes so cached bundles are not reused.
+BUNDLER_VERSION = "1"
+
+
+class BundleError(ValueError):
+    """The module graph uses syntax the bundler does not handle."""
+
+
+class Module(NamedTuple):
+    rel: str
+    imports: List[Tuple[str, str]]  # (resolved module path, import clause)
+    body: str                       # comment-free source without its import statements
+    dynamic: List[str]              # resolved `import()` targets
+
+
+class Bundle(NamedTuple):
+    key: str
+    files: Dict[str, str]           # output path -> code
+    imports: Dict[str, List[str]]   # entry -> shared chunks it imports
+    modules: int
+    cached: bool
+
+
+# --- Tokenizer -----------------------------------------------------------------
+
+_WHITESPACE = " \t\r\n\f\v﻿ "
+_WORD = re.compile(r"[\w$]")
+# After these keywords a `/` starts a regular expression, not a division.
+_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw",
+                   "case", "do", "else", "yield", "await"}
+
+
+def _skip_string(source: str, i: int) -> int:
+    quote, j = source[i], i + 1
+    while j < len(source):
+        ch = source[j]
+        if ch == "\\":
+            j += 2
+            continue
+        if ch == quote:
+            return j + 1
+        if ch == "\n":
+            break
+        j += 1
+    raise BundleError(f"unterminated string at offset {i}")
+
+
+def _skip_comment(source: str, i: int) -> int:
+    if source.startswith("//", i):
+        end = source.find("\n", i)
+        return len(source) if end < 0 else end
+    end = source.find("*/", i + 2)
+    if end < 0:
+        raise BundleError(f"unterminated comment at offset {i}")
+    return end + 2
+
+
+def _skip_template(source: str, i: int) -> int:
+    j = i + 1
+    while j < len(source):
+        ch = source[j]
+        if ch == "\\":
+            j += 2
+        elif ch == "`":
+            return j + 1
+        elif source.startswith("${", j):
+            j = _skip_expression(source, j + 2)
+        else:
+            j += 1
+    raise BundleError(f"unterminated template literal at offset {i}")
+
+
+def _skip_expression(source: str, j: int) -> int:
+    """Index just past the `}` closing a template `${...}` expression that starts at `j`."""
+    depth = 1
+    while j < len(source):
+        ch = source[j]
+        if ch in "'\"":
+            j = _skip_string(source, j)
+        elif ch == "`":
+            j = _skip_template(source, j)
+        elif source.startswith(("//", "/*"), j):
+            j = _skip_comment(source, j)
+        else:
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return j + 1
+            j += 1
+    raise BundleError("unterminated template expression")
+
+
+def _skip_regex(source: str, i: int) -> int:
+    j, in_class = i + 1, False
+    while j < len(source):
+        ch = source[j]
+        if ch == "\\":
+            j += 2
+            continue
+        if ch == "\n":
+            break
+        j += 1
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "/":
+            while j < len(source) and _WORD.match(source[j]):
+                j += 1
+            return j
+    raise BundleError(f"unterminated regular expression at offset {i}")
+
+
+def _regex_allowed(last: str) -> bool:
+    if not last:
+        return True
+    if _WORD.match(last[-1]):
+        return last in _REGEX_KEYWORDS
+    return last[-1] not in ")]}'\"`/"
+
+
+def _separator(prev: str, token: str, pending: str) -> str:
+    """What to keep of the whitespace between `prev` and `token` when collapsing."""
+    a, b = prev[-1], token[0]
+    # A line break can end a statement (ASI), so keep it unless the neighbours rule that out.
+    if pending == "\n" and a not in "{;,([" and b not in ")]};,.":
+        return "\n"
+    if (_WORD.match(a) and _WORD.match(b)) or (a in "+-" and b in "+-") or (a == "/" and b in "/*"):
+        return " "
+    if b == "." and prev[0].isdigit():
+        return " "
+    return ""
+
+
+def strip_source(source: str, collapse: bool = False) -> str:
+    """
+    Remove comments from JavaScript source (strings, templates and regexes are left intact).
+
+    Without `collapse`, line structure is preserved so statements can still be matched line by line;
+    with it, indentation and redundant whitespace go too, keeping line breaks only where
+    automatic semicolon insertion could depend on them.
+    """
+    out: List[str] = []
+    pending = ""
+    last = ""
+    i, n = 0, len(source)
+    while i < n:
+        ch = source[i]
+        if ch in _WHITESPACE or source.startswith(("//", "/*"), i):
+            j = i
+            while j < n:
+                if source[j] in _WHITESPACE:
+                    j += 1
+                elif source.startswith(("//", "/*"), j):
+                    j = _skip_comment(source, j)
+                else:
+                    break
+            gap = source[i:j]
+            i = j
+            newlines = "\n" * sum(1 for c in gap if c == "\n")
+            if collapse:
+                pending = "\n" if newlines or pending == "\n" else " "
+            else:
+                out.append(newlines or " ")
+            continue
+        if ch in "'\"":
+            j = _skip_string(source, i)
+        elif ch == "`":
+            j = _skip_template(source, i)
+        elif ch == "/" and _regex_allowed(last):
+            j = _skip_regex(source, i)
+        elif _WORD.match(ch):
+            j = i + 1
+            while j < n and _WORD.match(source[j]):
+                j += 1
+        else:
+            j = i + 1
+        token = source[i:j]
+        i = j
+        if collapse and pending and out:
+            out.append(_separator(last, token, pending))
+        pending = ""
+        out.append(token)
+        last = token
+    return "".join(out).strip()
+
+
+# --- Module graph ----------------------------------------------------------------
+
+_IMPORT_STATEMENT = re.compile(
+    r"""^[ \t]*import\s*(?:(?P<clause>[^'"`;()]*?)\s*from\s*)?(?P<quote>['"])(?P<spec>[^'"]+)(?P=quote)[ \t]*;?""",
+    re.MULTILINE)
+_DYNAMIC_TARGET = re.compile(r"""(['"`])(\.{1,2}/[^'"`\s]*?\.m?js)\1""")
+_EXPORT_DECLARATION = re.compile(
+    r"^([ \t]*)export[ \t]+(default[ \t]+)?"
+    r"(?:((?:async[ \t]+)?function\b[ \t]*\*?[ \t]*|class\b[ \t]*)([\w$]*)|(const|let|var)\b[ \t]*([\w$]*))",
+    re.MULTILINE)
+_EXPORT_DEFAULT = re.compile(r"^([ \t]*)export[ \t]+default\b[ \t]*", re.MULTILINE)
+_EXPORT_LIST = re.compile(r"^[ \t]*export\s*\{([^}]*)\}[ \t]*(from\b)?[^\n;]*;?", re.MULTILINE)
+
+
+def _resolve(importer: str, spec: str, scripts: Dict[str, str]) -> str:
+    if not spec.startswith(("./", "../")):
+        raise BundleError(f"{importer}: only relative imports can be bundled ({spec!r})")
+    target = posixpath.normpath(posixpath.join(posixpath.dirname(importer), spec))
+    if target not in scripts:
+        raise BundleError(f"{importer}: cannot resolve {spec!r}")
+    return target
+
+
+def _dynamic_targets(rel: str, body: str, scripts: Dict[str, str]) -> List[str]:
+    """Modules an `import()` may load: relative .js literals, with `${...}` matching one path segment."""
+    if not re.search(r"\bimport\s*\(", body):
+        return []
+    targets = []
+    for _, literal in _DYNAMIC_TARGET.findall(body):
+        parts = re.split(r"\$\{[^}]*\}", literal)
+        pattern = re.compile("[^/]+".join(re.escape(part) for part in parts) + r"\Z")
+        base = posixpath.dirname(rel)
+        for candidate in sorted(scripts):
+            relative = posixpath.relpath(candidate, base) if base else candidate
+            if not relative.startswith("../"):
+                relative = "./" + relative
+            if pattern.match(relative) and candidate not in targets:
+                targets.append(candidate)
+    return targets
+
+
+def parse_module(rel: str, source: str, scripts: Dict[str, str]) -> Module:
+    code = strip_source(source)
+    if "import.meta" in code:
+        raise BundleError(f"{rel}: import.meta cannot be bundled")
+    imports = [(_resolve(rel, m.group("spec"), scripts), (m.group("clause") or "").strip())
+               for m in _IMPORT_STATEMENT.finditer(code)]
+    body = _IMPORT_STATEMENT.sub("", code)
+    return Module(rel, imports, body, _dynamic_targets(rel, body, scripts))
+
+
+def module_id(rel: str) -> str:
+    return "__m_" + re.sub(r"[^\w$]", "_", rel)
+
+
+def _bindings(clause: str, source_id: str) -> List[str]:
+    """`const` statements standing in for an import clause (`* as X`, `{a, b as c}`, `D`)."""
+    if not clause:
+        return []
+    statements = []
+    default = re.match(r"([\w$]+)\s*(?:,\s*|$)", clause)
+    if default:
+        statements.append(f"const {default.group(1)}={source_id}.default;")
+        clause = clause[default.end():].strip()
+    namespace = re.fullmatch(r"\*\s*as\s+([\w$]+)", clause)
+    named = re.fullmatch(r"\{(.*)\}", clause, re.DOTALL)
+    if namespace:
+        statements.append(f"const {namespace.group(1)}={source_id};")
+    elif named:
+        pairs = []
+        for item in named.group(1).split(","):
+            words = item.split()
+            if len(words) == 3 and words[1] == "as":
+                pairs.append(f"{words[0]}:{words[2]}")
+            elif len(words) == 1:
+                pairs.append(words[0])
+            elif words:
+                raise BundleError(f"unsupported import specifier {item.strip()!r}")
+        statements.append(f"const{{{','.join(pairs)}}}={source_id};")
+    elif clause:
+        raise BundleError(f"unsupported import clause {clause!r}")
+    return statements
+
+
+def _import_prelude(module: Module) -> str:
+    return "\n".join(statement for target, clause in module.imports for statement in _bindings(clause, module_id(target)))
+
+
+def _hoist(module: Module) -> str:
+    """A non-entry module as `const __m_<path> = (() => { ...; return namespace; })();`."""
+    exports: Dict[str, str] = {}
+
+    def declaration(match):
+        indent, default, keyword, name, kind, variable = match.groups()
+        if kind:
+            if default or not variable:
+                raise BundleError(f"{module.rel}: unsupported export {match.group(0).strip()!r}")
+            exports[variable] = variable
+            return f"{indent}{kind} {variable}"
+        if not name:
+            if not default:
+                raise BundleError(f"{module.rel}: unsupported export {match.group(0).strip()!r}")
+            exports["default"] = "__default"
+            return f"{indent}const __default={keyword}"
+        exports["default" if default else name] = name
+        return f"{indent}{keyword}{name}"
+
+    def default_expression(match):
+        exports["default"] = "__default"
+        return f"{match.group(1)}const __default="
+
+    def export_list(match):
+        if match.group(2):
+            raise BundleError(f"{module.rel}: re-exports (`export ... from`) cannot be bundled")
+        for item in match.group(1).split(","):
+            words = item.split()
+            if len(words) == 3 and words[1] == "as":
+                exports[words[2]] = words[0]
+            elif len(words) == 1:
+                exports[words[0]] = words[0]
+        return ""
+
+    body = _EXPORT_DECLARATION.sub(declaration, module.body)
+    body = _EXPORT_DEFAULT.sub(default_expression, body)
+    body = _EXPORT_LIST.sub(export_list, body)
+    if re.search(r"^[ \t]*export\b", body, re.MULTILINE):
+        raise BundleError(f"{module.rel}: unsupported export statement")
+    namespace = ",".join(name if name == local else f"{name}:{local}" for name, local in exports.items())
+    return (f"const {module_id(module.rel)}=(()=>{{\n{_import_prelude(module)}\n{body}\n"
+            f"return Object.freeze({{__proto__:null,{namespace}}});\n}})();")
+
+
+def input_hash(contents: Dict[str, str], entries: List[str]) -> str:
+    sha = hashlib.sha256(f"{BUNDLER_VERSION}\0{','.join(entries)}".encode())
+    for rel in sorted(contents):
+        sha.update(f"\0{rel}\0".encode())
+        sha.update(contents[rel].encode("utf-8", "surrogateescape"))
+    return sha.hexdigest()
+
+
+def _cache_load(cache_dir: Optional[str], key: str) -> Optional[Dict]:
+    if not cache_dir:
+        return None
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_store(cache_dir: Optional[str], key: str, payload: Dict) -> None:
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(path + ".tmp", path)
+    cached = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith(".json")),
+                    key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in cached[BUNDLE_CACHE_KEEP:]:
+        os.remove(entry.path)
+
+
+def bundle_modules(sources: Dict[str, str], entries: List[str], cache_dir: Optional[str] = None) -> Bundle:
+    """
+    Bundle the module graph rooted at `entries`.
+
+    `sources` maps module paths (posix, relative to the site root) to files on disk; only
+    `.js`/`.mjs` ones are read. `import()` targets are bundled as further entries at their own
+    paths. With `cache_dir`, results are stored there by input hash and reused.
+    """
+    scripts = {rel: path for rel, path in sources.items() if rel.endswith((".js", ".mjs"))}
+    contents = {}
+    for rel, path in scripts.items():
+        with open(path, "rb") as f:
+            contents[rel] = f.read().decode("utf-8", "surrogateescape")
+    missing = [entry for entry in entries if entry not in contents]
+    if missing:
+        raise BundleError(f"entry not found: {', '.join(missing)}")
+    key = input_hash(contents, entries)
+    cached = _cache_load(cache_dir, key)
+    if cached is not None:
+        return Bundle(key, cached["files"], cached["imports"], cached["modules"], True)
+
+    modules: Dict[str, Module] = {}
+    all_entries = list(entries)
+    closures: Dict[str, List[str]] = {}  # entry -> its static dependencies, dependencies first
+    for entry in all_entries:
+        order: List[str] = []
+
+        def visit(rel: str, stack: Tuple[str, ...]) -> None:
+            if rel not in modules:
+                modules[rel] = parse_module(rel, contents[rel], scripts)
+            for target, _ in modules[rel].imports:
+                if target in stack or target in order:
+                    continue
+                visit(target, stack + (target,))
+                order.append(target)
+
+        visit(entry, (entry,))
+        closures[entry] = order
+        for target in modules[entry].dynamic + [t for rel in order for t in modules[rel].dynamic]:
+            if target not in all_entries:
+                all_entries.append(target)
+    for entry, order in closures.items():
+        inner = [rel for rel in order if rel in closures]
+        if inner:
+            raise BundleError(f"{entry} statically imports entry module {inner[0]}")
+
+    # Modules reached from more than one entry go into a shared chunk per set of entries.
+    owners: Dict[str, List[str]] = {}
+    for entry in all_entries:
+        for rel in closures[entry]:
+            owners.setdefault(rel, []).append(entry)
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for entry in all_entries:
+        for rel in closures[entry]:
+            group = tuple(owners[rel])
+            if len(group) > 1 and rel not in groups.setdefault(group, []):
+                groups[group].append(rel)
+
+    location: Dict[str, str] = {}  # module -> output file defining it
+    files: Dict[str, str] = {}
+
+    def link(out: str, defined: List[str]) -> str:
+        """Import statements for the modules `defined` need from other output files."""
+        needed: Dict[str, List[str]] = {}
+        for rel in defined:
+            for target, _ in modules[rel].imports:
+                source = location.get(target)
+                if source and source != out and module_id(target) not in needed.setdefault(source, []):
+                    needed[source].append(module_id(target))
+        lines = []
+        for source, ids in needed.items():
+            path = posixpath.relpath(source, posixpath.dirname(out) or ".")
+            path = path if path.startswith("../") else "./" + path
+            lines.append(f"import{{{','.join(ids)}}}from\"{path}\";")
+        return "\n".join(lines)
+
+    # Bigger groups first: a chunk only depends on chunks shared by at least the same entries.
+    for group in sorted(groups, key=len, reverse=True):
+        defined = groups[group]
+        code = "\n".join([link("", defined)] + [_hoist(modules[rel]) for rel in defined]
+                         + [f"export{{{','.join(module_id(rel) for rel in defined)}}};"])
+        name = f"{CHUNK_DIR}/shared-{hashlib.sha256(code.encode()).hexdigest()[:12]}.js"
+        # Re-link relative to the chunk's real location now that it has a name.
+        code = "\n".join([link(name, defined)] + [_hoist(modules[rel]) for rel in defined]
+                         + [f"export{{{','.join(module_id(rel) for rel in defined)}}};"])
+        files[name] = strip_source(code, collapse=True)
+        for rel in defined:
+            location[rel] = name
+
+    imports: Dict[str, List[str]] = {}
+    for entry in all_entries:
+        private = [rel for rel in closures[entry] if rel not in location]
+        for rel in private:
+            location[rel] = entry
+        code = "\n".join([link(entry, private + [entry])] + [_hoist(modules[rel]) for rel in private]
+                         + [_import_prelude(modules[entry]), modules[entry].body])
+        files[entry] = strip_source(code, collapse=True)
+        imports[entry] = sorted({location[rel] for rel in closures[entry]} - {entry})
+        for rel in private:
+            del location[rel]
+
+    _cache_store(cache_dir, key, {"files": files, "imports": imports, "modules": len(modules)})
+    return Bundle(key, files, imports, len(modules), False)
+
+
+# --- App integration ---------------------------------------------------------------
+
+def _scripts(root: str, exclude: str) -> Dict[str, str]:
+    sources = {}
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if os.path.join(directory, d) != exclude]
+        for name in files:
+            if name.endswith((".js", ".mjs")):
+                path = os.path.join(directory, name)
+                sources[os.path.relpath(path, root).replace(os.sep, "/")] = path
+    return sources
+
+
+def load_manifest(out_dir: str) -> Dict:
+    try:
+        with open(os.path.join(out_dir, BUNDLE_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def bundle_directory(root: str, out_dir: Optional[str] = None, entries: Optional[List[str]] = None,
+                     cache_dir: Optional[str] = None, force: bool = False) -> Bundle:
+    """
+    Bundle `root` (the static folder) into `out_dir` (default `<root>/dist`).
+
+    The output directory is replaced as a whole, and left alone when its manifest already
+    records the current input hash.
+    """
+    root = os.path.abspath(root)
+    out_dir = os.path.abspath(out_dir or os.path.join(root, BUNDLE_DIR))
+    entries = list(entries or BUNDLE_ENTRIES)
+    sources = _scripts(root, out_dir)
+    contents = {}
+    for rel, path in sources.items():
+        with open(path, "rb") as f:
+            contents[rel] = f.read().decode("utf-8", "surrogateescape")
+    manifest = load_manifest(out_dir)
+    if not force and manifest.get("input_hash") == input_hash(contents, entries):
+        return Bundle(manifest["input_hash"], {}, manifest.get("imports", {}), manifest.get("modules", 0), True)
+
+    bundle = bundle_modules(sources, entries, cache_dir)
+    staging = out_dir + ".partial"
+    for directory in (staging, out_dir + ".old"):
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+    for rel, code in bundle.files.items():
+        path = os.path.join(staging, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+            f.write(code)
+    with open(os.path.join(staging, BUNDLE_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"input_hash": bundle.key, "imports": bundle.imports, "modules": bundle.modules,
+                   "files": sorted(bundle.files)}, f, indent=2, sort_keys=True)
+    if os.path.isdir(out_dir):
+        os.rename(out_dir, out_dir + ".old")
+    os.rename(staging, out_dir)
+    if os.path.isdir(out_dir + ".old"):
+        shutil.rmtree(out_dir + ".old")
+    return bundle
+
+
+class BundleManifest:
+    """
+    Template helpers for the bundled module graph.
+
+    `module_url('index.js')` is the fingerprinted URL of the bundled entry when
+    `static/dist/` holds a bundle (falling back to the unbundled module, and always
+    using it in debug mode so edits show up without re-bundling).
+    `module_preloads('js/personal-injury.js')` lists the page bundle and its shared
+    chunks for `<link rel="modulepreload">`, so they download in parallel with the
+    dispatcher instead of after it.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.out_dir = ""
+        self._stamp = None
+        self._manifest: Dict = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.out_dir = os.path.join(os.path.abspath(app.static_folder), BUNDLE_DIR)
+        app.add_template_global(self.url, "module_url")
+        app.add_template_global(self.preloads, "module_preloads")
+        app.extensions["bundles"] = self
+
+    def manifest(self) -> Dict:
+        """The bundle manifest, reloaded when `python -m app bundle` replaces it; empty in debug mode."""
+        if current_app.debug:
+            return {}
+        try:
+            stamp = os.stat(os.path.join(self.out_dir, BUNDLE_MANIFEST)).st_mtime_ns
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            self._manifest = load_manifest(self.out_dir) if stamp else {}
+            self._stamp = stamp
+        return self._manifest
+
+    def stamp(self):
+        """Changes whenever `python -m app bundle` replaces the outputs (None without any)."""
+        self.manifest()
+        return self._stamp
+
+    def url(self, entry: str) -> str:
+        assets = current_app.extensions["assets"]
+        if entry in self.manifest().get("imports", {}):
+            return assets.url(f"{BUNDLE_DIR}/{entry}")
+        return assets.url(entry)
+
+    def preloads(self, entry: str) -> List[str]:
+        # Plain URLs: they must match what the bundles import relative to each other.
+        chunks = self.manifest().get("imports", {}).get(entry)
+        if chunks is None:
+            return []
+        return [url_for("static", filename=f"{BUNDLE_DIR}/{rel}") for rel in [entry] + chunks]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app bundle", description="Bundle the static ES modules.")
+    parser.add_argument("--root", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"),
+                        help="Static folder holding the modules (default: ./static)")
+    parser.add_argument("--out", help=f"Output directory (default: <root>/{BUNDLE_DIR})")
+    parser.add_argument("--entry", action="append", help=f"Entry module, relative to the root (default: {', '.join(BUNDLE_ENTRIES)})")
+    parser.add_argument("--cache", help="Directory for cached bundles keyed by input hash")
+    parser.add_argument("--force", action="store_true", help="Bundle even if the output is up to date")
+    args = parser.parse_args(argv)
+
+    try:
+        bundle = bundle_directory(args.root, args.out, args.entry, args.cache, args.force)
+    except BundleError as e:
+        print(f"Bundling failed: {e}")
+        return 1
+    if not bundle.files:
+        print(f"Bundle up to date ({bundle.key[:12]}).")
+        return 0
+    chunks = [rel for rel in bundle.files if rel.startswith(f"{CHUNK_DIR}/")]
+    size = sum(len(code.encode("utf-8", "surrogateescape")) for code in bundle.files.values())
+    print(f"Bundled {bundle.modules} module(s) into {len(bundle.files) - len(chunks)} entr"
+          f"{'y' if len(bundle.files) - len(chunks) == 1 else 'ies'} + {len(chunks)} shared chunk(s), "
+          f"{size:,} B{' (cached)' if bundle.cached else ''}")
+    for entry, imports in sorted(bundle.imports.items()):
+        print(f"  {entry:<32} {len(bundle.files[entry]):>8,} B  imports {', '.join(imports) or '-'}")
+    return 0
@@ -0,0 +1,308 @@
+"""
+Responsive image variants and `srcset` emission.
+
+`static/images/` holds one full-size file per picture, so a phone downloads
+the same pixels as a desktop. This stage writes width-stepped variants of each
+image (every IMAGE_WIDTHS step below its width, plus the full width) as AVIF and
+WebP, plus PNG for images with real transparency:
+
+    static/images/variants/<stem>.<width>w.<avif|webp|png>
+    static/images/variants/images-manifest.json
+
+Variants are encoded into a content-addressed cache (key: hash of the source
+bytes, width, format, quality and IMAGES_VERSION), so unchanged images are never
+re-encoded, and encoding fans out over a process pool. When two sources share a
+stem (`JSlawGroupLOGO.png` / `.avif`), the one with the most pixels is used for
+both. Pillow (`pip install pillow`, 11.3+ for AVIF) is only needed to generate
+variants; without it, the stage is skipped with a notice.
+
+`responsive_image('images/about_Joan_Suh.avif', alt='...', sizes='50vw')` in a
+template emits a `<picture>` with AVIF/WebP `srcset`s, the `sizes` hint and the
+intrinsic `width`/`height` (so the browser reserves the box before the image
+loads). Without variants (or in debug mode), it falls back to a plain `<img>`.
+server.py's build_project runs the same stage over the project's images.
+
+Command-line interface
+    python -m app images [--root static] [--cache DIR] [-j N] [--force]
+"""
+import os
+import json
+import shutil
+import filecmp
+import posixpath
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, current_app
+from markupsafe import Markup, escape
+
+IMAGE_DIR = "images"
+VARIANT_SUBDIR = "variants"
+VARIANT_DIR = f"{IMAGE_DIR}/{VARIANT_SUBDIR}"
+IMAGE_MANIFEST = "images-manifest.json"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".avif")
+IMAGE_WIDTHS = [160, 320, 480, 640, 960, 1280, 1920]
+# Preference order of <picture> sources; the last format present is the <img> fallback.
+FORMATS = ["avif", "webp", "png"]
+QUALITY = {"avif": 55, "webp": 80}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "png": "image/png"}
+DEFAULT_CACHE = os.getenv("IMAGE_CACHE_DIR", os.path.join(".cache", "images"))
+# Bump when encoding settings change so cached variants are not reused.
+IMAGES_VERSION = "1"
+
+
+class Job(NamedTuple):
+    source: str      # path of the source image
+    key: str         # content address in the cache
+    width: int
+    height: int
+    fmt: str
+    out: str         # variant path relative to the static root
+
+
+def _require_pillow():
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def _digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_path(cache_dir: str, key: str, fmt: str) -> str:
+    return os.path.join(cache_dir, key[:2], f"{key}.{fmt}")
+
+
+def _open(Image, path: str):
+    image = Image.open(path)
+    image.load()
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        # Drop an alpha channel that is fully opaque: smaller files, and no PNG fallback needed.
+        if image.getchannel("A").getextrema() == (255, 255):
+            image = image.convert("RGB")
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def encode(job: Job, cache_dir: str) -> str:
+    """Encode one variant into the cache (runs in a worker process); returns its cache path."""
+    Image = _require_pillow()
+    path = cache_path(cache_dir, job.key, job.fmt)
+    if os.path.exists(path):
+        return path
+    image = _open(Image, job.source)
+    if image.width != job.width:
+        image = image.resize((job.width, job.height), Image.LANCZOS)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    options = {"optimize": True} if job.fmt == "png" else {"quality": QUALITY[job.fmt]}
+    if job.fmt == "webp":
+        options["method"] = 6
+    image.save(tmp, format=job.fmt.upper(), **options)
+    os.replace(tmp, path)
+    return path
+
+
+def plan(sources: Dict[str, str], widths: Optional[List[int]] = None) -> Tuple[List[Job], Dict[str, Dict]]:
+    """
+    Variant jobs and manifest for the images among `sources` (relative path -> file path).
+
+    Variants go to a `variants/` directory beside their source. Manifest entries: `"images/x.avif": {"width", "height", "variants": {"avif": [[w, h, path], ...]}}`.
+    """
+    Image = _require_pillow()
+    widths = sorted(widths or IMAGE_WIDTHS)
+    images = {rel: path for rel, path in sources.items()
+              if rel.lower().endswith(IMAGE_EXTENSIONS) and VARIANT_SUBDIR not in rel.split("/")[:-1]}
+    # One master per stem: the source with the most pixels.
+    masters: Dict[str, Tuple[int, str, str, object]] = {}
+    for rel, path in sorted(images.items()):
+        try:
+            image = _open(Image, path)
+        except Exception as e:
+            print(f"Skipping image {rel}: {e}")
+            continue
+        stem = os.path.splitext(rel)[0]
+        pixels = image.width * image.height
+        if stem not in masters or pixels > masters[stem][0]:
+            masters[stem] = (pixels, rel, path, image)
+
+    jobs, entries = [], {}
+    for stem, (_, rel, path, image) in sorted(masters.items()):
+        source_hash = _digest(path)
+        formats = [fmt for fmt in FORMATS if fmt != "png" or image.mode == "RGBA"]
+        steps = [w for w in widths if w < image.width] + [image.width]
+        entry = {"width": image.width, "height": image.height, "source": rel, "variants": {}}
+        for fmt in formats:
+            for width in steps:
+                height = max(1, round(image.height * width / image.width))
+                key = hashlib.sha256(f"{IMAGES_VERSION}\0{source_hash}\0{width}\0{fmt}\0{QUALITY.get(fmt)}".encode()).hexdigest()
+                out = posixpath.join(posixpath.dirname(stem), VARIANT_SUBDIR, f"{posixpath.basename(stem)}.{width}w.{fmt}")
+                jobs.append(Job(path, key, width, height, fmt, out))
+                entry["variants"].setdefault(fmt, []).append([width, height, out])
+        for other in images:
+            if os.path.splitext(other)[0] == stem:
+                entries[other] = entry
+    return jobs, entries
+
+
+def generate(sources: Dict[str, str], cache_dir: str, workers: Optional[int] = None,
+             widths: Optional[List[int]] = None) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+    """
+    Encode every missing variant into `cache_dir` in parallel.
+
+    Returns (variant path relative to the static root -> cache file, manifest), or ({}, {})
+    when Pillow is not installed.
+    """
+    if _require_pillow() is None:
+        print("Skipping responsive images: Pillow is not installed (pip install pillow).")
+        return {}, {}
+    cache_dir = os.path.abspath(cache_dir)
+    jobs, manifest = plan(sources, widths)
+    missing = [job for job in jobs if not os.path.exists(cache_path(cache_dir, job.key, job.fmt))]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(encode, missing, [cache_dir] * len(missing)))
+    print(f"Responsive images: {len(jobs)} variant(s) of {len({job.source for job in jobs})} image(s), "
+          f"{len(missing)} encoded, {len(jobs) - len(missing)} cached")
+    return {job.out: cache_path(cache_dir, job.key, job.fmt) for job in jobs}, manifest
+
+
+def _sources(root: str) -> Dict[str, str]:
+    sources = {}
+    directory = os.path.join(root, IMAGE_DIR)
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                sources[f"{IMAGE_DIR}/{name}"] = path
+    return sources
+
+
+def load_manifest(root: str) -> Dict:
+    try:
+        with open(os.path.join(root, *VARIANT_DIR.split("/"), IMAGE_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_images(root: str, cache_dir: str = DEFAULT_CACHE, workers: Optional[int] = None,
+                 force: bool = False) -> Tuple[Dict[str, Dict], int]:
+    """Write the variants of `<root>/images/*` into `<root>/images/variants/`; returns (manifest, files written)."""
+    root = os.path.abspath(root)
+    if force:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    variants, manifest = generate(_sources(root), cache_dir, workers)
+    if not variants:
+        return {}, 0
+    out_dir = os.path.join(root, *VARIANT_DIR.split("/"))
+    os.makedirs(out_dir, exist_ok=True)
+    written = 0
+    for rel, cached in variants.items():
+        path = os.path.join(root, *rel.split("/"))
+        if os.path.exists(path) and filecmp.cmp(path, cached, shallow=False):
+            continue
+        tmp = path + ".tmp"
+        shutil.copyfile(cached, tmp)
+        os.replace(tmp, path)
+        written += 1
+    current = {posixpath.basename(rel) for rel in variants} | {IMAGE_MANIFEST}
+    for name in os.listdir(out_dir):
+        if name not in current:
+            os.remove(os.path.join(out_dir, name))
+    tmp = os.path.join(out_dir, IMAGE_MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, IMAGE_MANIFEST))
+    return manifest, written
+
+
+class ImageManifest:
+    """`responsive_image(src, alt, sizes, **attrs)` template helper backed by the variants manifest."""
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.root = ""
+        self._stamp = None
+        self._manifest: Dict = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.root = os.path.abspath(app.static_folder)
+        app.add_template_global(self.render, "responsive_image")
+        app.extensions["images"] = self
+
+    def manifest(self) -> Dict:
+        """The variants manifest, reloaded when `python -m app images` replaces it; empty in debug mode."""
+        if current_app.debug:
+            return {}
+        try:
+            stamp = os.stat(os.path.join(self.root, *VARIANT_DIR.split("/"), IMAGE_MANIFEST)).st_mtime_ns
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            self._manifest = load_manifest(self.root) if stamp else {}
+            self._stamp = stamp
+        return self._manifest
+
+    def stamp(self):
+        """Changes whenever `python -m app images` replaces the outputs (None without any)."""
+        self.manifest()
+        return self._stamp
+
+    def render(self, src: str, alt: str = "", sizes: str = "100vw", **attrs) -> Markup:
+        assets = current_app.extensions["assets"]
+        entry = self.manifest().get(src)
+        attrs.setdefault("loading", "lazy")
+        attrs.setdefault("decoding", "async")
+        extra = "".join(f' {escape(name.rstrip("_").replace("_", "-"))}="{escape(value)}"'
+                        for name, value in attrs.items() if value is not None)
+        if entry is None:
+            return Markup(f'<img src="{escape(assets.url(src))}" alt="{escape(alt)}"{extra}>')
+
+        def srcset(fmt):
+            return ", ".join(f"{assets.url(rel)} {width}w" for width, _, rel in entry["variants"][fmt])
+
+        formats = [fmt for fmt in FORMATS if fmt in entry["variants"]]
+        fallback = formats[-1]
+        largest = entry["variants"][fallback][-1][2]
+        sources = "".join(f'<source type="{MIME_TYPES[fmt]}" srcset="{escape(srcset(fmt))}" sizes="{escape(sizes)}">'
+                          for fmt in formats[:-1])
+        return Markup(f'<picture>{sources}<img src="{escape(assets.url(largest))}" srcset="{escape(srcset(fallback))}" '
+                      f'sizes="{escape(sizes)}" width="{entry["width"]}" height="{entry["height"]}" '
+                      f'alt="{escape(alt)}"{extra}></picture>')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app images", description="Write responsive image variants.")
+    parser.add_argument("--root", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"),
+                        help="Static folder holding images/ (default: ./static)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help=f"Content-addressed variant cache (default: {DEFAULT_CACHE}, env IMAGE_CACHE_DIR)")
+    parser.add_argument("-j", "--jobs", type=int, help="Encoder processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="Clear the cache and re-encode everything")
+    args = parser.parse_args(argv)
+
+    if _require_pillow() is None:
+        print("Responsive images need Pillow: pip install pillow")
+        return 1
+    manifest, written = build_images(args.root, args.cache, args.jobs, args.force)
+    sources = {entry["source"]: entry for entry in manifest.values()}
+    print(f"Wrote {written} variant file(s) for {len(sources)} image(s) into {os.path.join(args.root, *VARIANT_DIR.split('/'))}")
+    for rel, entry in sorted(sources.items()):
+        original = os.path.getsize(os.path.join(args.root, *rel.split("/")))
+        smallest = min(os.path.getsize(os.path.join(args.root, *variants[0][2].split("/")))
+                       for variants in entry["variants"].values())
+        print(f"  {rel:<36} {entry['width']:>5}x{entry['height']:<5} {original:>8,} B -> "
+              f"smallest variant {smallest:>7,} B ({', '.join(sorted(entry['variants']))})")
+    return 0
@@ -0,0 +1,138 @@
+"""
+Static file responses on the server's zero-copy path, with byte ranges.
+
+`flask.send_file` already returns the server's `wsgi.file_wrapper` for full
+responses, but answers `Range` requests by wrapping it in a Python iterator, so
+Gunicorn falls back to reading and writing every block in Python. `send_static`
+instead seeks the file to the start of the range and returns the
+`wsgi.file_wrapper` itself with the exact `Content-Length`: Gunicorn then
+`sendfile()`s the slice straight from the page cache, and Waitress streams it
+from its file buffer. Without a file wrapper (the development server), it
+yields the slice in STATIC_BLOCK_SIZE blocks.
+
+- `If-None-Match` / `If-Modified-Since` give `304 Not Modified`.
+- A single `Range: bytes=...` gives `206 Partial Content` with `Content-Range`;
+  an unsatisfiable one gives `416`. Multiple ranges get the whole file.
+- `If-Range` (strong ETag or exact Last-Modified) that no longer matches turns
+  the range request into a full `200`, so a resumed download never splices
+  two versions of a file.
+
+With a front proxy, set STATIC_OFFLOAD so Python only writes headers and the
+proxy sends the bytes (ranges included):
+
+- `x-accel-redirect` (nginx): `X-Accel-Redirect: <STATIC_OFFLOAD_PREFIX><path>`,
+  where the prefix is an `internal` location aliased to the static folder;
+- `x-sendfile` (Apache mod_xsendfile, lighttpd): `X-Sendfile: <absolute path>`.
+"""
+import os
+import time
+import mimetypes
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import current_app, request
+from werkzeug.http import is_resource_modified, parse_if_range_header, parse_range_header
+
+STATIC_OFFLOAD = os.getenv("STATIC_OFFLOAD", "").lower()
+STATIC_OFFLOAD_PREFIX = os.getenv("STATIC_OFFLOAD_PREFIX", "/_static/")
+OFFLOAD_MODES = ("", "x-accel-redirect", "x-sendfile")
+STATIC_BLOCK_SIZE = 1 << 16
+
+if STATIC_OFFLOAD not in OFFLOAD_MODES:
+    print(f"Ignoring STATIC_OFFLOAD={STATIC_OFFLOAD!r}: expected x-accel-redirect or x-sendfile.")
+    STATIC_OFFLOAD = ""
+
+
+def _read_slice(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(STATIC_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _body(environ, path: str, start: int, length: int):
+    file_wrapper = environ.get("wsgi.file_wrapper")
+    if file_wrapper is None:
+        return _read_slice(path, start, length)
+    f = open(path, "rb")
+    if start:
+        f.seek(start)
+    # The server stops after Content-Length bytes, so no Python-level range wrapper is needed.
+    return file_wrapper(f, STATIC_BLOCK_SIZE)
+
+
+def _if_range_matches(environ, etag: str, last_modified: datetime) -> bool:
+    if_range = parse_if_range_header(environ.get("HTTP_IF_RANGE"))
+    if if_range.etag is not None:
+        # Strong comparison: a weak validator never matches.
+        return not etag.startswith("W/") and if_range.etag == etag
+    if if_range.date is not None:
+        return if_range.date == last_modified
+    return True
+
+
+def send_static(path: str, mimetype: Optional[str] = None, etag: Optional[str] = None,
+                last_modified: Optional[float] = None, size: Optional[int] = None,
+                max_age: Optional[int] = None, internal: Optional[str] = None):
+    """
+    Response for the file at `path` (conditional, ranged, zero-copy or offloaded).
+
+    `size` / `last_modified` skip the stat when the caller already has them; `etag`
+    defaults to one derived from mtime and size. `internal` is the path below the
+    static root used for `X-Accel-Redirect` (defaults to the file name).
+    """
+    environ = request.environ
+    if size is None or last_modified is None:
+        st = os.stat(path)
+        size, last_modified = st.st_size, st.st_mtime
+    if etag is None:
+        etag = f"{int(last_modified):x}-{size:x}"
+    last_modified = datetime.fromtimestamp(int(last_modified), timezone.utc)
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    response = current_app.response_class(mimetype=mimetype, direct_passthrough=True)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.accept_ranges = "bytes"
+    if max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.expires = int(time.time() + max_age)
+
+    if not is_resource_modified(environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    offload = current_app.config.get("STATIC_OFFLOAD", STATIC_OFFLOAD)
+    if offload == "x-accel-redirect":
+        prefix = current_app.config.get("STATIC_OFFLOAD_PREFIX", STATIC_OFFLOAD_PREFIX)
+        response.headers["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + (internal or os.path.basename(path)).lstrip("/")
+        return response
+    if offload == "x-sendfile":
+        response.headers["X-Sendfile"] = os.path.abspath(path)
+        response.content_length = size
+        return response
+
+    start, length = 0, size
+    ranges = parse_range_header(environ.get("HTTP_RANGE")) if request.method in ("GET", "HEAD") else None
+    if ranges is not None and _if_range_matches(environ, etag, last_modified):
+        span = ranges.range_for_length(size)
+        if span is not None:
+            start, length = span[0], span[1] - span[0]
+            response.status_code = 206
+            response.content_range = ranges.make_content_range(size)
+        elif ranges.units == "bytes" and len(ranges.ranges) == 1:
+            response.status_code = 416
+            response.headers["Content-Range"] = f"bytes */{size}"
+            response.content_length = 0
+            return response
+
+    response.content_length = length
+    if request.method != "HEAD" and length:
+        response.response = _body(environ, path, start, length)
+    return response
@@ -13,12 +13,32 @@ Design notes
 - Static subdirectories to include in serve/build are listed in STATIC_SUBDIRS.
 - Serving behavior:
     - '/' => serves <static_root>/public/index.html
-    - '/<path:filename>' => looks for the requested file in each STATIC_SUBDIR in order.
-      If found, `.js` files served with explicit JS mimetype, `.css` with CSS mimetype,
-      otherwise served with Flask's static serving helper.
+    - '/<path:filename>' => resolved through an in-memory index (StaticIndex) built at startup
+      that maps each request path to the file in the first STATIC_SUBDIR containing it, with its
+      size, mtime and MIME type (`.js`/`.css` get explicit JS/CSS types). A background rescan
+      keeps the index fresh; `--frozen-index` disables it.
+    - Files are sent by pipeline/sendfile.py: `Range` / `If-Range` partial content on the server's
+      zero-copy `wsgi.file_wrapper` path, or a STATIC_OFFLOAD (X-Accel-Redirect / X-Sendfile) handoff.
 - Build behavior:
     - Default build directory name is `build-<basename(project_dir)>`.
-    - If the build directory already exists it is removed and recreated.
+    - Compressible assets above COMPRESS_MIN_SIZE get precompressed `.gz` (and `.br` when the optional
+      `brotli` package is installed) siblings, produced in a process pool. The build preview server
+      picks the best variant from Accept-Encoding.
+    - ES module scripts loaded by the HTML pages are bundled with pipeline/bundler.py: each entry (and every
+      `import()` target) becomes one comment- and whitespace-free file, modules shared between entries
+      go to `chunks/shared-<hash>.js`, and results are cached by input hash in `<build>.bundle-cache`.
+    - Images get width-stepped AVIF/WebP (and PNG, when transparent) variants in a `variants/` directory
+      beside them (pipeline/images.py), encoded in a process pool into the content-addressed `<build>.image-cache`
+      so unchanged images are never re-encoded. Needs the optional Pillow package; skipped without it.
+    - Non-HTML assets get content-hashed copies (`css/site.<hash>.css`) listed in `asset-manifest.json`;
+      HTML references are rewritten to them and the preview server marks them immutable.
+    - If the build directory already exists it is replaced by a freshly assembled one, unless `--incremental`
+      is given: then `.build-manifest.json` (source path, size, mtime, content hash per file) drives an
+      in-place update that writes only changed files and deletes only removed ones. Hashing and copying
+      run in a thread pool; `--link-mode hardlink|reflink` avoids copying bytes on the same filesystem.
+    - `--watch` keeps the build current: an inotify watcher (stat-polling where inotify is missing)
+      debounces changes under STATIC_SUBDIRS into incremental rebuilds, and the preview server pushes a
+      reload to open pages over Server-Sent Events; change-to-reload latency is printed per rebuild.
     - Only directories that exist under the project directory and are listed in STATIC_SUBDIRS
       are copied. Missing subdirs are skipped with a warning.
 
@@ -27,7 +47,15 @@ Command-line interface
     python server.py [<project_dir>] -b        # create build-<project_dir> and serve it
     python server.py [<project_dir>] --build   # create build-<project_dir> and serve it
     python server.py [<project_dir>] -b -o dist  # copy into "dist" instead of build-... and serve it
+    python server.py [<project_dir>] -b --no-compress  # skip writing .gz/.br variants
+    python server.py [<project_dir>] -b --no-fingerprint  # skip content-hashed asset copies
+    python server.py [<project_dir>] -b --no-bundle  # ship the ES modules unbundled
+    python server.py [<project_dir>] -b --no-images  # skip the responsive image variants
+    python server.py [<project_dir>] -b --incremental  # rebuild only what changed since the last build
+    python server.py [<project_dir>] -b --incremental --link-mode hardlink  # link instead of copying
+    python server.py [<project_dir>] --watch   # build, serve, rebuild on change and live-reload the browser
     python server.py [<project_dir>] --port 5000 # run server on port 5000
+    python server.py [<project_dir>] --frozen-index  # never rescan the static path index
 
 Note for contributors
 - If you want more production-ready serving (cache headers, gzip, etc.), use a proper build pipeline
@@ -37,10 +65,40 @@ from __future__ import annotations
 
 import os
 import sys
+import time
 import shutil
 import argparse
-from flask import Flask, send_from_directory
-from typing import Optional
+import mimetypes
+import re
+import gzip
+import json
+import hashlib
+import posixpath
+import threading
+import select
+import struct
+import ctypes
+import ctypes.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from flask import Flask, abort, request
+from werkzeug.security import safe_join
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Shared with the app package, which imports them from the same side-effect-free `pipeline` package
+# (importing `app` itself would build the whole site: Flask app, static hashing, i18n, databases).
+from pipeline.bundler import bundle_modules
+from pipeline.images import generate
+from pipeline.sendfile import send_static
+
+try:
+    import brotli  # Optional: enables .br variants in builds
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl  # Optional: reflink builds (Linux)
+except ImportError:
+    fcntl = None
 
 
 
@@ -53,13 +111,131 @@ STATIC_SUBDIRS = [
     "src",
 ]
 
+# Build-time precompression: assets with these extensions and at least COMPRESS_MIN_SIZE bytes
+# get `.br` / `.gz` siblings. ENCODINGS is in server preference order.
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".webmanifest"}
+COMPRESS_MIN_SIZE = 1024
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Build-time fingerprinting: hashed copies of assets are listed in ASSET_MANIFEST inside the build
+# directory and served with immutable caching for IMMUTABLE_MAX_AGE seconds.
+ASSET_MANIFEST = "asset-manifest.json"
+FINGERPRINT_LENGTH = 12
+IMMUTABLE_MAX_AGE = 31536000
+ASSET_REFERENCE = re.compile(r"""\b(src|href)=(["'])([^"'<>]+)\2""", re.IGNORECASE)
+
+# Build-time bundling: module scripts of the HTML pages are bundled with pipeline/bundler.py.
+MODULE_SCRIPT = re.compile(r"<script\b[^>]*>", re.IGNORECASE)
+
+# Incremental builds: BUILD_MANIFEST records, per build file, the source it came from with its
+# size, mtime and content hash. LINK_MODES are the ways a source file can be placed in the build.
+BUILD_MANIFEST = ".build-manifest.json"
+LINK_MODES = ("copy", "hardlink", "reflink")
+FICLONE = 0x40049409  # Linux ioctl: clone the source's extents (btrfs, XFS, ...)
+
+# Watch mode: bursts of changes are collected until the trees have been quiet for WATCH_DEBOUNCE
+# seconds; without inotify the trees are rescanned every WATCH_POLL_INTERVAL seconds.
+WATCH_DEBOUNCE = 0.15
+WATCH_POLL_INTERVAL = 0.5
+RELOAD_ENDPOINT = "/__reload"
+RELOAD_SNIPPET = b"""<script>
+(function () {
+  var key = "server.py:reload", pending = sessionStorage.getItem(key);
+  if (pending) { sessionStorage.removeItem(key); navigator.sendBeacon("/__reload/ack?v=" + pending); }
+  new EventSource("/__reload").onmessage = function (e) { sessionStorage.setItem(key, e.data); location.reload(); };
+})();
+</script>
+"""
+
+
+class StaticEntry(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    mimetype: str
+
+
+def guess_mimetype(filename: str) -> str:
+    # Explicit JS/CSS types (module scripts are rejected by browsers when served as text/plain).
+    if filename.endswith(".js"):
+        return "application/javascript"
+    if filename.endswith(".css"):
+        return "text/css"
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+class StaticIndex:
+    """
+    In-memory map from request path to the file that serves it.
+
+    Built once from STATIC_SUBDIRS (earlier subdirs win, matching the old search
+    order) so resolving a request is a single dict lookup instead of one
+    `os.path.exists` per subdir. Unless `frozen`, a daemon thread waits on the
+    same watcher as `--watch` (inotify on Linux, otherwise a stat poller every
+    `interval` seconds) and rescans only after it reports a change, swapping in
+    the new map.
+    """
+
+    def __init__(self, static_root: str, subdirs: Optional[list] = None, frozen: bool = False, interval: float = 1.0):
+        self.static_root = os.path.abspath(static_root)
+        self.subdirs = list(subdirs if subdirs is not None else STATIC_SUBDIRS)
+        self.interval = interval
+        self.entries: Dict[str, StaticEntry] = self.scan()
+        if not frozen:
+            threading.Thread(target=self._watch, name="static-index-watcher", daemon=True).start()
+
+    def scan(self) -> Dict[str, StaticEntry]:
+        entries: Dict[str, StaticEntry] = {}
+        for sub in self.subdirs:
+            sub_dir = os.path.join(self.static_root, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            stack = [(sub_dir, "")]
+            while stack:
+                directory, prefix = stack.pop()
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            rel = f"{prefix}{entry.name}"
+                            if entry.is_dir():
+                                stack.append((entry.path, f"{rel}/"))
+                            elif rel not in entries and entry.is_file():
+                                st = entry.stat()
+                                entries[rel] = StaticEntry(entry.path, st.st_size, st.st_mtime, guess_mimetype(rel))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _watch(self) -> None:
+        roots = [os.path.join(self.static_root, sub) for sub in self.subdirs
+                 if os.path.isdir(os.path.join(self.static_root, sub))]
+        if not roots:
+            return
+        watcher = make_watcher(roots)
+        if isinstance(watcher, PollingWatcher):
+            watcher.interval = self.interval
+        while True:
+            if not watcher.changes():
+                continue
+            # Let a burst of events (an editor save, a git checkout) settle into one rescan.
+            while watcher.changes(WATCH_DEBOUNCE):
+                pass
+            fresh = self.scan()
+            if fresh != self.entries:
+                # Rebinding the attribute is atomic; readers see either the old or the new map.
+                self.entries = fresh
+
+    def lookup(self, filename: str) -> Optional[StaticEntry]:
+        return self.entries.get(filename)
 
-def create_app(static_root: str) -> Flask:
+
+def create_app(static_root: str, frozen: bool = False) -> Flask:
     """
     Create and return a Flask app instance configured to serve the project's static files.
 
     Args:
         static_root: Path to the project directory which contains the STATIC_SUBDIRS (e.g. ./myproject).
+        frozen: If True, the path index is built once and never rescanned (no watcher thread).
 
     Returns:
         A configured Flask instance.
@@ -68,9 +244,12 @@ def create_app(static_root: str) -> Flask:
         - app.static_folder is set to the provided static_root so Flask's static helpers can be used.
         - Requests:
             - GET /  => returns public/index.html (relative to static_root)
-            - GET /<filename> => searches each STATIC_SUBDIR for the filename and serves it if found.
+            - GET /<filename> => resolved through a StaticIndex built at startup and served if found.
     """
+    # Same zero-copy / Range / proxy-offload responses as the app package (see pipeline/sendfile.py).
     app = Flask(__name__, static_folder=static_root)
+    index_map = StaticIndex(static_root, frozen=frozen)
+    app.extensions["static_index"] = index_map
 
     @app.route("/")
     def index():
@@ -83,54 +262,499 @@ def create_app(static_root: str) -> Flask:
     def serve_file(filename: str):
         """
         Custom static handler:
-        - For each subdir in STATIC_SUBDIRS, check if the requested file exists.
-        - If found:
-            - serve .js with JS mimetype
-            - serve .css with CSS mimetype
-            - otherwise use Flask's app.send_static_file so Flask picks an appropriate header
-              and leverages the static path.
+        - Resolve the request path with one dict lookup in the StaticIndex
+          (first STATIC_SUBDIR containing the file wins).
+        - If found, serve it with the MIME type, size and mtime recorded at index time
+          (.js and .css get explicit JS/CSS types), with Range support and no extra stat.
         - If not found in any subdir, return 404.
         """
-        for sub in STATIC_SUBDIRS:
-            sub_dir = os.path.join(app.static_folder, sub)
-            candidate = os.path.join(sub_dir, filename)
-            if not os.path.exists(candidate):
-                # File not present in this subdir; continue searching the next one.
-                continue
+        entry = index_map.lookup(filename)
+        if entry is None:
+            # Not found anywhere -> 404
+            return "File not found", 404
+        return send_static(entry.path, mimetype=entry.mimetype, last_modified=entry.mtime, size=entry.size,
+                           internal=os.path.relpath(entry.path, index_map.static_root).replace(os.sep, "/"))
 
-            # Found the file: choose how to serve it.
-            if filename.endswith(".js"):
-                # send_from_directory lets us set explicit mimetype
-                return send_from_directory(sub_dir, filename, mimetype="application/javascript")
-            if filename.endswith(".css"):
-                return send_from_directory(sub_dir, filename, mimetype="text/css")
+    return app
 
-            # Generic static file serving -- preserves the subdirectory path relative to static_folder.
-            # app.send_static_file expects a path relative to app.static_folder
-            return app.send_static_file(f"{sub}/{filename}")
 
-        # Not found anywhere -> 404
-        return "File not found", 404
+class LiveReload:
+    """
+    Pushes reload events to browsers over Server-Sent Events (used by `--watch`).
 
-    return app
+    Pages served by the preview server get RELOAD_SNIPPET, which listens on
+    RELOAD_ENDPOINT and reloads on every event. After reloading, the page
+    acknowledges the build it reloaded for, so the console can report the full
+    change-to-reload latency.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.clients = 0
+        self._changes: Dict[int, Tuple[float, float]] = {}  # version -> (change detected, build finished)
+        self._cond = threading.Condition()
+
+    def notify(self, detected_at: float) -> int:
+        """Announce a finished rebuild for a change first seen at `detected_at` (time.perf_counter())."""
+        with self._cond:
+            self.version += 1
+            self._changes[self.version] = (detected_at, time.perf_counter())
+            self._cond.notify_all()
+            return self.clients
+
+    def stream(self):
+        with self._cond:
+            seen = self.version
+            self.clients += 1
+        try:
+            yield "retry: 1000\n\n"
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.version != seen, timeout=15)
+                    version = self.version
+                if version == seen:
+                    yield ": keepalive\n\n"
+                    continue
+                seen = version
+                yield f"data: {version}\n\n"
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+    def acknowledge(self, version: int) -> None:
+        change = self._changes.get(version)
+        if change is None:
+            return
+        detected_at, built_at = change
+        now = time.perf_counter()
+        print(f"Browser reloaded {1000 * (now - detected_at):.0f} ms after the change "
+              f"(rebuild {1000 * (built_at - detected_at):.0f} ms, reload {1000 * (now - built_at):.0f} ms)")
+
+
+def create_build_app(static_root: str, live_reload: bool = False) -> Flask:
+    """
+    Preview server for a build directory.
 
+    Compressible assets are answered with their precompressed `.br` / `.gz`
+    sibling (written by build_project) when the client's Accept-Encoding allows
+    it, with `Content-Encoding` and `Vary: Accept-Encoding` set accordingly.
 
+    Files listed as fingerprinted copies in the build's asset manifest are served
+    with `Cache-Control: public, max-age=31536000, immutable`; everything else
+    carries a strong content-hash ETag with `no-cache`, so revalidation yields 304.
 
-def create_build_app(static_root: str) -> Flask:
+    With `live_reload`, a LiveReload (app.extensions["live_reload"]) serves
+    RELOAD_ENDPOINT, HTML pages get RELOAD_SNIPPET injected, and the asset
+    manifest is reloaded whenever a rebuild replaces it.
+    """
     app = Flask(__name__, static_folder=static_root)
+    state: Dict = {"stamp": None}
+
+    def load_manifest() -> None:
+        manifest_path = os.path.join(static_root, ASSET_MANIFEST)
+        stamp = os.stat(manifest_path).st_mtime_ns if os.path.isfile(manifest_path) else None
+        if "digests" in state and stamp == state["stamp"]:
+            return
+        manifest = load_asset_manifest(static_root)
+        digests = {name: info["hash"] for name, info in manifest.items()}
+        fingerprinted = {info["file"]: info["hash"] for info in manifest.values() if "file" in info}
+        digests.update(fingerprinted)
+        state.update(stamp=stamp, digests=digests, fingerprinted=fingerprinted)
+
+    load_manifest()
+
+    def send_negotiated(filename: str):
+        path = safe_join(static_root, filename)
+        if path is None or filename == BUILD_MANIFEST or not os.path.isfile(path):
+            abort(404)
+        if live_reload:
+            load_manifest()
+            if filename.endswith(".html"):
+                return send_live_page(path)
+        digests, fingerprinted = state["digests"], state["fingerprinted"]
+        digest = digests.get(filename)
+        encoding = None
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            for candidate, suffix in ENCODINGS:
+                if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+                    encoding, path = candidate, path + suffix
+                    break
+        # Each encoding gets its own ETag so caches never mix variants.
+        etag = (f"{digest}-{encoding}" if encoding else digest) if digest else None
+        immutable = filename in fingerprinted
+        response = send_static(path, mimetype=guess_mimetype(filename), etag=etag,
+                               max_age=IMMUTABLE_MAX_AGE if immutable else None,
+                               internal=os.path.relpath(path, static_root).replace(os.sep, "/"))
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            response.vary.add("Accept-Encoding")
+        if immutable:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        elif digest:
+            response.cache_control.no_cache = True
+        return response
+
+    if live_reload:
+        reloader = LiveReload()
+        app.extensions["live_reload"] = reloader
+
+        def send_live_page(path: str):
+            with open(path, "rb") as f:
+                html = f.read()
+            end = html.lower().rfind(b"</body>")
+            if end < 0:
+                end = len(html)
+            response = app.response_class(html[:end] + RELOAD_SNIPPET + html[end:], mimetype="text/html")
+            response.cache_control.no_store = True
+            return response
+
+        @app.route(RELOAD_ENDPOINT)
+        def reload_events():
+            response = app.response_class(reloader.stream(), mimetype="text/event-stream")
+            response.cache_control.no_cache = True
+            return response
+
+        @app.route(f"{RELOAD_ENDPOINT}/ack", methods=["POST"])
+        def reload_ack():
+            reloader.acknowledge(request.args.get("v", type=int, default=0))
+            return "", 204
+
     @app.route("/")
     def index():
-        return send_from_directory(static_root, "index.html")
+        return send_negotiated("index.html")
     @app.route("/<path:filename>")
     def serve_file(filename):
-        return send_from_directory(static_root, filename) ## root path is 'static', 
+        return send_negotiated(filename) ## root path is 'static', 
     return app
 
 
+def _file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def fingerprinted_name(filename: str, digest: str) -> str:
+    """`css/custom.min.css` -> `css/custom.min.<digest>.css` (same scheme as the app package)."""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def load_asset_manifest(build_dir: str) -> Dict[str, Dict[str, str]]:
+    path = os.path.join(build_dir, ASSET_MANIFEST)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_build_manifest(build_dir: str) -> Optional[Dict]:
+    """The previous build's BUILD_MANIFEST, or None when there is no usable one."""
+    try:
+        with open(os.path.join(build_dir, BUILD_MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) and "files" in manifest else None
+
+
+def _write_json_atomic(path: str, payload: Dict) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _remove(path: str) -> None:
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _reflink(src: str, dst: str) -> None:
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def place_file(src: str, dst: str, link_mode: str = "copy") -> None:
+    """
+    Put `src` at `dst` as a copy, hard link or reflink (see LINK_MODES).
+
+    The file is created as a temporary sibling and renamed over `dst`, so readers never see a
+    half-written file. Links that cannot be made (other filesystem, no reflink support) fall back
+    to a copy.
+    """
+    if os.path.isdir(dst) and not os.path.islink(dst):
+        shutil.rmtree(dst)  # a directory was replaced by a file
+    elif link_mode == "hardlink" and os.path.isfile(dst) and os.path.samefile(src, dst):
+        return  # already linked (the source was edited in place)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.build-tmp")
+    _remove(tmp_path)
+    try:
+        if link_mode == "hardlink":
+            os.link(src, tmp_path)
+        elif link_mode == "reflink":
+            _reflink(src, tmp_path)
+        else:
+            shutil.copy2(src, tmp_path)
+    except OSError:
+        if link_mode == "copy":
+            raise
+        _remove(tmp_path)
+        shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def write_file(dst: str, data: bytes) -> None:
+    """Replace `dst` with `data` through a temporary sibling (never writing into a possibly hard-linked file)."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.build-tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dst)
+
+
+def module_entries(sources: Dict[str, str]) -> List[str]:
+    """Scripts loaded with `<script type="module" src=...>` by the HTML pages among `sources`."""
+    entries: List[str] = []
+    for rel, path in sorted(sources.items()):
+        if not rel.endswith(".html"):
+            continue
+        with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            html = f.read()
+        for tag in MODULE_SCRIPT.findall(html):
+            src = re.search(r"""\bsrc=(["'])([^"'<>]+)\1""", tag)
+            if not re.search(r"""\btype=(["']?)module\1""", tag, re.IGNORECASE) or src is None:
+                continue
+            ref = src.group(2).split("?", 1)[0].split("#", 1)[0]
+            if "://" in ref or ref.startswith("//"):
+                continue
+            target = ref.lstrip("/") if ref.startswith("/") else posixpath.normpath(posixpath.join(posixpath.dirname(rel), ref))
+            if target in sources and target not in entries:
+                entries.append(target)
+    return entries
+
+
+def bundle_sources(sources: Dict[str, str], cache_dir: Optional[str] = None) -> Dict[str, bytes]:
+    """
+    Bundle the module graph of the pages' module scripts (see pipeline/bundler.py).
+
+    Returns build path -> bundled code: every entry (including `import()` targets) keeps its path
+    and shared chunks are added under `chunks/`. Bundles are cached in `cache_dir` by input hash.
+    """
+    entries = module_entries(sources)
+    if not entries:
+        return {}
+    # Same bundler as `python -m app bundle`.
+    bundle = bundle_modules(sources, entries, cache_dir)
+    print(f"Bundled {bundle.modules} module(s) from {len(entries)} page entr{'y' if len(entries) == 1 else 'ies'} "
+          f"into {len(bundle.files)} file(s){' (cached)' if bundle.cached else ''}")
+    return {rel: code.encode("utf-8", "surrogateescape") for rel, code in bundle.files.items()}
+
+
+def image_variants(sources: Dict[str, str], cache_dir: str, workers: Optional[int] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    Responsive variants of the images among `sources` (see pipeline/images.py).
+
+    Returns build path -> (cache file, content address); empty when Pillow is not installed.
+    """
+    # Same encoder and cache layout as `python -m app images`.
+    variants, _ = generate(sources, cache_dir, workers)
+    return {rel: (cached, os.path.splitext(os.path.basename(cached))[0]) for rel, cached in variants.items()}
+
+
+def fingerprint_build(build_dir: str, digests: Optional[Dict[str, str]] = None,
+                      rewrite: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, str]]:
+    """
+    Give every non-HTML asset a content-hashed sibling, point the HTML at them and write the manifest.
+
+    Manifest (`asset-manifest.json`) entries look like
+        "css/custom.min.css": {"hash": "<sha256>", "file": "css/custom.min.<hash>.css"}
+        "index.html":         {"hash": "<sha256>"}   # entry points keep their names
+    Original files stay in place, so unrewritten references keep working (with ETag revalidation).
+
+    `digests` (build path -> sha256 of every copied file) saves rehashing when the caller already
+    knows them; `rewrite` limits page rewriting to those pages, the others keep their previous
+    manifest entry. Hashed copies are content-addressed: existing ones are reused and the ones
+    left over from older content are deleted.
+    """
+    if digests is None:
+        digests = {}
+        for directory, _, files in os.walk(build_dir):
+            for name in files:
+                rel = os.path.relpath(os.path.join(directory, name), build_dir).replace(os.sep, "/")
+                if rel in (ASSET_MANIFEST, BUILD_MANIFEST) or name.endswith((".gz", ".br")):
+                    continue
+                digests[rel] = _file_digest(os.path.join(directory, name))
+    previous = load_asset_manifest(build_dir)
+    rewrite = None if rewrite is None else set(rewrite)
+
+    manifest: Dict[str, Dict[str, str]] = {}
+    pages = []
+    for rel, digest in sorted(digests.items()):
+        if rel.endswith(".html"):
+            pages.append(rel)
+            continue
+        hashed = fingerprinted_name(rel, digest)
+        hashed_path = os.path.join(build_dir, hashed)
+        if not os.path.isfile(hashed_path):
+            place_file(os.path.join(build_dir, rel), hashed_path, "hardlink")
+        manifest[rel] = {"hash": digest, "file": hashed}
+    current = {info["file"] for info in manifest.values()}
+    for info in previous.values():
+        if "file" in info and info["file"] not in current:
+            for suffix in [""] + [suffix for _, suffix in ENCODINGS]:
+                _remove(os.path.join(build_dir, info["file"] + suffix))
+
+    def rewrite_ref(match, page_dir):
+        value = match.group(3)
+        ref = value.split("?", 1)[0].split("#", 1)[0]
+        if not ref or "://" in ref or ref.startswith(("data:", "//", "mailto:", "tel:")):
+            return match.group(0)
+        target = ref.lstrip("/") if ref.startswith("/") else posixpath.normpath(posixpath.join(page_dir, ref))
+        info = manifest.get(target)
+        if info is None:
+            return match.group(0)
+        # Hashed copies sit next to their originals, so swapping the basename works for any URL form.
+        new_ref = posixpath.join(posixpath.dirname(ref), posixpath.basename(info["file"]))
+        return f"{match.group(1)}={match.group(2)}{new_ref}{value[len(ref):]}{match.group(2)}"
+
+    rewritten = 0
+    for rel in pages:
+        if rewrite is not None and rel not in rewrite and rel in previous:
+            manifest[rel] = previous[rel]
+            continue
+        path = os.path.join(build_dir, rel)
+        with open(path, "rb") as f:
+            html = f.read().decode("utf-8", errors="surrogateescape")
+        page_dir = posixpath.dirname(rel)
+        updated = ASSET_REFERENCE.sub(lambda m: rewrite_ref(m, page_dir), html)
+        data = updated.encode("utf-8", errors="surrogateescape")
+        if updated != html:
+            # Swap in a new file instead of writing in place: the page may be hard-linked to its source.
+            write_file(path, data)
+        manifest[rel] = {"hash": hashlib.sha256(data).hexdigest()}
+        rewritten += 1
+
+    _write_json_atomic(os.path.join(build_dir, ASSET_MANIFEST), manifest)
+    print(f"Fingerprinted {len(current)} asset(s); rewrote references in {rewritten} page(s)")
+    return manifest
+
+
+def _compress_file(path: str) -> Tuple[str, int, Dict[str, int]]:
+    """Write `.gz` (and `.br` when brotli is installed) next to `path`; keep only variants that are smaller."""
+    with open(path, "rb") as f:
+        data = f.read()
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    written = {}
+    for encoding, suffix in ENCODINGS:
+        payload = variants.get(encoding)
+        if payload is None or len(payload) >= len(data):
+            # A variant of older content must not outlive it.
+            _remove(path + suffix)
+            continue
+        tmp_path = path + suffix + ".build-tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        shutil.copystat(path, tmp_path)
+        os.replace(tmp_path, path + suffix)
+        written[encoding] = len(payload)
+    return path, len(data), written
+
+
+def compress_build(build_dir: str, min_size: int = COMPRESS_MIN_SIZE, workers: Optional[int] = None,
+                   paths: Optional[Iterable[str]] = None) -> None:
+    """
+    Precompress every compressible asset of at least `min_size` bytes, in parallel across processes.
+
+    `paths` (build-relative) limits the pass to those files, e.g. the ones an incremental build wrote.
+    """
+    if paths is None:
+        paths = [os.path.relpath(os.path.join(directory, name), build_dir)
+                 for directory, _, files in os.walk(build_dir) for name in files]
+    candidates = []
+    for rel in paths:
+        path = os.path.join(build_dir, rel)
+        if os.path.splitext(rel)[1].lower() in COMPRESSIBLE_EXTENSIONS and os.path.isfile(path) \
+                and os.path.getsize(path) >= min_size:
+            candidates.append(path)
+    if not candidates:
+        return
+    if brotli is None:
+        print("Note: 'brotli' not installed; writing gzip variants only (pip install brotli).")
+
+    total = {"identity": 0, "gzip": 0, "br": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, size, written in pool.map(_compress_file, candidates):
+            total["identity"] += size
+            for encoding in ("gzip", "br"):
+                total[encoding] += written.get(encoding, size)
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+    saved = {encoding: 100 * (1 - total[encoding] / max(total["identity"], 1)) for encoding in encodings}
+    summary = ", ".join(f"{encoding} {total[encoding]:,} B (-{saved[encoding]:.0f}%)" for encoding in encodings)
+    print(f"Precompressed {len(candidates)} file(s): identity {total['identity']:,} B; {summary}")
+
+
+def plan_sources(project_dir: str) -> Dict[str, str]:
+    """
+    Map every build-relative file path to the source file that produces it.
+
+    A top-level entry of a later STATIC_SUBDIR replaces the same-named entry of an earlier one
+    wholesale (e.g. `src/css/` hides all of `public/css/`), as the copy-based build always did.
+    """
+    owners: Dict[str, str] = {}
+    for sub in STATIC_SUBDIRS:
+        src = os.path.join(project_dir, sub)
+        if not os.path.isdir(src):
+            print(f"Warning: '{src}' not found; skipping.")
+            continue
+        for entry in sorted(os.listdir(src)):
+            owners[entry] = os.path.join(src, entry)
 
+    sources: Dict[str, str] = {}
+    for entry, path in owners.items():
+        if not os.path.isdir(path):
+            sources[entry] = path
+            continue
+        for directory, _, files in os.walk(path, followlinks=True):
+            for name in files:
+                file_path = os.path.join(directory, name)
+                sources[os.path.relpath(file_path, os.path.dirname(path)).replace(os.sep, "/")] = file_path
+    return sources
+
+
+def _source_record(project_dir: str, src_path: str, previous: Optional[Dict]) -> Dict:
+    """Stat a source file; hash it only when size, mtime or origin differ from the previous build."""
+    st = os.stat(src_path)
+    record = {
+        "src": os.path.relpath(src_path, project_dir).replace(os.sep, "/"),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    if previous and all(previous.get(key) == record[key] for key in ("src", "size", "mtime_ns")):
+        record["hash"] = previous["hash"]
+    else:
+        record["hash"] = _file_digest(src_path)
+    return record
 
 
-def build_project(project_dir: str, out_dir: Optional[str] = None) -> str:
+def build_project(project_dir: str, out_dir: Optional[str] = None, compress: bool = True,
+                  fingerprint: bool = True, incremental: bool = False, link_mode: str = "copy",
+                  workers: Optional[int] = None, bundle: bool = True, images: bool = True) -> str:
     """
     Build the static bundle by copying the CONTENTS of each STATIC_SUBDIR
     directly into the top-level build directory (not into build_dir/<sub>).
@@ -143,10 +767,29 @@ def build_project(project_dir: str, out_dir: Optional[str] = None) -> str:
         includes-files...
 
     Notes:
-    - If the build directory exists it is removed first (clean slate).
-    - If a destination file/dir exists while merging, it will be removed and
-      replaced by the incoming file/dir (later STATIC_SUBDIR entries can override earlier ones).
+    - Later STATIC_SUBDIR entries override same-named top-level entries of earlier ones (see plan_sources).
+    - A full build is assembled in `<build_dir>.partial` and swapped in only once complete, so an
+      interrupted build never replaces the previous one with a half-populated tree.
+    - With `incremental`, the previous build's BUILD_MANIFEST (source path, size, mtime and content
+      hash per file) is compared against the sources: only changed files are written and only
+      removed ones (with their hashed copies and .gz/.br variants) are deleted. Every file is swapped
+      in atomically and the manifest is rewritten last, so an interrupted incremental build is simply
+      redone by the next run. Without a usable manifest (or after option changes) it builds in full.
+    - Hashing and copying fan out over a thread pool of `workers` threads.
+    - `link_mode` "hardlink" / "reflink" places sources in the build without copying their bytes
+      (same filesystem only; falls back to a copy). Build steps never modify build files in place,
+      so linked sources are never touched.
+    - Unless `bundle` is False, the module scripts of the HTML pages are bundled (see bundle_sources):
+      each entry is replaced by its bundle and shared chunks are added under `chunks/`.
+    - Unless `images` is False, width-stepped variants of every image are placed in a `variants/`
+      directory beside it, straight from the content-addressed image cache (see image_variants).
+    - Unless `fingerprint` is False, every non-HTML asset gets a content-hashed copy, HTML
+      references are rewritten to it and `asset-manifest.json` is written (see fingerprint_build).
+    - Unless `compress` is False, compressible assets of COMPRESS_MIN_SIZE bytes or more get
+      `.gz` / `.br` siblings (see compress_build) for create_build_app to negotiate.
     """
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"link_mode must be one of {', '.join(LINK_MODES)}")
     project_dir = os.path.abspath(project_dir)
     project_basename = os.path.basename(os.path.normpath(project_dir))
     
@@ -161,56 +804,272 @@ def build_project(project_dir: str, out_dir: Optional[str] = None) -> str:
     
     print(f"Building from: {project_dir}")
     print(f"Build directory: {build_dir}")
+    start = time.perf_counter()
+
+    options = {"bundle": bundle, "compress": compress, "fingerprint": fingerprint, "images": images,
+               "link_mode": link_mode}
+    previous = load_build_manifest(build_dir) if incremental else None
+    if incremental and previous is None:
+        print("No usable build manifest; doing a full build.")
+    elif previous is not None and previous.get("options") != options:
+        print("Build options changed; doing a full build.")
+        previous = None
+
+    if previous is None:
+        work_dir = build_dir + ".partial"
+        _remove(work_dir)
+        os.makedirs(work_dir)
+        old_files: Dict[str, Dict] = {}
+    else:
+        work_dir = build_dir
+        old_files = previous["files"]
+
+    sources = plan_sources(project_dir)
+    if not sources:
+        print("Warning: No static files were found. Verify STATIC_SUBDIRS and project directory.")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        records = dict(zip(sources, pool.map(
+            lambda rel: _source_record(project_dir, sources[rel], old_files.get(rel)), sources)))
+        removed = sorted(rel for rel in old_files if rel not in records)
+        changed = {rel for rel, record in records.items()
+                   if old_files.get(rel, {}).get("hash") != record["hash"]
+                   or not os.path.isfile(os.path.join(work_dir, rel))}
+        copied = set(changed)
+
+        bundled = bundle_sources(sources, build_dir + ".bundle-cache") if bundle else {}
+        bundle_hashes = {rel: hashlib.sha256(code).hexdigest() for rel, code in bundled.items()}
+        old_bundle = previous.get("bundle", {}) if previous else {}
+        removed += sorted(rel for rel in old_bundle if rel not in bundled and rel not in records)
+        # Entries that are no longer bundled get their source back.
+        copied.update(rel for rel in old_bundle if rel not in bundled and rel in records)
+        changed.update(rel for rel, digest in bundle_hashes.items()
+                       if rel in copied or old_bundle.get(rel) != digest or not os.path.isfile(os.path.join(work_dir, rel)))
+
+        variants = image_variants(sources, build_dir + ".image-cache", workers) if images else {}
+        image_hashes = {rel: key for rel, (_, key) in variants.items()}
+        old_images = previous.get("images", {}) if previous else {}
+        removed += sorted(rel for rel in old_images if rel not in variants and rel not in records)
+        changed.update(rel for rel, key in image_hashes.items()
+                       if old_images.get(rel) != key or not os.path.isfile(os.path.join(work_dir, rel)))
+
+        if fingerprint and any(not rel.endswith(".html") for rel in changed.union(removed)):
+            # Pages carry the hashed asset names, so any asset change re-renders every page from source.
+            copied.update(rel for rel in records if rel.endswith(".html"))
+        changed.update(copied)
+
+        # Drop removed files and everything derived from removed or changed ones.
+        previous_assets = load_asset_manifest(work_dir)
+        for rel in removed + sorted(changed):
+            stale = [rel] if rel in removed else []
+            hashed = previous_assets.get(rel, {}).get("file")
+            for name in [rel] + ([hashed] if hashed else []):
+                stale.extend(name + suffix for _, suffix in ENCODINGS)
+            if hashed:
+                stale.append(hashed)
+            for name in stale:
+                _remove(os.path.join(work_dir, name))
+        for rel in removed:
+            directory = os.path.dirname(os.path.join(work_dir, rel))
+            while os.path.normpath(directory) != os.path.normpath(work_dir):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
 
-    # Clean slate
-    if os.path.exists(build_dir):
-        print(f"Removing existing build directory: {build_dir}")
-        shutil.rmtree(build_dir)
-    os.makedirs(build_dir, exist_ok=True)
+        try:
+            list(pool.map(lambda rel: place_file(sources[rel], os.path.join(work_dir, rel), link_mode), sorted(copied)))
+            for rel in sorted(changed.intersection(bundled)):
+                write_file(os.path.join(work_dir, rel), bundled[rel])
+            list(pool.map(lambda rel: place_file(variants[rel][0], os.path.join(work_dir, rel), link_mode),
+                          sorted(changed.intersection(variants))))
+        except Exception as e:
+            print(f"Error copying into '{work_dir}': {e}")
+            raise
+
+    if fingerprint:
+        digests = {rel: record["hash"] for rel, record in records.items()}
+        digests.update(bundle_hashes)
+        digests.update(image_hashes)
+        assets = fingerprint_build(work_dir, digests=digests, rewrite=changed)
+    if compress:
+        if previous is None:
+            compress_build(work_dir, workers=workers)
+        else:
+            written = set(changed)
+            if fingerprint:
+                written.update(assets[rel]["file"] for rel in changed if "file" in assets.get(rel, {}))
+                written.add(ASSET_MANIFEST)
+            compress_build(work_dir, workers=workers, paths=sorted(written))
+
+    # Written last: until it is in place, the next incremental run compares against the old manifest.
+    _write_json_atomic(os.path.join(work_dir, BUILD_MANIFEST), {"options": options, "files": records,
+                                                              "bundle": bundle_hashes, "images": image_hashes})
+
+    if work_dir != build_dir:
+        old_dir = build_dir + ".old"
+        _remove(old_dir)
+        if os.path.exists(build_dir):
+            print(f"Replacing existing build directory: {build_dir}")
+            os.rename(build_dir, old_dir)
+        os.rename(work_dir, build_dir)
+        _remove(old_dir)
+
+    kind = "Incremental" if previous is not None else "Full"
+    print(f"{kind} build: {len(changed)} written, {len(removed)} removed, "
+          f"{len(records.keys() | bundled.keys() | variants.keys()) - len(changed)} unchanged ({time.perf_counter() - start:.2f}s)")
+    print(f"Build complete: {build_dir}")
+    return build_dir
 
-    copied_any = False
 
-    for sub in STATIC_SUBDIRS:
-        src = os.path.join(project_dir, sub)
-        if not os.path.isdir(src):
-            print(f"Warning: '{src}' not found; skipping.")
-            continue
+class InotifyWatcher:
+    """Recursive directory watcher on Linux inotify (through ctypes); blocks in select() between events."""
+
+    name = "inotify"
+    IN_ATTRIB, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x4, 0x8, 0x40, 0x80
+    IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_Q_OVERFLOW = 0x100, 0x200, 0x400, 0x4000
+    IN_IGNORED, IN_ISDIR = 0x8000, 0x40000000
+    MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, roots: List[str]):
+        self.roots = roots
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+        for root in roots:
+            self._add_tree(root)
+
+    def _add_tree(self, root: str) -> None:
+        for directory, _, _ in os.walk(root, followlinks=True):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.watches[wd] = directory
+
+    def changes(self, timeout: Optional[float] = None) -> set:
+        """Paths touched since the last call; waits up to `timeout` seconds (forever if None) for the first."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 1 << 16)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            name = data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b"\0")
+            offset += self.EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                changed.update(self.roots)  # events were dropped; the incremental build restats everything
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                self._add_tree(path)
+            changed.add(path)
+        return changed
 
-        # Copy each entry inside src into the top-level build_dir
-        for entry in os.listdir(src):
-            src_path = os.path.join(src, entry)
-            dst_path = os.path.join(build_dir, entry)  # <<-- intentionally NOT os.path.join(build_dir, sub)
 
-            # If a destination exists, remove it to avoid copytree/FileExistsError
-            if os.path.exists(dst_path):
-                try:
-                    if os.path.isdir(dst_path) and not os.path.islink(dst_path):
-                        shutil.rmtree(dst_path)
-                    else:
-                        os.remove(dst_path)
-                except Exception as e:
-                    print(f"Failed to remove existing destination '{dst_path}': {e}")
-                    raise
-
-            # Copy directory trees or files
+class PollingWatcher:
+    """Fallback watcher: rescans the trees every `interval` seconds with os.scandir (batched stats)."""
+
+    name = "stat poller"
+
+    def __init__(self, roots: List[str], interval: float = WATCH_POLL_INTERVAL):
+        self.roots = roots
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        entries: Dict[str, Tuple[int, int]] = {}
+        stack = list(self.roots)
+        while stack:
             try:
-                if os.path.isdir(src_path) and not os.path.islink(src_path):
-                    shutil.copytree(src_path, dst_path)
-                else:
-                    # copy2 preserves metadata
-                    shutil.copy2(src_path, dst_path)
-                copied_any = True
-            except Exception as e:
-                print(f"Error copying '{src_path}' -> '{dst_path}': {e}")
-                raise
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            entries[entry.path] = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def changes(self, timeout: Optional[float] = None) -> set:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else max(0.0, deadline - time.monotonic())
+            time.sleep(min(self.interval, remaining))
+            fresh = self.scan()
+            changed = {path for path in fresh.keys() | self.snapshot.keys() if fresh.get(path) != self.snapshot.get(path)}
+            self.snapshot = fresh
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def make_watcher(roots: List[str]):
+    """InotifyWatcher where the platform has it, PollingWatcher otherwise."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); falling back to polling.")
+    return PollingWatcher(roots)
 
-        print(f"Copied contents of: {src} -> {build_dir}")
 
-    if not copied_any:
-        print("Warning: No static subdirectories were copied. Verify STATIC_SUBDIRS and project directory.")
+def watch_project(project_dir: str, build_dir: str, reloader: Optional[LiveReload] = None,
+                  debounce: float = WATCH_DEBOUNCE, **build_options) -> None:
+    """
+    Rebuild `build_dir` incrementally whenever files under the STATIC_SUBDIRS change, then tell
+    `reloader`'s browsers to reload. Runs until interrupted.
 
-    print(f"Build complete: {build_dir}")
-    return build_dir
+    Bursts of events (an editor save, a git checkout) are debounced into one rebuild. The
+    incremental build only restats the sources and writes the files whose content changed;
+    rebuilds that change nothing (e.g. editor swap files being touched) send no reload.
+    """
+    project_dir = os.path.abspath(project_dir)
+    build_dir = os.path.abspath(build_dir)
+    roots = [os.path.join(project_dir, sub) for sub in STATIC_SUBDIRS if os.path.isdir(os.path.join(project_dir, sub))]
+    watcher = make_watcher(roots)
+    print(f"Watching {len(roots)} director{'y' if len(roots) == 1 else 'ies'} with {watcher.name}")
+
+    def relevant(paths: set) -> set:
+        # Ignore the build's own output (an --out inside a watched tree) and in-flight temp files.
+        return {path for path in paths if not path.endswith(".build-tmp")
+                and os.path.commonpath([path, build_dir]) != build_dir}
+
+    while True:
+        changed = relevant(watcher.changes())
+        if not changed:
+            continue
+        detected_at = time.perf_counter()
+        while True:
+            burst = watcher.changes(debounce)
+            if not burst:
+                break
+            changed |= relevant(burst)
+
+        before = load_build_manifest(build_dir)
+        try:
+            build_project(project_dir, out_dir=build_dir, incremental=True, **build_options)
+        except Exception as e:
+            print(f"Rebuild failed: {e}", file=sys.stderr)
+            continue
+        after = load_build_manifest(build_dir)
+        if before is not None and after is not None and before["files"] == after["files"]:
+            continue
+        rebuild_ms = 1000 * (time.perf_counter() - detected_at)
+        clients = reloader.notify(detected_at) if reloader is not None else 0
+        print(f"Rebuilt {len(changed)} changed path(s) in {rebuild_ms:.0f} ms; reload sent to {clients} browser(s)")
 
 
 def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
@@ -224,7 +1083,16 @@ def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
     Flags:
         -b/--build : if present, create a build bundle and serve it
         -o/--out   : optional custom output directory for the build
+        --no-compress : do not write precompressed .gz/.br variants during the build
+        --no-fingerprint : do not write content-hashed asset copies / asset-manifest.json
+        --no-bundle : do not bundle the pages' ES module scripts
+        --no-images : do not generate responsive image variants
+        --incremental : only write/delete what changed since the previous build (see BUILD_MANIFEST)
+        --link-mode : copy | hardlink | reflink - how source files are placed in the build
+        -j/--jobs  : threads used to hash and copy files during the build
         --port     : port to run the Flask server on (default 8080)
+        --frozen-index : build the static path index once and never rescan it
+        --watch    : build, then rebuild incrementally on every change and live-reload the browsers
 
     Returns:
         argparse.Namespace with parsed options.
@@ -233,7 +1101,16 @@ def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
     parser.add_argument("project_dir", nargs="?", default=".", help="Path to project directory (contains includes/, public/, src/, ...). Defaults to current directory if not specified.")
     parser.add_argument("-b", "--build", action="store_true", help="Create build-<project_dir> (or --out) and serve it")
     parser.add_argument("-o", "--out", help="Optional output directory name for the build (overrides default build-<name>)")
+    parser.add_argument("--no-compress", action="store_true", help="Skip writing precompressed .gz/.br variants during the build")
+    parser.add_argument("--no-fingerprint", action="store_true", help="Skip content-hashed asset copies and asset-manifest.json")
+    parser.add_argument("--no-bundle", action="store_true", help="Skip bundling the pages' ES module scripts")
+    parser.add_argument("--no-images", action="store_true", help="Skip the responsive image variants (AVIF/WebP/PNG)")
+    parser.add_argument("--incremental", action="store_true", help="Update the existing build in place, touching only changed files")
+    parser.add_argument("--link-mode", choices=LINK_MODES, default="copy", help="Place files by copy, hard link or reflink (same filesystem only; default: copy)")
+    parser.add_argument("-j", "--jobs", type=int, help="Threads used to hash and copy files during the build")
     parser.add_argument("--port", type=int, default=8080, help="Port to run the Flask server on (default: 8080)")
+    parser.add_argument("--frozen-index", action="store_true", help="Build the static path index once and never rescan it")
+    parser.add_argument("--watch", action="store_true", help="Build, serve the build and rebuild/live-reload on every change (implies -b)")
     return parser.parse_args(argv)
 
 
@@ -251,14 +1128,20 @@ def main(argv: Optional[list] = None) -> int:
         print(f"Error: '{args.project_dir}' is not a valid directory.")
         return 2
 
-    if args.build:
+    if args.build or args.watch:
         # Build and serve the built website
+        build_options = dict(compress=not args.no_compress, fingerprint=not args.no_fingerprint,
+                             bundle=not args.no_bundle, images=not args.no_images, link_mode=args.link_mode, workers=args.jobs)
         try:
-            build_dir = build_project(args.project_dir, out_dir=args.out)
+            build_dir = build_project(args.project_dir, out_dir=args.out, incremental=args.incremental or args.watch,
+                                      **build_options)
             print(f"\nBuild successful! Output directory: {build_dir}")
             
             # Start server to preview the build
-            app = create_build_app(build_dir)
+            app = create_build_app(build_dir, live_reload=args.watch)
+            if args.watch:
+                threading.Thread(target=watch_project, args=(args.project_dir, build_dir, app.extensions["live_reload"]),
+                                 kwargs=build_options, name="build-watcher", daemon=True).start()
             print(f"Starting preview server on port {args.port}...")
             print("Press Ctrl+C to stop the server.\n")
             # Note: in production, do not use Flask's built-in server.
@@ -273,7 +1156,7 @@ def main(argv: Optional[list] = None) -> int:
         return 0
 
     # Otherwise, run the Flask development server for convenience.
-    app = create_app(args.project_dir)
+    app = create_app(args.project_dir, frozen=args.frozen_index)
     print(f"Starting Flask dev server; serving from {os.path.abspath(args.project_dir)} on port {args.port}")
     try:
         # Note: in production, do not use Flask's built-in server.
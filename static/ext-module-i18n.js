@@ -5,7 +5,32 @@ let translations = {};
 
 
 /**
- * Loads a locale JSON file from the specified directory.
+ * Reads the translation payload the server inlined into the page (see app/i18n.py).
+ * @returns {{locale: string, data: Object, urls: Object}|null} The negotiated locale, the page's
+ *   translations in that locale and the payload URLs of the other locales, or null if absent
+ */
+function inlinePayload() {
+  const el = document.getElementById('i18n-payload');
+  if (!el) return null;
+  try {
+    return {
+      locale: el.dataset.locale,
+      data: JSON.parse(el.textContent),
+      urls: JSON.parse(el.dataset.urls || '{}'),
+    };
+  } catch (e) {
+    console.warn('[exi18n] Warning: Ignoring unreadable inline translation payload.', e);
+    return null;
+  }
+}
+
+const pagePayload = inlinePayload();
+
+
+/**
+ * Loads the translations for a locale: the inline payload when it is for that locale,
+ * else this page's (small, cacheable) payload for it, else the full locale JSON file
+ * from the specified directory.
  * @param {string} locale - The locale code (e.g., 'en-US', 'ko-KR', 'ja-JP')
  * @param {string} [dir='locales'] - The directory containing locale files
  * @returns {Promise<Object>} Promise that resolves to the locale data object
@@ -21,7 +46,8 @@ let translations = {};
  * @throws {Error} Throws an error if the locale file format is invalid
  */
 async function loadLocale(locale, dir = '/static/locales') {
-  const url = `${dir}/${locale}.json`;
+  if (pagePayload && pagePayload.locale === locale) return pagePayload.data;
+  const url = (pagePayload && pagePayload.urls[locale]) || `${dir}/${locale}.json`;
   const res = await fetch(url);
   if (!res.ok) throw new Error(`Failed to load locale file "${url}". Status: ${res.status}. Locale "${locale}" is not available.`);
   const data = await res.json();
@@ -53,6 +79,8 @@ export async function switchLocale(locale, dir = '/static/locales') {
       localStorage.setItem('locale', locale); 
       localStorage.setItem('localeDir', dir);
     } catch (e) {}
+    // The server renders the next page in this locale (cookie read by app/i18n.py).
+    document.cookie = `locale=${encodeURIComponent(locale)}; path=/; max-age=31536000; SameSite=Lax`;
   }
   
 
@@ -195,4 +223,16 @@ export function getBaseLocale() {
   return 'en-US';
 }
 
+/**
+ * Returns the locale the server rendered this page in (negotiated from the locale
+ * cookie or Accept-Language), falling back to the base locale.
+ * @returns {string} The page locale code
+ * 
+ * @example
+ * await initI18n(getPageLocale()); // Uses the inline payload, no request
+ */
+export function getPageLocale() {
+  return (pagePayload && pagePayload.locale) || getBaseLocale();
+}
+
 // here to add isDebugMode function
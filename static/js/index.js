@@ -16,7 +16,7 @@ export default async function main() {
 
     // If neither nav nor footer placeholders exist, run basic i18n and wire language switcher (wizard / simple page)
     if (!navElement && !footerElement) {
-        const locale = multiLang.getBaseLocale();
+        const locale = multiLang.getPageLocale();
         try {
             await multiLang.initI18n(locale);
             multiLang.applyTranslations('data-i18n', locale);
@@ -155,10 +155,10 @@ ${message}`;
             const safeStyleProfile = (id) => { if (document.getElementById(id)) Bootstrap.setStyleProfile(id); };
             const safeStyleContact = (id) => { if (document.getElementById(id)) Bootstrap.setStyleContact(id); };
 
-            // Initialize with default locale (English)
+            // Initialize with the locale the server rendered the page in
             try {
-                await multiLang.initI18n(multiLang.getBaseLocale());
-                multiLang.applyTranslations("data-i18n", multiLang.getBaseLocale());
+                await multiLang.initI18n(multiLang.getPageLocale());
+                multiLang.applyTranslations("data-i18n", multiLang.getPageLocale());
                 
                 // Apply appropriate styles after translations
                 safeStyleCard('pi-content');
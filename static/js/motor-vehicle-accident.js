@@ -22,8 +22,8 @@ export default async function main() {
     Util.enableFlipCards();
 
     try {
-        await multiLang.initI18n(multiLang.getBaseLocale());
-        multiLang.applyTranslations('data-i18n', multiLang.getBaseLocale());
+        await multiLang.initI18n(multiLang.getPageLocale());
+        multiLang.applyTranslations('data-i18n', multiLang.getPageLocale());
     } catch (error) {
         console.error('[motor-vehicle-accident] Error: Failed to initialize i18n:', error);
         return;
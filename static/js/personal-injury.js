@@ -21,8 +21,8 @@ export default async function main() {
     Util.enableDebugMode('debug-i18n', 'data-i18n');
 
     try {
-        await multiLang.initI18n(multiLang.getBaseLocale());
-        multiLang.applyTranslations('data-i18n', multiLang.getBaseLocale());
+        await multiLang.initI18n(multiLang.getPageLocale());
+        multiLang.applyTranslations('data-i18n', multiLang.getPageLocale());
     } catch (error) {
         console.error('[personal-injury] Error: Failed to initialize i18n:', error);
         return;